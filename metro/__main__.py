@@ -1,10 +1,16 @@
 import argparse
-import json
+import asyncio
 import logging
 import sys
+from datetime import timedelta
 from pathlib import Path
+from typing import Union
 
+from metro.core import json_backend, network
+from metro.core.streaming import write_system
 from metro.core.system import System, Map
+from metro.harvest.cache import SQLiteEntityCache
+from metro.harvest.dump import WikidataDumpParser
 from metro.harvest.wikidata import WikidataCityParser, WikidataParser
 
 __author__ = "Sergey Vartanov"
@@ -18,12 +24,32 @@ def main():
     parser.add_argument("--system-wikidata-id")
     parser.add_argument("--station-wikidata-ids", nargs="+")
     parser.add_argument("--cache", default="cache")
+    parser.add_argument("--dump", help="uncompressed Wikidata JSON dump or extract to use instead of Wikidata API")
+    parser.add_argument("--cache-database", help="SQLite database to use as cache instead of cache directory")
+    parser.add_argument("--cache-compression", choices=["none", "gzip", "zstd"], default="gzip")
+    parser.add_argument("--max-cache-age", type=float, help="revalidate cached items older than this number of days")
+    parser.add_argument("--json-backend", choices=json_backend.BACKENDS, help="fastest available by default")
+    parser.add_argument("--concurrency", type=int, help="fetch Wikidata items concurrently")
     arguments = parser.parse_args(sys.argv[1:])
 
-    cache_directory: Path = Path(arguments.cache)
-    cache_directory.mkdir(exist_ok=True)
+    if arguments.json_backend:
+        json_backend.set_backend(arguments.json_backend)
+
+    network.set_cache_compression(None if arguments.cache_compression == "none" else arguments.cache_compression)
+
+    wikidata_parser: Union[WikidataParser, WikidataDumpParser]
+    if arguments.dump:
+        wikidata_parser = WikidataDumpParser(Path(arguments.dump))
+    elif arguments.cache_database:
+        wikidata_parser = WikidataParser(cache=SQLiteEntityCache(Path(arguments.cache_database)))
+    else:
+        cache_directory: Path = Path(arguments.cache)
+        cache_directory.mkdir(exist_ok=True)
+        wikidata_parser = WikidataParser(cache_directory)
+
+    if arguments.max_cache_age is not None and isinstance(wikidata_parser, WikidataParser):
+        wikidata_parser.max_age = timedelta(days=arguments.max_cache_age)
 
-    wikidata_parser: WikidataParser = WikidataParser(cache_directory)
     map_: Map = Map("metro", {}, {"metro": System({}, "metro")}, ["en"])
 
     city_parser: WikidataCityParser = WikidataCityParser(
@@ -34,14 +60,17 @@ def main():
         int(arguments.system_wikidata_id),
         [],
     )
-    city_parser.parse()
+    if arguments.concurrency:
+        asyncio.run(city_parser.parse_async(concurrency=arguments.concurrency))
+    else:
+        city_parser.parse()
 
     output_directory: Path = Path("out")
     output_directory.mkdir(parents=True, exist_ok=True)
 
     system: System = map_.systems["metro"]
-    with (output_directory / f"{system.id_}.json").open("w+") as output_file:
-        json.dump(system.serialize(), output_file, indent=4, ensure_ascii=False)
+    with (output_directory / f"{system.id_}.json").open("wb+") as output_file:
+        write_system(system, output_file, indent=4)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,276 @@
+"""
+Routing over transport system graph with contracted chains of stations.
+
+Most stations of a line are connected only to the previous and the next station of the same line. Such runs of stations
+between transfer stations and termini are contracted into segments: route search visits only core stations (all
+others) and moves along whole segments at once. Found routes are expanded back to full station sequences.
+"""
+
+import heapq
+import math
+from dataclasses import dataclass, field
+from typing import Optional
+
+import numpy as np
+
+from metro.core.graph import CONNECTION_TYPE_CODES, CONNECTION_TYPES
+from metro.core.routing import Route, Router, RoutingCosts
+from metro.core.station import ConnectionType
+from metro.core.system import System
+
+__author__ = "Sergey Vartanov"
+__email__ = "me@enzet.ru"
+
+
+# Segment of station that is not in a chain.
+NO_SEGMENT: int = -1
+
+
+@dataclass
+class Segment:
+    """
+    Chain of stations between two core stations, that may be the same station for circle lines without core stations.
+    """
+
+    # Station indices from the first core station to the last one.
+    nodes: list[int]
+
+    # Edges from every station to the next one, and from every station but the first one to the previous one.
+    forward_edges: list[int]
+    backward_edges: list[int]
+
+    # Costs of moving from the first station: `forward_costs[i]` is the cost from `nodes[0]` to `nodes[i]` along the
+    # segment, and `backward_costs[i]` is the cost from `nodes[i]` to `nodes[0]`.
+    forward_costs: list[float] = field(default_factory=list)
+    backward_costs: list[float] = field(default_factory=list)
+
+
+@dataclass
+class Shortcut:
+    """Edge between core stations: whole segment or single connection."""
+
+    target: int
+    cost: float
+    edges: list[int]
+
+
+class ContractedRouter(Router):
+    """
+    Router with precomputed contraction of chains of stations, for many route queries.
+
+    Station is a chain station if it has exactly two usable connections, both of them are `NEXT` connections to two
+    other stations, and these stations have `NEXT` connections back to it and no other connections to it. All other
+    stations are core stations. For circle lines without core stations, one station is made core.
+    """
+
+    def __init__(self, system: System, costs: Optional[RoutingCosts] = None, exclude_hidden: bool = False) -> None:
+        super().__init__(system, costs, exclude_hidden)
+
+        self.segments: list[Segment] = []
+        # Segment and position in it by station indices, `NO_SEGMENT` for core stations.
+        self.station_segments: list[int] = [NO_SEGMENT] * len(self.graph)
+        self.station_positions: list[int] = [0] * len(self.graph)
+        # Shortcuts from core stations.
+        self.shortcuts: dict[int, list[Shortcut]] = {}
+
+        is_chain: list[bool] = self.get_chain_stations()
+        for node in range(len(self.graph)):
+            if not is_chain[node]:
+                self.add_core_station(node, is_chain)
+        for node in range(len(self.graph)):
+            if is_chain[node] and self.station_segments[node] == NO_SEGMENT:
+                is_chain[node] = False
+                self.add_core_station(node, is_chain)
+
+    def get_usable_edges(self, node: int) -> list[int]:
+        return [x for x in range(self.offsets[node], self.offsets[node + 1]) if self.weights[x] != math.inf]
+
+    def find_edge(self, node: int, target: int) -> Optional[int]:
+        """Find the cheapest usable edge from station to another station."""
+        edges: list[int] = [x for x in self.get_usable_edges(node) if self.targets[x] == target]
+        return min(edges, key=self.weights.__getitem__) if edges else None
+
+    def get_chain_stations(self) -> list[bool]:
+        next_code: int = CONNECTION_TYPE_CODES[ConnectionType.NEXT]
+        types: list[int] = self.graph.types.tolist()
+
+        usable: np.ndarray = np.array(self.weights) != math.inf
+        incoming: np.ndarray = np.bincount(self.graph.targets[usable], minlength=len(self.graph) + 1)
+
+        result: list[bool] = []
+        for node in range(len(self.graph)):
+            edges: list[int] = self.get_usable_edges(node)
+            neighbors: set[int] = {self.targets[x] for x in edges}
+            result.append(
+                len(edges) == 2
+                and len(neighbors) == 2
+                and node not in neighbors
+                and all(types[x] == next_code for x in edges)
+                and incoming[node] == 2
+                and all((edge := self.find_edge(x, node)) is not None and types[edge] == next_code for x in neighbors)
+            )
+        return result
+
+    def add_core_station(self, core: int, is_chain: list[bool]) -> None:
+        """Add shortcuts from core station, walk along chains that start from it."""
+        shortcuts: list[Shortcut] = self.shortcuts.setdefault(core, [])
+
+        for edge in self.get_usable_edges(core):
+            node: int = self.targets[edge]
+            if not is_chain[node]:
+                shortcuts.append(Shortcut(node, self.weights[edge], [edge]))
+                continue
+            if self.station_segments[node] != NO_SEGMENT:
+                # The chain was walked from another end.
+                continue
+
+            nodes: list[int] = [core, node]
+            forward_edges: list[int] = [edge]
+            while is_chain[nodes[-1]] and nodes[-1] != core:
+                previous, current = nodes[-2], nodes[-1]
+                next_edge: int = next(x for x in self.get_usable_edges(current) if self.targets[x] != previous)
+                forward_edges.append(next_edge)
+                nodes.append(self.targets[next_edge])
+            backward_edges: list[int] = [self.find_edge(nodes[x + 1], nodes[x]) for x in range(len(nodes) - 1)]
+
+            segment: Segment = Segment(nodes, forward_edges, backward_edges)
+            segment.forward_costs = [0.0] + np.cumsum([self.weights[x] for x in forward_edges]).tolist()
+            segment.backward_costs = [0.0] + np.cumsum([self.weights[x] for x in backward_edges]).tolist()
+
+            for position, chain_node in enumerate(nodes[1:-1], start=1):
+                self.station_segments[chain_node] = len(self.segments)
+                self.station_positions[chain_node] = position
+            self.segments.append(segment)
+
+            shortcuts.append(Shortcut(nodes[-1], segment.forward_costs[-1], forward_edges))
+            self.shortcuts.setdefault(nodes[-1], []).append(
+                Shortcut(core, segment.backward_costs[-1], backward_edges[::-1])
+            )
+
+    def get_exits(self, node: int) -> list[tuple[int, float, list[int]]]:
+        """Get core stations reachable from station along its segment, with costs and edges."""
+        if self.station_segments[node] == NO_SEGMENT:
+            return [(node, 0.0, [])]
+        segment: Segment = self.segments[self.station_segments[node]]
+        position: int = self.station_positions[node]
+        return [
+            (
+                segment.nodes[-1],
+                segment.forward_costs[-1] - segment.forward_costs[position],
+                segment.forward_edges[position:],
+            ),
+            (segment.nodes[0], segment.backward_costs[position], segment.backward_edges[:position][::-1]),
+        ]
+
+    def get_entrances(self, node: int) -> list[tuple[int, float, list[int]]]:
+        """Get core stations station is reachable from along its segment, with costs and edges."""
+        if self.station_segments[node] == NO_SEGMENT:
+            return [(node, 0.0, [])]
+        segment: Segment = self.segments[self.station_segments[node]]
+        position: int = self.station_positions[node]
+        return [
+            (segment.nodes[0], segment.forward_costs[position], segment.forward_edges[:position]),
+            (
+                segment.nodes[-1],
+                segment.backward_costs[-1] - segment.backward_costs[position],
+                segment.backward_edges[position:][::-1],
+            ),
+        ]
+
+    def get_direct(self, source: int, destination: int) -> Optional[tuple[float, list[int]]]:
+        """Get cost and edges of the route along the segment if both stations are in the same segment."""
+        segment_index: int = self.station_segments[source]
+        if segment_index == NO_SEGMENT or segment_index != self.station_segments[destination]:
+            return None
+        segment: Segment = self.segments[segment_index]
+        start, end = self.station_positions[source], self.station_positions[destination]
+        if start <= end:
+            return segment.forward_costs[end] - segment.forward_costs[start], segment.forward_edges[start:end]
+        return segment.backward_costs[start] - segment.backward_costs[end], segment.backward_edges[end:start][::-1]
+
+    def route(self, from_id: str, to_id: str) -> Optional[Route]:
+        """
+        Find the cheapest route between stations with A* search over core stations. Heuristic is the same as the one of
+        `Router.route`: it never overestimates the cost of any route, so it never overestimates the cost of shortcut
+        either.
+
+        :param from_id: identifier of the first station
+        :param to_id: identifier of the last station
+        :return: route or None if there is no route
+        :raises KeyError: if there is no such station
+        """
+        source: int = self.graph.get_index(from_id)
+        destination: int = self.graph.get_index(to_id)
+        if self.is_hidden[source] or self.is_hidden[destination]:
+            return None
+        if source == destination:
+            return Route([from_id], [], 0.0)
+
+        cost_per_meter: float = self.cost_per_meter if self.cost_per_meter else 0.0
+        points: list[tuple[float, float, float]] = self.points
+        goal: tuple[float, float, float] = points[destination]
+
+        best_cost: float = math.inf
+        # Edges of the cheapest route along the segment, or the last core station of the cheapest route and edges
+        # from it to the destination.
+        best_edges: Optional[list[int]] = None
+        best_core: Optional[int] = None
+        if direct := self.get_direct(source, destination):
+            best_cost, best_edges = direct
+
+        entrances: dict[int, list[tuple[float, list[int]]]] = {}
+        for core, cost, edges in self.get_entrances(destination):
+            entrances.setdefault(core, []).append((cost, edges))
+
+        costs: dict[int, float] = {}
+        # Edges the cheapest routes to core stations start with, and shortcuts they come to core stations by.
+        starts: dict[int, list[int]] = {}
+        previous: dict[int, tuple[int, Shortcut]] = {}
+        queue: list[tuple[float, float, int]] = []
+        for core, cost, edges in self.get_exits(source):
+            if cost < costs.get(core, math.inf):
+                costs[core] = cost
+                starts[core] = edges
+                heapq.heappush(queue, (cost + cost_per_meter * math.dist(points[core], goal), cost, core))
+
+        while queue:
+            estimate, cost, node = heapq.heappop(queue)
+            if estimate >= best_cost:
+                break
+            if cost > costs[node]:
+                continue
+            for entrance_cost, entrance_edges in entrances.get(node, []):
+                if cost + entrance_cost < best_cost:
+                    best_cost = cost + entrance_cost
+                    best_core, best_edges = node, entrance_edges
+            for shortcut in self.shortcuts.get(node, []):
+                new_cost: float = cost + shortcut.cost
+                target: int = shortcut.target
+                if new_cost < costs.get(target, math.inf):
+                    costs[target] = new_cost
+                    starts.pop(target, None)
+                    previous[target] = node, shortcut
+                    heapq.heappush(
+                        queue, (new_cost + cost_per_meter * math.dist(points[target], goal), new_cost, target)
+                    )
+
+        if best_edges is None:
+            return None
+        if best_core is not None:
+            best_edges = self.get_core_edges(best_core, starts, previous) + best_edges
+
+        return Route(
+            [from_id] + [self.graph.station_ids[self.targets[x]] for x in best_edges],
+            [CONNECTION_TYPES[x] for x in self.graph.types[best_edges].tolist()],
+            best_cost,
+        )
+
+    @staticmethod
+    def get_core_edges(node: int, starts: dict[int, list[int]], previous: dict[int, tuple[int, Shortcut]]) -> list[int]:
+        """Expand the cheapest route to core station into edges."""
+        parts: list[list[int]] = []
+        while node not in starts:
+            node, shortcut = previous[node]
+            parts.append(shortcut.edges)
+        parts.append(starts[node])
+        return [x for part in reversed(parts) for x in part]
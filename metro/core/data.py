@@ -12,7 +12,7 @@ __email__ = "me@enzet.ru"
 
 
 EN_SYSTEM_TYPE: str = "[Mm]etro|London [Uu]nderground|[Uu]nderground|[Tt]ube|[Ss]ubway|[Rr]ailway"
-EN_CAPTION: str = f"(?P<name>((?!([Ss]tation|{EN_SYSTEM_TYPE})).)*)"
+EN_CAPTION: str = f"(?P<name>(?:(?![Ss]tation|{EN_SYSTEM_TYPE}).)*)"
 
 station_name_dict: dict[str, list[str]] = {
     "az": ["^(?P<name>.*) metrostansiyası"],
@@ -49,6 +49,26 @@ station_name_dict: dict[str, list[str]] = {
 }
 
 
+# Compiled patterns by language, filled on first use.
+_station_name_patterns: dict[str, list[re.Pattern]] = {}
+_line_name_patterns: dict[str, list[re.Pattern]] = {}
+
+
+def get_patterns(
+    patterns: dict[str, list[re.Pattern]], pattern_dict: dict[str, list[str]], language: str
+) -> list[re.Pattern]:
+    """
+    Get compiled patterns for the language, compile them on first use.
+
+    :param patterns: compiled patterns by language
+    :param pattern_dict: pattern strings by language
+    :param language: language identifier
+    """
+    if language not in patterns:
+        patterns[language] = [re.compile(x) for x in pattern_dict.get(language, [])]
+    return patterns[language]
+
+
 def extract_station_name(name: str, language: str) -> str:
     """
     Station name extraction from it"s caption (which is used for Wikipedia or Wikidata page names). For example, for
@@ -58,10 +78,9 @@ def extract_station_name(name: str, language: str) -> str:
     """
     name = name.replace("&", "and")
 
-    if language in station_name_dict:
-        for pattern in station_name_dict[language]:
-            if m := re.match(pattern, name):
-                return m.group("name")
+    for pattern in get_patterns(_station_name_patterns, station_name_dict, language):
+        if m := pattern.match(name):
+            return m.group("name")
     return name
 
 
@@ -109,10 +128,9 @@ def extract_line_name(name: str, language: str):
     :param language: language of the name.
     :return: pure line caption.
     """
-    if language in line_name_dict:
-        for pattern in line_name_dict[language]:
-            if matcher := re.match(pattern, name):
-                return matcher.group("name")
+    for pattern in get_patterns(_line_name_patterns, line_name_dict, language):
+        if matcher := pattern.match(name):
+            return matcher.group("name")
 
     return name
 
@@ -0,0 +1,118 @@
+"""
+Compressed sparse row representation of transport system connections.
+
+Stations are numbered in the order of `System.stations`. Connections of station `index` are edges
+`offsets[index]:offsets[index + 1]` of `targets`, `types`, and `weights` arrays.
+"""
+
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+import numpy as np
+
+from metro.core.station import Connection, ConnectionType, Station
+from metro.core.system import System
+
+__author__ = "Sergey Vartanov"
+__email__ = "me@enzet.ru"
+
+
+# Codes of connection types in `Graph.types`.
+CONNECTION_TYPE_CODES: dict[ConnectionType, int] = {x: index for index, x in enumerate(ConnectionType)}
+CONNECTION_TYPES: list[ConnectionType] = list(ConnectionType)
+
+# Target of connection that leads to station outside the system.
+DANGLING: int = -1
+
+
+@dataclass
+class Graph:
+    """Adjacency of system stations in compressed sparse row form."""
+
+    # Station identifiers by station indices.
+    station_ids: list[str]
+
+    # Positions of station edges in edge arrays, `len(station_ids) + 1` elements.
+    offsets: np.ndarray
+
+    # Target station indices of edges, `DANGLING` for stations outside the system.
+    targets: np.ndarray
+
+    # Codes of connection types of edges, see `CONNECTION_TYPE_CODES`.
+    types: np.ndarray
+
+    # Costs of edges if weight function was specified.
+    weights: Optional[np.ndarray] = None
+
+    # Identifiers of target stations of dangling edges by edge indices.
+    dangling_targets: dict[int, str] = field(default_factory=dict)
+
+    def __post_init__(self) -> None:
+        self.station_indices: dict[str, int] = {x: index for index, x in enumerate(self.station_ids)}
+
+    def __len__(self) -> int:
+        return len(self.station_ids)
+
+    def get_index(self, station_id: str) -> int:
+        """Get station index by station identifier, raise `KeyError` for unknown station."""
+        return self.station_indices[station_id]
+
+    def get_edges(self, index: int) -> range:
+        """Get edge indices of station."""
+        return range(int(self.offsets[index]), int(self.offsets[index + 1]))
+
+    def get_neighbors(self, index: int, connection_type: Optional[ConnectionType] = None) -> np.ndarray:
+        """Get indices of stations the station is connected to, without dangling targets."""
+        edges: slice = slice(self.offsets[index], self.offsets[index + 1])
+        targets: np.ndarray = self.targets[edges]
+        mask: np.ndarray = targets != DANGLING
+        if connection_type is not None:
+            mask &= self.types[edges] == CONNECTION_TYPE_CODES[connection_type]
+        return targets[mask]
+
+    def get_degrees(self) -> np.ndarray:
+        """Get numbers of edges of all stations."""
+        return np.diff(self.offsets)
+
+    def get_sources(self) -> np.ndarray:
+        """Get source station index of every edge."""
+        return np.repeat(np.arange(len(self.station_ids)), self.get_degrees())
+
+
+def build_graph(system: System, weight: Optional[Callable[[Station, Connection], float]] = None) -> Graph:
+    """
+    Compile system connections into graph.
+
+    :param system: transport system
+    :param weight: cost of connection from station, no weights if not specified
+    """
+    station_ids: list[str] = list(system.stations)
+    station_indices: dict[str, int] = {x: index for index, x in enumerate(station_ids)}
+
+    offsets: list[int] = [0]
+    targets: list[int] = []
+    types: list[int] = []
+    weights: list[float] = []
+    dangling_targets: dict[int, str] = {}
+
+    for station in system.stations.values():
+        for connection in station.connections:
+            target_id: Optional[str] = connection.to_.id_ if connection.to_ else None
+            target: Optional[int] = station_indices.get(target_id)
+            if target is None:
+                dangling_targets[len(targets)] = target_id
+                target = DANGLING
+            targets.append(target)
+            types.append(CONNECTION_TYPE_CODES[connection.type_])
+            if weight:
+                weights.append(weight(station, connection))
+        offsets.append(len(targets))
+
+    return Graph(
+        station_ids,
+        np.array(offsets, dtype=np.int64),
+        np.array(targets, dtype=np.int64),
+        np.array(types, dtype=np.uint8),
+        np.array(weights, dtype=np.float64) if weight else None,
+        dangling_targets,
+    )
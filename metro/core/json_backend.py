@@ -0,0 +1,146 @@
+"""
+JSON encoding and decoding with the fastest available backend.
+
+Backends are tried in the order of `BACKENDS`: orjson, msgspec, ujson, and the standard library `json` module as a
+fallback. All backends decode from bytes directly and encode into UTF-8 bytes without escaping non-ASCII characters.
+Indented output has the same layout as `json.dumps(value, indent=indent, ensure_ascii=False)`.
+"""
+
+import json
+import re
+from typing import Any, Callable, Optional, Union
+
+__author__ = "Sergey Vartanov"
+__email__ = "me@enzet.ru"
+
+
+BACKENDS: list[str] = ["orjson", "msgspec", "ujson", "json"]
+
+# Leading indentation of orjson output, which is always 2 spaces per level.
+ORJSON_INDENT_PATTERN: re.Pattern = re.compile(rb"^((?:  )+)", re.MULTILINE)
+
+
+def _json_loads(data: Union[bytes, str]) -> Any:
+    return json.loads(data)
+
+
+def _json_dumps(value: Any, indent: Optional[int]) -> bytes:
+    if indent is None:
+        return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode()
+    return json.dumps(value, ensure_ascii=False, indent=indent).encode()
+
+
+def _create_orjson() -> tuple[Callable, Callable]:
+    import orjson
+
+    def dumps(value: Any, indent: Optional[int]) -> bytes:
+        if indent is None:
+            return orjson.dumps(value)
+        data: bytes = orjson.dumps(value, option=orjson.OPT_INDENT_2)
+        if indent == 2:
+            return data
+        return ORJSON_INDENT_PATTERN.sub(lambda x: b" " * (len(x.group(1)) // 2 * indent), data)
+
+    return orjson.loads, dumps
+
+
+def _create_msgspec() -> tuple[Callable, Callable]:
+    import msgspec
+
+    encoder: msgspec.json.Encoder = msgspec.json.Encoder()
+    decoder: msgspec.json.Decoder = msgspec.json.Decoder()
+
+    def loads(data: Union[bytes, str]) -> Any:
+        try:
+            return decoder.decode(data)
+        except msgspec.DecodeError as error:
+            raise ValueError(str(error)) from error
+
+    def dumps(value: Any, indent: Optional[int]) -> bytes:
+        if indent is None:
+            return encoder.encode(value)
+        return msgspec.json.format(encoder.encode(value), indent=indent)
+
+    return loads, dumps
+
+
+def _create_ujson() -> tuple[Callable, Callable]:
+    import ujson
+
+    def dumps(value: Any, indent: Optional[int]) -> bytes:
+        return ujson.dumps(
+            value, ensure_ascii=False, escape_forward_slashes=False, indent=0 if indent is None else indent
+        ).encode()
+
+    return ujson.loads, dumps
+
+
+_factories: dict[str, Callable[[], tuple[Callable, Callable]]] = {
+    "orjson": _create_orjson,
+    "msgspec": _create_msgspec,
+    "ujson": _create_ujson,
+    "json": lambda: (_json_loads, _json_dumps),
+}
+
+_backend: str = "json"
+_loads: Callable[[Union[bytes, str]], Any] = _json_loads
+_dumps: Callable[[Any, Optional[int]], bytes] = _json_dumps
+
+
+def get_available_backends() -> list[str]:
+    """Get names of backends that can be used in this environment."""
+    available: list[str] = []
+    for name in BACKENDS:
+        try:
+            _factories[name]()
+        except ImportError:
+            continue
+        available.append(name)
+    return available
+
+
+def get_backend() -> str:
+    """Get name of current backend."""
+    return _backend
+
+
+def set_backend(name: Optional[str] = None) -> None:
+    """
+    Select JSON backend.
+
+    :param name: one of `BACKENDS`; the fastest available one if not specified
+    :raises ValueError: if backend is unknown or not installed
+    """
+    global _backend, _loads, _dumps
+
+    if name is None:
+        name = get_available_backends()[0]
+    if name not in _factories:
+        raise ValueError(f"unknown JSON backend {name}")
+    try:
+        _loads, _dumps = _factories[name]()
+    except ImportError as error:
+        raise ValueError(f"JSON backend {name} is not installed") from error
+    _backend = name
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    """
+    Decode JSON from bytes (without decoding them into string first) or string.
+
+    :raises ValueError: if data is not valid JSON
+    """
+    return _loads(data)
+
+
+def dumps(value: Any, indent: Optional[int] = None) -> bytes:
+    """
+    Encode value into UTF-8 JSON.
+
+    :param value: structure of primitive values, lists, and dictionaries with string keys
+    :param indent: number of spaces per indentation level; compact representation without spaces if None
+    """
+    return _dumps(value, indent)
+
+
+set_backend()
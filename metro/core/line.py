@@ -1,8 +1,8 @@
-from dataclasses import dataclass, fields
+from dataclasses import dataclass
 from typing import Any, Optional
 
 from metro.core.named import Named
-from metro.core.serialization import is_null, deserialize, serialize
+from metro.core.serialization import deserialize, get_field_names, is_null, serialize
 
 __author__ = "Sergey Vartanov"
 __email__ = "me@enzet.ru"
@@ -25,9 +25,9 @@ class Line(Named):
 
     def deserialize(self, structure: dict[str, Any]) -> "Line":
         """Deserialize transport route from structure."""
-        for key in [x.name for x in fields(Line)]:
+        for key in get_field_names(Line):
             if key in structure:
-                self.__setattr__(key, deserialize(structure[key]))
+                setattr(self, key, deserialize(structure[key]))
 
         return self
 
@@ -35,8 +35,9 @@ class Line(Named):
         """Serialize transport route to structure."""
         structure: dict[str, Any] = {"id": self.id_}
 
-        for key in [x.name for x in fields(Line)]:
-            value = self.__getattribute__(key)
+        values: dict[str, Any] = self.__dict__
+        for key in get_field_names(Line):
+            value = values[key]
             if not is_null(value):
                 structure[key] = serialize(value)
 
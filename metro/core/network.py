@@ -1,8 +1,9 @@
 """Utility for network connections."""
 
-import json
+import gzip
 import logging
 import os
+import threading
 import time
 import urllib
 from datetime import datetime, timedelta
@@ -11,26 +12,199 @@ from typing import Optional
 
 import urllib3
 
+from metro.core import json_backend
 
-def get(address: str, parameters: dict[str, str], cache_file: Path) -> Optional[bytes]:
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
 
-    if cache_file.exists():
-        with cache_file.open("rb") as input_file:
-            return input_file.read()
 
-    pool: urllib3.PoolManager = urllib3.PoolManager()
+# Default rate limit: sustained number of requests per second and number of requests allowed in a burst.
+DEFAULT_REQUESTS_PER_SECOND: float = 1.0
+DEFAULT_BURST: float = 5.0
 
+
+# Compression of cache files: "gzip", "zstd", or None to store raw responses.
+COMPRESSIONS: list[Optional[str]] = [None, "gzip", "zstd"]
+GZIP_MAGIC: bytes = b"\x1f\x8b"
+ZSTD_MAGIC: bytes = b"\x28\xb5\x2f\xfd"
+
+cache_compression: Optional[str] = "gzip"
+
+# Compression argument value that stands for current cache compression, see `set_cache_compression`.
+CURRENT_COMPRESSION: str = "current"
+
+
+def set_cache_compression(compression: Optional[str]) -> None:
+    """Set compression for newly written cache files."""
+    global cache_compression
+
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"unknown compression {compression}")
+    if compression == "zstd" and zstandard is None:
+        raise ValueError("zstd compression requires zstandard package")
+    cache_compression = compression
+
+
+def compress(data: bytes, compression: Optional[str]) -> bytes:
+    """
+    Compress data for cache file.
+
+    :param data: data to compress
+    :param compression: one of `COMPRESSIONS`: "gzip", "zstd" (requires zstandard package), or None to return data
+        unchanged
+    """
+    if compression == "gzip":
+        return gzip.compress(data, compresslevel=6, mtime=0)
+    if compression == "zstd":
+        return zstandard.ZstdCompressor().compress(data)
+    return data
+
+
+def decompress(data: bytes) -> bytes:
+    """Decompress data if it is compressed with gzip or zstd, return it as is otherwise."""
+    if data.startswith(GZIP_MAGIC):
+        return gzip.decompress(data)
+    if data.startswith(ZSTD_MAGIC):
+        if zstandard is None:
+            raise ValueError("zstd compressed data requires zstandard package")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return data
+
+
+def read_cache_file(cache_file: Path) -> bytes:
+    """Read cache file, compressed or not."""
+    with cache_file.open("rb") as input_file:
+        return decompress(input_file.read())
+
+
+def write_cache_file(cache_file: Path, data: bytes, compression: Optional[str] = CURRENT_COMPRESSION) -> None:
+    """
+    Write cache file.
+
+    :param cache_file: path to the file
+    :param data: data to store
+    :param compression: compression to use, None to store data as is; current cache compression by default
+    """
+    with cache_file.open("wb+") as output_file:
+        output_file.write(compress(data, cache_compression if compression == CURRENT_COMPRESSION else compression))
+
+
+class TokenBucket:
+    """
+    Token bucket rate limiter.
+
+    Every request takes one token. Tokens are refilled with constant rate up to the bucket capacity, so requests wait
+    only when the budget is exhausted.
+    """
+
+    def __init__(self, rate: float = DEFAULT_REQUESTS_PER_SECOND, capacity: float = DEFAULT_BURST) -> None:
+        """
+        :param rate: number of tokens added per second
+        :param capacity: maximum number of tokens, the bucket starts full
+        """
+        self.rate: float = rate
+        self.capacity: float = capacity
+        self.tokens: float = capacity
+        self.last_time: float = time.monotonic()
+        self.lock: threading.Lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """
+        Take one token, wait for it if there is none.
+
+        :return: time waited in seconds
+        """
+        with self.lock:
+            now: float = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.last_time) * self.rate)
+            self.last_time = now
+
+            delay: float = 0.0
+            if self.tokens < 1.0:
+                delay = (1.0 - self.tokens) / self.rate
+                time.sleep(delay)
+                self.tokens = 1.0
+                self.last_time = time.monotonic()
+
+            self.tokens -= 1.0
+            return delay
+
+
+class Client:
+    """HTTP client with persistent keep-alive connection pool and rate limiter."""
+
+    def __init__(self, rate_limiter: Optional[TokenBucket] = None, pool: Optional[urllib3.PoolManager] = None) -> None:
+        self.rate_limiter: TokenBucket = rate_limiter if rate_limiter else TokenBucket()
+        self.pool: urllib3.PoolManager = pool if pool else urllib3.PoolManager()
+
+    def request(self, url: str, parameters: Optional[dict[str, str]] = None) -> urllib3.HTTPResponse:
+        self.rate_limiter.acquire()
+        return self.pool.request("GET", url, parameters)
+
+
+_client: Optional[Client] = None
+_client_lock: threading.Lock = threading.Lock()
+
+
+def get_client() -> Client:
+    """Get shared HTTP client, create default one on first use."""
+    global _client
+
+    with _client_lock:
+        if _client is None:
+            _client = Client()
+        return _client
+
+
+def set_client(client: Optional[Client]) -> None:
+    """Replace shared HTTP client, e.g. to configure rate limit. `None` resets it to default."""
+    global _client
+
+    with _client_lock:
+        _client = client
+
+
+def get(
+    address: str, parameters: dict[str, str], cache_file: Path, max_age: Optional[timedelta] = None
+) -> Optional[bytes]:
+    """
+    Get response body from cache file or by request.
+
+    :param address: URL without parameters
+    :param parameters: URL parameters
+    :param cache_file: path to cache file
+    :param max_age: maximum age of cache file, if it is older, it is requested again; no limit by default
+    :return: response body or None if request failed or response is empty
+    """
+    if cache_file.exists() and (
+        max_age is None or datetime.fromtimestamp(cache_file.stat().st_mtime) > datetime.now() - max_age
+    ):
+        return read_cache_file(cache_file)
+
+    content: Optional[bytes] = request(address, parameters)
+
+    if content:
+        write_cache_file(cache_file, content)
+
+    return content
+
+
+def request(address: str, parameters: dict[str, str]) -> Optional[bytes]:
+    """
+    Get response body without touching the cache.
+
+    :param address: URL without parameters
+    :param parameters: URL parameters
+    :return: response body or None if request failed or response is empty
+    """
     try:
-        result = pool.request("GET", address, parameters)
+        result = get_client().request(address, parameters)
     except urllib3.exceptions.MaxRetryError:
         return None
 
-    time.sleep(1)
-
-    pool.clear()
     if result.data:
-        with cache_file.open("wb+") as output_file:
-            output_file.write(result.data)
         return result.data
 
     return None
@@ -52,12 +226,9 @@ def get_data(address: str, parameters: dict[str, str], is_secure: bool = False,
     if not name:
         name = url
     logging.info("getting " + name)
-    pool_manager = urllib3.PoolManager()
     url = url.replace(" ", "_")
     urllib3.disable_warnings()
-    result = pool_manager.request("GET", url)
-    pool_manager.clear()
-    time.sleep(2)
+    result = get_client().request(url)
     return result.data
 
 
@@ -78,22 +249,23 @@ def get_content(address, parameters, cache_file_name, kind, is_secure, name=None
         and datetime(1, 1, 1).fromtimestamp(os.stat(cache_file_name).st_mtime) > datetime.now() - timedelta(days=90)
         and not update_cache
     ):
-        with open(cache_file_name) as cache_file:
-            if kind == "json":
+        if kind == "json":
+            with open(cache_file_name, "rb") as cache_file:
                 try:
-                    return json.load(cache_file)
+                    return json_backend.loads(cache_file.read())
                 except ValueError:
                     return None
-            if kind == "html":
+        if kind == "html":
+            with open(cache_file_name) as cache_file:
                 return cache_file.read()
     else:
         try:
             data = get_data(address, parameters, is_secure=is_secure, name=name)
             if kind == "json":
                 try:
-                    obj = json.loads(data.decode("utf-8"))
-                    with open(cache_file_name, "w+") as cached:
-                        cached.write(json.dumps(obj, indent=4))
+                    obj = json_backend.loads(data)
+                    with open(cache_file_name, "wb+") as cached:
+                        cached.write(json_backend.dumps(obj, indent=4))
                     return obj
                 except ValueError:
                     logging.error("cannot get " + address + " " + str(parameters))
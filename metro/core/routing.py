@@ -0,0 +1,307 @@
+"""
+Cheapest routes between stations of transport system.
+
+Routes are searched with A* over the compiled system graph. Heuristic is the straight (chord) distance to the
+destination multiplied by the lowest ratio of connection cost to its great-circle length. Chord is never longer than
+great-circle distance, so heuristic never overestimates the remaining cost. If the heuristic cannot be computed for all
+stations (some positions are unknown), plain Dijkstra search is used.
+"""
+
+import heapq
+import math
+import multiprocessing
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from metro.core.graph import CONNECTION_TYPE_CODES, CONNECTION_TYPES, DANGLING, Graph, build_graph
+from metro.core.station import ConnectionType, Station
+from metro.core.system import System
+from metro.geometry.geo import get_cartesian, get_distances
+
+__author__ = "Sergey Vartanov"
+__email__ = "me@enzet.ru"
+
+
+@dataclass
+class RoutingCosts:
+    """Costs of connections, e.g. in minutes."""
+
+    # Ride between neighboring stations of a line.
+    next_cost: float = 2.0
+
+    # Additional ride cost per kilometer of distance between stations, if their positions are known.
+    next_cost_per_kilometer: float = 0.0
+
+    # Transfer between stations.
+    transition_cost: float = 5.0
+
+    # Move between stations that are the same station on different lines.
+    same_cost: float = 0.0
+
+    def get_base_costs(self) -> np.ndarray:
+        """Get fixed costs by connection type codes."""
+        costs: dict[ConnectionType, float] = {
+            ConnectionType.NEXT: self.next_cost,
+            ConnectionType.TRANSITION: self.transition_cost,
+            ConnectionType.SAME: self.same_cost,
+        }
+        return np.array([costs[x] for x in CONNECTION_TYPES], dtype=np.float64)
+
+
+@dataclass
+class Route:
+    """Route between two stations."""
+
+    # Identifiers of stations from the first one to the last one.
+    station_ids: list[str]
+
+    # Types of connections between consecutive stations.
+    connection_types: list[ConnectionType] = field(default_factory=list)
+
+    cost: float = 0.0
+
+    def get_transfer_count(self) -> int:
+        return sum(1 for x in self.connection_types if x == ConnectionType.TRANSITION)
+
+
+class Router:
+    """
+    Route search over system compiled once, for many queries. Changes of the system after router is created are not
+    taken into account.
+    """
+
+    def __init__(self, system: System, costs: Optional[RoutingCosts] = None, exclude_hidden: bool = False) -> None:
+        """
+        :param system: transport system
+        :param costs: connection costs, default ones if not specified
+        :param exclude_hidden: do not use stations and connections that are not currently in operation
+        :raises ValueError: if some connection costs are negative
+        """
+        self.costs: RoutingCosts = costs if costs else RoutingCosts()
+        self.graph: Graph = build_graph(system)
+        stations: list[Station] = list(system.stations.values())
+
+        # Positions of stations in degrees, NaN if unknown.
+        self.positions: np.ndarray = np.array(
+            [x.geo_position if x.geo_position is not None else (np.nan, np.nan) for x in stations], dtype=np.float64
+        ).reshape(-1, 2)
+
+        sources: np.ndarray = self.graph.get_sources()
+        targets: np.ndarray = self.graph.targets
+        is_dangling: np.ndarray = targets == DANGLING
+
+        # Lengths of connections in meters, NaN if unknown.
+        lengths: np.ndarray = np.full(len(targets), np.nan)
+        known: np.ndarray = ~is_dangling
+        lengths[known] = get_distances(
+            self.positions[sources[known], 0],
+            self.positions[sources[known], 1],
+            self.positions[targets[known], 0],
+            self.positions[targets[known], 1],
+        )
+
+        weights: np.ndarray = self.costs.get_base_costs()[self.graph.types]
+        is_next: np.ndarray = self.graph.types == CONNECTION_TYPE_CODES[ConnectionType.NEXT]
+        weights[is_next] += np.nan_to_num(lengths[is_next]) / 1000.0 * self.costs.next_cost_per_kilometer
+        if np.any(weights < 0.0):
+            raise ValueError("connection costs should not be negative")
+        self.graph.weights = weights
+
+        # Connections that cannot be used have infinite cost.
+        unusable: np.ndarray = is_dangling.copy()
+        self.is_hidden: list[bool] = [exclude_hidden and x.is_hidden() for x in stations]
+        if exclude_hidden:
+            hidden_stations: np.ndarray = np.array(self.is_hidden, dtype=bool)
+            hidden_connections: np.ndarray = np.array(
+                [bool(y.is_hidden()) for x in stations for y in x.connections], dtype=bool
+            )
+            unusable |= hidden_connections | hidden_stations[sources]
+            unusable[known] |= hidden_stations[targets[known]]
+
+        search_weights: np.ndarray = weights.copy()
+        search_weights[unusable] = np.inf
+
+        # Heuristic cost per meter of distance: the lowest ratio of connection cost to its length.
+        self.cost_per_meter: Optional[float] = None
+        if not np.isnan(self.positions).any():
+            usable: np.ndarray = ~unusable & (lengths > 0.0)
+            if usable.any():
+                # Slightly lower ratio keeps heuristic consistent despite rounding errors.
+                self.cost_per_meter = float(np.min(weights[usable] / lengths[usable])) * (1.0 - 1e-9)
+            else:
+                self.cost_per_meter = 0.0
+
+        # Python lists are faster than arrays for element access in the search loop.
+        self.offsets: list[int] = self.graph.offsets.tolist()
+        self.targets: list[int] = targets.tolist()
+        self.weights: list[float] = search_weights.tolist()
+        self.sources: list[int] = sources.tolist()
+        # Unknown points are never used by heuristic, zeros keep heuristic terms finite.
+        self.points: list[tuple[float, float, float]] = [
+            tuple(x) for x in np.nan_to_num(get_cartesian(self.positions[:, 0], self.positions[:, 1])).tolist()
+        ]
+
+    def get_costs(self, source: int, limit: float = math.inf) -> np.ndarray:
+        """
+        Get costs of the cheapest routes from station to all stations with Dijkstra search.
+
+        :param source: index of source station in the graph
+        :param limit: do not search routes more expensive than that
+        :return: costs by station indices, infinity for unreachable stations
+        """
+        costs: np.ndarray = np.full(len(self.graph), np.inf)
+        if self.is_hidden[source]:
+            return costs
+
+        best: dict[int, float] = {source: 0.0}
+        queue: list[tuple[float, int]] = [(0.0, source)]
+        offsets, targets, weights = self.offsets, self.targets, self.weights
+
+        while queue:
+            cost, node = heapq.heappop(queue)
+            if cost > best[node]:
+                continue
+            costs[node] = cost
+            for edge in range(offsets[node], offsets[node + 1]):
+                new_cost: float = cost + weights[edge]
+                target: int = targets[edge]
+                if new_cost <= limit and new_cost < best.get(target, math.inf):
+                    best[target] = new_cost
+                    heapq.heappush(queue, (new_cost, target))
+
+        return costs
+
+    def route(self, from_id: str, to_id: str) -> Optional[Route]:
+        """
+        Find the cheapest route between stations.
+
+        :param from_id: identifier of the first station
+        :param to_id: identifier of the last station
+        :return: route or None if there is no route
+        :raises KeyError: if there is no such station
+        """
+        source: int = self.graph.get_index(from_id)
+        destination: int = self.graph.get_index(to_id)
+        if self.is_hidden[source] or self.is_hidden[destination]:
+            return None
+
+        offsets, targets, weights = self.offsets, self.targets, self.weights
+        cost_per_meter: float = self.cost_per_meter if self.cost_per_meter else 0.0
+        points: list[tuple[float, float, float]] = self.points
+        goal: tuple[float, float, float] = points[destination]
+
+        best: dict[int, float] = {source: 0.0}
+        # Edges the cheapest routes come to stations by.
+        previous: dict[int, int] = {}
+        queue: list[tuple[float, float, int]] = [(0.0, 0.0, source)]
+
+        while queue:
+            _, cost, node = heapq.heappop(queue)
+            if node == destination:
+                return self.get_route(source, destination, previous, cost)
+            if cost > best[node]:
+                continue
+            for edge in range(offsets[node], offsets[node + 1]):
+                new_cost: float = cost + weights[edge]
+                target: int = targets[edge]
+                if new_cost < best.get(target, math.inf):
+                    best[target] = new_cost
+                    previous[target] = edge
+                    heapq.heappush(
+                        queue, (new_cost + cost_per_meter * math.dist(points[target], goal), new_cost, target)
+                    )
+
+        return None
+
+    def get_route(self, source: int, destination: int, previous: dict[int, int], cost: float) -> Route:
+        """Restore route from edges the cheapest routes come to stations by."""
+        edges: list[int] = []
+        node: int = destination
+        while node != source:
+            edges.append(previous[node])
+            node = self.sources[previous[node]]
+        edges.reverse()
+
+        return Route(
+            [self.graph.station_ids[source]] + [self.graph.station_ids[self.targets[x]] for x in edges],
+            [CONNECTION_TYPES[x] for x in self.graph.types[edges].tolist()],
+            cost,
+        )
+
+
+# Router of worker process of `travel_time_matrix`.
+_worker_router: Optional[Router] = None
+
+
+def _initialize_worker(router: Router) -> None:
+    global _worker_router
+    _worker_router = router
+
+
+def _compute_rows(sources: list[int]) -> tuple[list[int], np.ndarray]:
+    return sources, np.stack([_worker_router.get_costs(x) for x in sources])
+
+
+def travel_time_matrix(
+    system: System,
+    source_ids: Optional[list[str]] = None,
+    costs: Optional[RoutingCosts] = None,
+    exclude_hidden: bool = False,
+    processes: Optional[int] = None,
+    output_path: Optional[Path] = None,
+    chunk_size: int = 16,
+) -> np.ndarray:
+    """
+    Compute costs of the cheapest routes from source stations to all stations, with one Dijkstra search per source
+    station in a process pool.
+
+    :param system: transport system
+    :param source_ids: identifiers of source stations, all stations by default
+    :param costs: connection costs, default ones if not specified
+    :param exclude_hidden: do not use stations and connections that are not currently in operation
+    :param processes: number of worker processes, number of CPUs by default; 1 to compute in current process
+    :param output_path: path to `.npy` file to write matrix to, it is returned memory-mapped then, so that the matrix
+        is never held in memory as a whole
+    :param chunk_size: number of source stations sent to worker process at once
+    :return: matrix of costs with rows for source stations and columns for stations in the order of `System.stations`,
+        infinity for unreachable stations
+    :raises KeyError: if there is no such source station
+    """
+    router: Router = Router(system, costs, exclude_hidden)
+    sources: list[int] = (
+        [router.graph.get_index(x) for x in source_ids] if source_ids is not None else list(range(len(router.graph)))
+    )
+    shape: tuple[int, int] = len(sources), len(router.graph)
+
+    matrix: np.ndarray
+    if output_path:
+        matrix = np.lib.format.open_memmap(output_path, mode="w+", dtype=np.float64, shape=shape)
+    else:
+        matrix = np.empty(shape, dtype=np.float64)
+
+    # Rows of matrix by source station indices; source stations may repeat.
+    rows: dict[int, list[int]] = {}
+    for row, source in enumerate(sources):
+        rows.setdefault(source, []).append(row)
+    unique_sources: list[int] = list(rows)
+    chunks: list[list[int]] = [unique_sources[x : x + chunk_size] for x in range(0, len(unique_sources), chunk_size)]
+
+    def store(chunk: list[int], values: np.ndarray) -> None:
+        for source, row_values in zip(chunk, values):
+            matrix[rows[source]] = row_values
+
+    if processes == 1:
+        for chunk in chunks:
+            store(chunk, np.stack([router.get_costs(x) for x in chunk]))
+    else:
+        with multiprocessing.Pool(processes, _initialize_worker, (router,)) as pool:
+            for chunk, values in pool.imap_unordered(_compute_rows, chunks):
+                store(chunk, values)
+
+    if isinstance(matrix, np.memmap):
+        matrix.flush()
+
+    return matrix
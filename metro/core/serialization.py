@@ -1,6 +1,8 @@
+from dataclasses import fields
 from datetime import datetime
 from enum import Enum
-from typing import Any
+from functools import cache
+from typing import Any, Callable
 
 __author__ = "Sergey Vartanov"
 __email__ = "me@enzet.ru"
@@ -13,31 +15,89 @@ def is_null(value):
     return value is None or value == {} or value == []
 
 
+@cache
+def get_field_names(class_: type) -> tuple[str, ...]:
+    """Get names of dataclass fields, computed once per class."""
+    return tuple(x.name for x in fields(class_))
+
+
+def _identity(value: Any) -> Any:
+    return value
+
+
+def _serialize_list(value: Any) -> list:
+    return [serialize(x) for x in value]
+
+
+def _serialize_dict(value: dict) -> dict:
+    return {x: serialize(y) for x, y in value.items()}
+
+
+def _serialize_datetime(value: datetime) -> str:
+    return value.strftime(TIME_FORMAT)
+
+
+def _serialize_enum(value: Enum) -> Any:
+    return value.value
+
+
+def _serialize_object(value: Any) -> Any:
+    return value.serialize()
+
+
+def _get_serializer(class_: type) -> Callable[[Any], Any]:
+    """Choose serialization function for values of the class (checks are in the order of `serialize` branches)."""
+    if issubclass(class_, (str, int, float)):
+        return _identity
+    if issubclass(class_, (list, tuple)):
+        return _serialize_list
+    if issubclass(class_, dict):
+        return _serialize_dict
+    if issubclass(class_, datetime):
+        return _serialize_datetime
+    if issubclass(class_, Enum):
+        return _serialize_enum
+    return _serialize_object
+
+
+def _deserialize_list(value: list) -> list:
+    return [deserialize(x) for x in value]
+
+
+def _deserialize_dict(value: dict) -> dict:
+    return {x: deserialize(y) for x, y in value.items()}
+
+
+def _deserialize_object(value: Any) -> Any:
+    return value.deserialize()
+
+
+def _get_deserializer(class_: type) -> Callable[[Any], Any]:
+    if issubclass(class_, (str, int, float)):
+        return _identity
+    if issubclass(class_, list):
+        return _deserialize_list
+    if issubclass(class_, dict):
+        return _deserialize_dict
+    return _deserialize_object
+
+
+# Serialization functions by exact value classes, filled on first value of each class.
+_serializers: dict[type, Callable[[Any], Any]] = {}
+_deserializers: dict[type, Callable[[Any], Any]] = {}
+
+
 def serialize(value: Any) -> Any:
     """Serialize primitive value."""
-    for type_ in str, int, float:
-        if isinstance(value, type_):
-            return value
-    if isinstance(value, list):
-        return [serialize(x) for x in value]
-    if isinstance(value, tuple):
-        return [serialize(x) for x in value]
-    if isinstance(value, dict):
-        return {x: serialize(y) for x, y in value.items()}
-    if isinstance(value, datetime):
-        return value.strftime(TIME_FORMAT)
-    if isinstance(value, Enum):
-        return value.value
-    return value.serialize()
+    class_: type = value.__class__
+    if (function := _serializers.get(class_)) is None:
+        function = _serializers[class_] = _get_serializer(class_)
+    return function(value)
 
 
 def deserialize(value: Any) -> Any:
     """Deserialize primitive value."""
-    for type_ in str, int, float:
-        if isinstance(value, type_):
-            return value
-    if isinstance(value, list):
-        return [deserialize(x) for x in value]
-    if isinstance(value, dict):
-        return {x: deserialize(y) for x, y in value.items()}
-    return value.deserialize()
+    class_: type = value.__class__
+    if (function := _deserializers.get(class_)) is None:
+        function = _deserializers[class_] = _get_deserializer(class_)
+    return function(value)
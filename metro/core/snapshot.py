@@ -0,0 +1,467 @@
+"""
+Binary snapshots of transport maps and systems.
+
+Snapshots are faster to load than JSON files: identifiers, names, and other strings are stored once in a string table,
+numeric station fields are stored in packed arrays, and connections refer to stations by their indices. Loading a
+snapshot gives the same result as deserializing the serialized system from JSON.
+
+File layout (numbers are little-endian):
+
+    magic `METROSNP`, format version (uint32), header size (uint32),
+    header: UTF-8 JSON with map and system fields, lines, and positions of system sections,
+    sections: arrays of system stations and station indexes, each aligned to 8 bytes.
+"""
+
+import struct
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Optional, Union
+
+import numpy as np
+
+from metro.core import json_backend
+from metro.core.line import Line
+from metro.core.serialization import TIME_FORMAT, deserialize
+from metro.core.station import Connection, ConnectionType, Station
+from metro.core.system import Map, System
+
+__author__ = "Sergey Vartanov"
+__email__ = "me@enzet.ru"
+
+
+MAGIC: bytes = b"METROSNP"
+VERSION: int = 1
+PREFIX_FORMAT: str = "<8sII"
+ALIGNMENT: int = 8
+
+# Index of absent string.
+NO_INDEX: int = 0xFFFFFFFF
+
+# Kinds of numeric values, that are stored as float64.
+KIND_NONE: int = 0
+KIND_FLOAT: int = 1
+KIND_INT: int = 2
+
+# Integers that are represented by float64 exactly.
+MAX_EXACT_INTEGER: int = 2**53
+MIN_INT64: int = -(2**63)
+MAX_INT64: int = 2**63 - 1
+
+# Numeric station fields, geographical position is stored as latitude and longitude.
+NUMBER_FIELDS: list[str] = [
+    "altitude",
+    "height",
+    "platform_length",
+    "wikidata_id",
+    "structure_type",
+    "latitude",
+    "longitude",
+]
+
+# Station record: string indices, and positions of names, site links, and connections in their arrays.
+STATION_DTYPE: np.dtype = np.dtype(
+    [
+        ("id", "<u4"),
+        ("line", "<u4"),
+        ("open_time", "<u4"),
+        ("caption", "<u4"),
+        ("status", "<u4"),
+        ("extra", "<u4"),
+        ("names_start", "<u4"),
+        ("names_count", "<u4"),
+        ("site_links_start", "<u4"),
+        ("site_links_count", "<u4"),
+        ("connections_start", "<u4"),
+        ("connections_count", "<u4"),
+    ]
+)
+# Connection record: index of target station, string indices of type and JSON status.
+CONNECTION_DTYPE: np.dtype = np.dtype([("to", "<u4"), ("type", "<u4"), ("status", "<u4")])
+PAIR_DTYPE: np.dtype = np.dtype("<u4")
+INDEX_DTYPE: np.dtype = np.dtype("<u4")
+WIKIDATA_ID_DTYPE: np.dtype = np.dtype("<i8")
+OFFSET_DTYPE: np.dtype = np.dtype("<u8")
+NUMBER_DTYPE: np.dtype = np.dtype("<f8")
+KIND_DTYPE: np.dtype = np.dtype("u1")
+
+
+class StringTable:
+    """Unique strings with their indices."""
+
+    def __init__(self) -> None:
+        self.indices: dict[str, int] = {}
+
+    def add(self, text: Optional[str]) -> int:
+        if text is None:
+            return NO_INDEX
+        return self.indices.setdefault(text, len(self.indices))
+
+    def add_json(self, value: Any) -> int:
+        """Add JSON representation of the value, nothing if value is None."""
+        return NO_INDEX if value is None else self.add(json_backend.dumps(value).decode())
+
+    def encode(self) -> tuple[bytes, bytes]:
+        """Get byte offsets of strings (including the end of the last one) and concatenated UTF-8 strings."""
+        encoded: list[bytes] = [x.encode() for x in self.indices]
+        offsets: np.ndarray = np.zeros(len(encoded) + 1, dtype=OFFSET_DTYPE)
+        np.cumsum([len(x) for x in encoded], out=offsets[1:])
+        return offsets.tobytes(), b"".join(encoded)
+
+
+def decode_strings(offsets: np.ndarray, data: bytes) -> list[str]:
+    bounds: list[int] = offsets.tolist()
+    return [data[start:end].decode() for start, end in zip(bounds, bounds[1:])]
+
+
+def encode_number(value: Any) -> Optional[tuple[float, int]]:
+    """Get float64 value and kind of numeric value, None if it cannot be stored as number exactly."""
+    if value is None:
+        return 0.0, KIND_NONE
+    if type(value) is float:
+        return value, KIND_FLOAT
+    if type(value) is int and abs(value) <= MAX_EXACT_INTEGER:
+        return float(value), KIND_INT
+    return None
+
+
+def decode_number(value: float, kind: int) -> Union[float, int, None]:
+    if kind == KIND_FLOAT:
+        return value
+    if kind == KIND_INT:
+        return int(value)
+    return None
+
+
+def is_string_dictionary(value: Any) -> bool:
+    return isinstance(value, dict) and all(isinstance(x, str) for x in value.values())
+
+
+def encode_system(system: System) -> tuple[dict[str, Any], dict[str, bytes]]:
+    """
+    Encode system into header structure and sections.
+
+    Stations are encoded from their serialized structures, so that everything JSON file would contain is preserved.
+    Values that do not fit into snapshot arrays (e.g. non-numeric altitude) are stored as JSON.
+
+    :raises ValueError: if stations refer to lines or stations that are not in the system
+    """
+    strings: StringTable = StringTable()
+    station_indices: dict[str, int] = {x.id_: index for index, x in enumerate(system.stations.values())}
+
+    records: list[tuple] = []
+    numbers: list[list[float]] = []
+    kinds: list[list[int]] = []
+    pairs: list[int] = []
+    connections: list[tuple[int, int, int]] = []
+    wikidata_entries: list[tuple[int, int]] = []
+    line_groups: dict[str, list[int]] = {x: [] for x in system.lines}
+
+    for index, station in enumerate(system.stations.values()):
+        structure: dict[str, Any] = station.serialize()
+        structure.pop("id")
+        structure.pop("id_")
+        extra: dict[str, Any] = {}
+
+        line_id: Optional[str] = structure.pop("line", None)
+        if line_id is not None:
+            if line_id not in system.lines:
+                raise ValueError(f"unknown line {line_id} of station {station.id_}")
+            line_groups[line_id].append(index)
+
+        wikidata_id: Any = structure.get("wikidata_id")
+        if type(wikidata_id) is int and MIN_INT64 <= wikidata_id <= MAX_INT64:
+            wikidata_entries.append((wikidata_id, index))
+
+        caption: Any = structure.pop("caption", None)
+        if caption is not None and not isinstance(caption, str):
+            extra["caption"] = caption
+            caption = None
+
+        dictionaries: list[tuple[int, int]] = []
+        for key in "names", "site_links":
+            value: dict = structure.pop(key, {})
+            if not is_string_dictionary(value):
+                extra[key] = value
+                value = {}
+            dictionaries.append((len(pairs) // 2, len(value)))
+            for name, text in value.items():
+                pairs += [strings.add(name), strings.add(text)]
+
+        encoded_numbers: list[tuple[float, int]] = []
+        for key in NUMBER_FIELDS[:-2]:
+            number: Any = structure.pop(key, None)
+            if (encoded := encode_number(number)) is None:
+                extra[key] = number
+                encoded = 0.0, KIND_NONE
+            encoded_numbers.append(encoded)
+
+        geo_position: Any = structure.pop("geo_position", None)
+        encoded_position: list[tuple[float, int]] = [(0.0, KIND_NONE)] * 2
+        if geo_position is not None:
+            if (
+                isinstance(geo_position, list)
+                and len(geo_position) == 2
+                and None not in geo_position
+                and None not in (encoded := [encode_number(x) for x in geo_position])
+            ):
+                encoded_position = encoded
+            else:
+                extra["geo_position"] = geo_position
+
+        number_row: list[float] = [x for x, _ in encoded_numbers + encoded_position]
+        kind_row: list[int] = [x for _, x in encoded_numbers + encoded_position]
+        numbers.append(number_row)
+        kinds.append(kind_row)
+
+        connections_start: int = len(connections)
+        for connection in structure.pop("connections", []):
+            if connection["to"] not in station_indices:
+                raise ValueError(f"unknown connection target {connection['to']} of station {station.id_}")
+            connections.append(
+                (
+                    station_indices[connection["to"]],
+                    strings.add(connection["type"]),
+                    strings.add_json(connection.get("status")),
+                )
+            )
+
+        records.append(
+            (
+                strings.add(station.id_),
+                strings.add(line_id),
+                strings.add(structure.pop("open_time", None)),
+                strings.add(caption),
+                strings.add_json(structure.pop("status", None)),
+                strings.add_json((extra | structure) or None),
+                *dictionaries[0],
+                *dictionaries[1],
+                connections_start,
+                len(connections) - connections_start,
+            )
+        )
+
+    string_offsets, string_data = strings.encode()
+    ids: list[str] = [x.id_ for x in system.stations.values()]
+    wikidata_entries.sort(key=lambda x: x[0])
+
+    sections: dict[str, bytes] = {
+        "string_offsets": string_offsets,
+        "strings": string_data,
+        "stations": np.array(records, dtype=STATION_DTYPE).tobytes(),
+        "numbers": np.array(numbers, dtype=NUMBER_DTYPE).tobytes(),
+        "number_kinds": np.array(kinds, dtype=KIND_DTYPE).tobytes(),
+        "pairs": np.array(pairs, dtype=PAIR_DTYPE).tobytes(),
+        "connections": np.array(connections, dtype=CONNECTION_DTYPE).tobytes(),
+        # Indexes: station indices sorted by identifiers, sorted Wikidata identifiers with station indices (in the
+        # order of stations for equal identifiers), and station indices grouped by lines.
+        "id_order": np.array(sorted(range(len(ids)), key=ids.__getitem__), dtype=INDEX_DTYPE).tobytes(),
+        "wikidata_ids": np.array([x for x, _ in wikidata_entries], dtype=WIKIDATA_ID_DTYPE).tobytes(),
+        "wikidata_order": np.array([x for _, x in wikidata_entries], dtype=INDEX_DTYPE).tobytes(),
+        "line_stations": np.array([x for group in line_groups.values() for x in group], dtype=INDEX_DTYPE).tobytes(),
+    }
+    line_ranges: dict[str, tuple[int, int]] = {}
+    start: int = 0
+    for line_id, group in line_groups.items():
+        line_ranges[line_id] = start, len(group)
+        start += len(group)
+
+    header: dict[str, Any] = {
+        # The same fields as `System.serialize` writes besides stations and lines.
+        "fields": {"id": system.id_} | ({"line_width": system.line_width} if system.line_width else {}),
+        "lines": [x.serialize() for x in system.lines.values()],
+        "counts": {
+            "strings": len(strings.indices),
+            "stations": len(records),
+            "pairs": len(pairs) // 2,
+            "connections": len(connections),
+        },
+        "line_ranges": line_ranges,
+    }
+    return header, sections
+
+
+class SnapshotSections:
+    """Arrays of one system in snapshot data."""
+
+    def __init__(self, header: dict[str, Any], data: Union[bytes, memoryview]) -> None:
+        """
+        :param header: system header structure
+        :param data: snapshot data, sections are read without copying it
+        """
+        self.header: dict[str, Any] = header
+        self.data: Union[bytes, memoryview] = data
+
+        self.string_offsets: np.ndarray = self.get_array("string_offsets", OFFSET_DTYPE)
+        self.stations: np.ndarray = self.get_array("stations", STATION_DTYPE)
+        self.numbers: np.ndarray = self.get_array("numbers", NUMBER_DTYPE).reshape(-1, len(NUMBER_FIELDS))
+        self.number_kinds: np.ndarray = self.get_array("number_kinds", KIND_DTYPE).reshape(-1, len(NUMBER_FIELDS))
+        self.pairs: np.ndarray = self.get_array("pairs", PAIR_DTYPE).reshape(-1, 2)
+        self.connections: np.ndarray = self.get_array("connections", CONNECTION_DTYPE)
+        self.id_order: np.ndarray = self.get_array("id_order", INDEX_DTYPE)
+        self.wikidata_ids: np.ndarray = self.get_array("wikidata_ids", WIKIDATA_ID_DTYPE)
+        self.wikidata_order: np.ndarray = self.get_array("wikidata_order", INDEX_DTYPE)
+        self.line_stations: np.ndarray = self.get_array("line_stations", INDEX_DTYPE)
+        self.strings: Union[bytes, memoryview] = self.get_bytes("strings")
+
+    def get_string(self, index: int) -> Optional[str]:
+        """Decode string from string table, None for `NO_INDEX`."""
+        if index == NO_INDEX:
+            return None
+        return str(self.strings[int(self.string_offsets[index]) : int(self.string_offsets[index + 1])], "utf-8")
+
+    def get_bytes(self, name: str) -> Union[bytes, memoryview]:
+        offset, size = self.header["sections"][name]
+        return self.data[offset : offset + size]
+
+    def get_array(self, name: str, dtype: np.dtype) -> np.ndarray:
+        return np.frombuffer(self.get_bytes(name), dtype=dtype)
+
+
+def decode_system(header: dict[str, Any], data: Union[bytes, memoryview]) -> System:
+    """Create system with the same content as `System.deserialize` would create from its JSON structure."""
+    sections: SnapshotSections = SnapshotSections(header, data)
+    strings: list[str] = decode_strings(sections.string_offsets, bytes(sections.strings))
+
+    system: System = System({}, "")
+    for structure in header["lines"]:
+        system.lines[structure["id"]] = Line({}, structure["id"]).deserialize(structure)
+
+    pairs: list[tuple[int, int]] = [tuple(x) for x in sections.pairs.tolist()]
+    open_times: dict[int, datetime] = {}
+    stations: list[Station] = []
+
+    for record, number_row, kind_row in zip(
+        sections.stations.tolist(), sections.numbers.tolist(), sections.number_kinds.tolist()
+    ):
+        id_, line, open_time, caption, status, extra, names_start, names_count, site_links_start, site_links_count = (
+            record[:10]
+        )
+        altitude, height, platform_length, wikidata_id, structure_type, latitude, longitude = (
+            decode_number(x, y) for x, y in zip(number_row, kind_row)
+        )
+        if open_time != NO_INDEX and open_time not in open_times:
+            open_times[open_time] = datetime.strptime(strings[open_time], TIME_FORMAT)
+
+        station: Station = Station(
+            {strings[x]: strings[y] for x, y in pairs[names_start : names_start + names_count]},
+            strings[id_],
+            open_time=open_times.get(open_time),
+            altitude=altitude,
+            height=height,
+            structure_type=structure_type,
+            geo_position=None if latitude is None else [latitude, longitude],
+            caption=None if caption == NO_INDEX else strings[caption],
+            status={} if status == NO_INDEX else json_backend.loads(strings[status]),
+            platform_length=platform_length,
+            site_links={
+                strings[x]: strings[y] for x, y in pairs[site_links_start : site_links_start + site_links_count]
+            },
+            wikidata_id=wikidata_id,
+            line=None if line == NO_INDEX else system.lines[strings[line]],
+        )
+        if extra != NO_INDEX:
+            for key, value in json_backend.loads(strings[extra]).items():
+                setattr(station, key, deserialize(value))
+
+        system.add_station(station)
+        stations.append(station)
+
+    connections: list[tuple[int, int, int]] = sections.connections.tolist()
+    connection_types: dict[int, ConnectionType] = {}
+    for station, record in zip(stations, sections.stations.tolist()):
+        start, count = record[10:]
+        for to_, type_, status in connections[start : start + count]:
+            if type_ not in connection_types:
+                connection_types[type_] = ConnectionType(strings[type_])
+            station.connections.append(
+                Connection(
+                    stations[to_],
+                    connection_types[type_],
+                    None if status == NO_INDEX else json_backend.loads(strings[status]),
+                )
+            )
+
+    for key, value in header["fields"].items():
+        system.deserialize_field(key, value)
+
+    return system
+
+
+def align(offset: int) -> int:
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def save_snapshot(value: Union[Map, System], path: Path) -> None:
+    """
+    Write binary snapshot of map or system.
+
+    :param value: map with its systems or single system
+    :param path: output file path
+    :raises ValueError: if stations refer to lines or stations that are not in their system
+    """
+    systems: dict[str, System] = value.systems if isinstance(value, Map) else {value.id_: value}
+
+    header: dict[str, Any] = {"systems": []}
+    if isinstance(value, Map):
+        header["map"] = {"id": value.id_, "names": value.names, "local_languages": value.local_languages}
+
+    blobs: list[bytes] = []
+    offset: int = 0
+    for key, system in systems.items():
+        system_header, sections = encode_system(system)
+        system_header["key"] = key
+        system_header["sections"] = {}
+        for name, data in sections.items():
+            system_header["sections"][name] = [offset, len(data)]
+            padding: int = align(offset + len(data)) - offset - len(data)
+            blobs += [data, b"\0" * padding]
+            offset += len(data) + padding
+        header["systems"].append(system_header)
+
+    header_data: bytes = json_backend.dumps(header)
+    prefix_size: int = struct.calcsize(PREFIX_FORMAT)
+    header_padding: int = align(prefix_size + len(header_data)) - prefix_size - len(header_data)
+
+    with path.open("wb") as output_file:
+        output_file.write(struct.pack(PREFIX_FORMAT, MAGIC, VERSION, len(header_data) + header_padding))
+        output_file.write(header_data + b" " * header_padding)
+        for blob in blobs:
+            output_file.write(blob)
+
+
+def read_header(data: Union[bytes, memoryview]) -> tuple[dict[str, Any], int]:
+    """
+    Read snapshot header.
+
+    :return: header structure and offset of sections
+    :raises ValueError: if data is not a snapshot of supported version
+    """
+    prefix_size: int = struct.calcsize(PREFIX_FORMAT)
+    if len(data) < prefix_size:
+        raise ValueError("not a snapshot")
+    magic, version, header_size = struct.unpack_from(PREFIX_FORMAT, data)
+    if magic != MAGIC:
+        raise ValueError("not a snapshot")
+    if version != VERSION:
+        raise ValueError(f"unsupported snapshot version {version}")
+    return json_backend.loads(bytes(data[prefix_size : prefix_size + header_size])), prefix_size + header_size
+
+
+def load_snapshot(path: Path) -> Union[Map, System]:
+    """
+    Read binary snapshot.
+
+    :param path: snapshot file path
+    :return: map if map was saved, system otherwise
+    :raises ValueError: if file is not a snapshot of supported version
+    """
+    data: bytes = path.read_bytes()
+    header, offset = read_header(data)
+    sections_data: memoryview = memoryview(data)[offset:]
+
+    systems: dict[str, System] = {x["key"]: decode_system(x, sections_data) for x in header["systems"]}
+    if "map" not in header:
+        return next(iter(systems.values()))
+
+    map_structure: dict[str, Any] = header["map"]
+    return Map(map_structure["id"], map_structure["names"], systems, map_structure["local_languages"])
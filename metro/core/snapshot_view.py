@@ -0,0 +1,352 @@
+"""
+Read-only views of memory-mapped snapshots.
+
+Snapshot file is mapped into memory and station fields are decoded from it only when they are accessed. Mapped pages
+are shared between processes through the page cache, so several processes may serve one large system at the memory
+cost of one copy of the file.
+"""
+
+import mmap
+import weakref
+from collections import OrderedDict
+from collections.abc import Iterator, Mapping
+from datetime import datetime
+from functools import cached_property
+from pathlib import Path
+from types import TracebackType
+from typing import Any, Optional, Union
+
+import numpy as np
+
+from metro.core import json_backend
+from metro.core.line import Line
+from metro.core.named import Named
+from metro.core.serialization import TIME_FORMAT, deserialize
+from metro.core.snapshot import NO_INDEX, NUMBER_FIELDS, SnapshotSections, decode_number, read_header
+from metro.core.station import Connection, ConnectionType, Station
+from metro.core.system import DEFAULT_STYLE_ID, get_short_ids
+
+__author__ = "Sergey Vartanov"
+__email__ = "me@enzet.ru"
+
+
+NUMBER_COLUMNS: dict[str, int] = {x: index for index, x in enumerate(NUMBER_FIELDS)}
+
+# Number of recently used station views kept with their decoded fields.
+DEFAULT_VIEW_CACHE_SIZE: int = 10_000
+
+
+class StationView:
+    """
+    Read-only station of snapshot. Fields have the same values as fields of station loaded with `load_snapshot`, and
+    are decoded on first access.
+    """
+
+    def __init__(self, system: "SystemView", index: int) -> None:
+        """
+        :param system: system view the station belongs to
+        :param index: index of the station in the snapshot
+        """
+        self.system: SystemView = system
+        self.index: int = index
+        self._captions: dict[str, tuple[str, str]] = {}
+
+    def __eq__(self, other: Any) -> bool:
+        return isinstance(other, StationView) and other.system is self.system and other.index == self.index
+
+    def __hash__(self) -> int:
+        return hash((id(self.system), self.index))
+
+    def __repr__(self) -> str:
+        return f"StationView({self.id_!r})"
+
+    # Station methods that only read fields.
+    has_name = Named.has_name
+    get_name = Named.get_name
+    short_id = Station.short_id
+    get_save_id = Station.get_save_id
+    get_caption = Station.get_caption
+    get_connections = Station.get_connections
+    is_terminus = Station.is_terminus
+    is_transition = Station.is_transition
+    is_hidden = Station.is_hidden
+
+    @cached_property
+    def record(self) -> tuple:
+        """String indices and array positions of station fields, see `snapshot.STATION_DTYPE`."""
+        return self.system.sections.stations[self.index].tolist()
+
+    @cached_property
+    def extra(self) -> dict[str, Any]:
+        """Fields that are stored as JSON, they override fields in snapshot arrays."""
+        text: Optional[str] = self.system.sections.get_string(self.record[5])
+        if text is None:
+            return {}
+        return {x: deserialize(y) for x, y in json_backend.loads(text).items()}
+
+    def get_number(self, key: str) -> Any:
+        if key in self.extra:
+            return self.extra[key]
+        column: int = NUMBER_COLUMNS[key]
+        return decode_number(
+            float(self.system.sections.numbers[self.index, column]),
+            int(self.system.sections.number_kinds[self.index, column]),
+        )
+
+    def get_dictionary(self, key: str, start: int, count: int) -> dict[str, str]:
+        if key in self.extra:
+            return self.extra[key]
+        get_string = self.system.sections.get_string
+        return {get_string(x): get_string(y) for x, y in self.system.sections.pairs[start : start + count].tolist()}
+
+    @cached_property
+    def id_(self) -> str:
+        return self.system.sections.get_string(self.record[0])
+
+    @cached_property
+    def names(self) -> dict[str, str]:
+        return self.get_dictionary("names", self.record[6], self.record[7])
+
+    @cached_property
+    def line(self) -> Optional[Line]:
+        line_id: Optional[str] = self.system.sections.get_string(self.record[1])
+        return None if line_id is None else self.system.lines[line_id]
+
+    @cached_property
+    def open_time(self) -> Optional[datetime]:
+        text: Optional[str] = self.system.sections.get_string(self.record[2])
+        return None if text is None else datetime.strptime(text, TIME_FORMAT)
+
+    @cached_property
+    def altitude(self) -> Any:
+        return self.get_number("altitude")
+
+    @cached_property
+    def height(self) -> Any:
+        return self.get_number("height")
+
+    @cached_property
+    def structure_type(self) -> Any:
+        return self.get_number("structure_type")
+
+    @cached_property
+    def geo_position(self) -> Any:
+        if "geo_position" in self.extra:
+            return self.extra["geo_position"]
+        latitude: Optional[float] = self.get_number("latitude")
+        return None if latitude is None else [latitude, self.get_number("longitude")]
+
+    @cached_property
+    def caption(self) -> Any:
+        if "caption" in self.extra:
+            return self.extra["caption"]
+        return self.system.sections.get_string(self.record[3])
+
+    @cached_property
+    def connections(self) -> list[Connection]:
+        """Connections that lead to station views."""
+        sections: SnapshotSections = self.system.sections
+        start, count = self.record[10:]
+        return [
+            Connection(
+                self.system.get_station_by_index(to_),
+                ConnectionType(sections.get_string(type_)),
+                None if status == NO_INDEX else json_backend.loads(sections.get_string(status)),
+            )
+            for to_, type_, status in sections.connections[start : start + count].tolist()
+        ]
+
+    @cached_property
+    def status(self) -> Any:
+        if "status" in self.extra:
+            return self.extra["status"]
+        text: Optional[str] = self.system.sections.get_string(self.record[4])
+        return {} if text is None else json_backend.loads(text)
+
+    @cached_property
+    def platform_length(self) -> Any:
+        return self.get_number("platform_length")
+
+    @cached_property
+    def site_links(self) -> dict[str, str]:
+        return self.get_dictionary("site_links", self.record[8], self.record[9])
+
+    @cached_property
+    def wikidata_id(self) -> Any:
+        return self.get_number("wikidata_id")
+
+
+class StationViews(Mapping):
+    """Station views by station identifiers, in the order of stations in the system."""
+
+    def __init__(self, system: "SystemView") -> None:
+        self.system: SystemView = system
+
+    def __getitem__(self, station_id: str) -> StationView:
+        if (index := self.system.find_station_index(station_id)) is None:
+            raise KeyError(station_id)
+        return self.system.get_station_by_index(index)
+
+    def __iter__(self) -> Iterator[str]:
+        return (self.system.get_station_id(x) for x in range(len(self)))
+
+    def __len__(self) -> int:
+        return len(self.system.sections.stations)
+
+    def values(self) -> Iterator[StationView]:
+        return (self.system.get_station_by_index(x) for x in range(len(self)))
+
+
+class SystemView:
+    """Read-only transport system of snapshot with the same query methods as `System`."""
+
+    def __init__(
+        self, header: dict[str, Any], data: Union[bytes, memoryview], view_cache_size: int = DEFAULT_VIEW_CACHE_SIZE
+    ) -> None:
+        """
+        :param header: system header structure of the snapshot
+        :param data: snapshot sections data
+        :param view_cache_size: number of recently used station views kept with their decoded fields
+        """
+        self.header: dict[str, Any] = header
+        self.sections: SnapshotSections = SnapshotSections(header, data)
+
+        # Station views by indices: all views that are in use, so that there is one view per station, and recently
+        # used views, so that their decoded fields are reused by later queries.
+        self._views: weakref.WeakValueDictionary = weakref.WeakValueDictionary()
+        self._recent_views: OrderedDict[int, StationView] = OrderedDict()
+        self._view_cache_size: int = view_cache_size
+
+        self.id_: str = header["fields"]["id"]
+        self.line_width: Optional[float] = header["fields"].get("line_width")
+        self.style_id: Optional[str] = None
+        self.lines: dict[str, Line] = {x["id"]: Line({}, x["id"]).deserialize(x) for x in header["lines"]}
+        self.stations: StationViews = StationViews(self)
+
+    def get_style_id(self) -> str:
+        return self.style_id if self.style_id else DEFAULT_STYLE_ID
+
+    def get_station_by_index(self, index: int) -> StationView:
+        view: Optional[StationView] = self._views.get(index)
+        if view is None:
+            view = StationView(self, index)
+            self._views[index] = view
+        self._recent_views[index] = view
+        self._recent_views.move_to_end(index)
+        if len(self._recent_views) > self._view_cache_size:
+            self._recent_views.popitem(last=False)
+        return view
+
+    def get_station_id(self, index: int) -> str:
+        return self.sections.get_string(int(self.sections.stations[index]["id"]))
+
+    def find_station_index(self, station_id: str) -> Optional[int]:
+        """Find station index with binary search over stations sorted by identifiers."""
+        order: np.ndarray = self.sections.id_order
+        low, high = 0, len(order)
+        while low < high:
+            middle: int = (low + high) // 2
+            if self.get_station_id(int(order[middle])) < station_id:
+                low = middle + 1
+            else:
+                high = middle
+        if low < len(order) and self.get_station_id(int(order[low])) == station_id:
+            # Later station replaces earlier one with the same identifier, as in `System.add_station`.
+            while low + 1 < len(order) and self.get_station_id(int(order[low + 1])) == station_id:
+                low += 1
+            return int(order[low])
+        return None
+
+    def get_wikidata_range(self, station_wikidata_id: int) -> np.ndarray:
+        """Get indices of stations with Wikidata identifier, in the order of stations."""
+        if not isinstance(station_wikidata_id, int):
+            return self.sections.wikidata_order[:0]
+        start, end = np.searchsorted(self.sections.wikidata_ids, [station_wikidata_id, station_wikidata_id + 1])
+        return self.sections.wikidata_order[start:end]
+
+    def get_stations_by_short_id(self, station_short_id) -> list[StationView]:
+        return [
+            self.get_station_by_index(x)
+            for x in range(len(self.stations))
+            if station_short_id in get_short_ids(self.get_station_id(x))
+        ]
+
+    def get_station_by_wikidata_id(self, station_wikidata_id) -> Optional[StationView]:
+        indices: np.ndarray = self.get_wikidata_range(station_wikidata_id)
+        return self.get_station_by_index(int(indices[0])) if len(indices) else None
+
+    def get_station_by_line_and_wid(self, line_id, station_wikidata_id) -> Optional[StationView]:
+        for index in self.get_wikidata_range(station_wikidata_id).tolist():
+            station: StationView = self.get_station_by_index(index)
+            if station.line and station.line.id_ == line_id:
+                return station
+        return None
+
+    def get_stations_by_name(self, name: str, language: str) -> list[StationView]:
+        return [x for x in self.stations.values() if x.has_name(language) and x.get_caption(language) == name]
+
+    def get_stations_by_line(self, line: Line) -> list[StationView]:
+        if line.id_ not in self.header["line_ranges"]:
+            return []
+        start, count = self.header["line_ranges"][line.id_]
+        stations: list[StationView] = [
+            self.get_station_by_index(x) for x in self.sections.line_stations[start : start + count].tolist()
+        ]
+        return [x for x in stations if x.line == line]
+
+    def has_transitions(self) -> bool:
+        """If there is at least one transition station."""
+        types: list[int] = np.unique(self.sections.connections["type"]).tolist()
+        return any(self.sections.get_string(x) == ConnectionType.TRANSITION.value for x in types)
+
+    def get_captions(self, language: str) -> dict[str, str]:
+        """Get captions of all stations in the language by station identifiers."""
+        return {x.id_: x.get_caption(language) for x in self.stations.values()}
+
+    def get_station_unique_names(self, language: str) -> set[str]:
+        return set(self.get_captions(language).values())
+
+
+class SnapshotView:
+    """Memory-mapped snapshot file with read-only views of its systems."""
+
+    def __init__(self, path: Path) -> None:
+        """
+        :param path: snapshot file path
+        :raises ValueError: if file is not a snapshot of supported version
+        """
+        with path.open("rb") as input_file:
+            self.mapped: mmap.mmap = mmap.mmap(input_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        header, offset = read_header(self.mapped)
+        data: memoryview = memoryview(self.mapped)[offset:]
+
+        self.systems: dict[str, SystemView] = {x["key"]: SystemView(x, data) for x in header["systems"]}
+
+        # Map fields, absent if single system was saved.
+        map_structure: dict[str, Any] = header.get("map", {})
+        self.id_: Optional[str] = map_structure.get("id")
+        self.names: dict[str, str] = map_structure.get("names", {})
+        self.local_languages: list[str] = map_structure.get("local_languages", [])
+
+    def get_system_by_id(self, system_id: str) -> SystemView:
+        return self.systems[system_id]
+
+    def close(self) -> None:
+        """Unmap the file. Views of its systems and stations should not be used after that."""
+        for system in self.systems.values():
+            # Arrays refer to mapped memory, which cannot be unmapped while they exist.
+            del system.sections
+        self.systems = {}
+        self.mapped.close()
+
+    def __enter__(self) -> "SnapshotView":
+        return self
+
+    def __exit__(
+        self,
+        exception_type: Optional[type[BaseException]],
+        exception: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        self.close()
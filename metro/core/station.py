@@ -1,5 +1,5 @@
 import logging
-from dataclasses import dataclass, field, fields
+from dataclasses import dataclass, field
 from datetime import datetime
 from enum import Enum
 from typing import Any, Optional
@@ -7,12 +7,67 @@ from typing import Any, Optional
 from metro.core import data
 from metro.core.line import Line
 from metro.core.named import Named
-from metro.core.serialization import deserialize, is_null, serialize, TIME_FORMAT
+from metro.core.serialization import deserialize, get_field_names, is_null, serialize, TIME_FORMAT
 
 __author__ = "Sergey Vartanov"
 __email__ = "me@enzet.ru"
 
 
+class ConnectionList(list):
+    """Station connections with mutation counter, so that connection index knows when it is outdated."""
+
+    # Number of mutations, class default keeps it available for copies and unpickled lists.
+    version: int = 0
+
+    def __setitem__(self, key: Any, value: Any) -> None:
+        super().__setitem__(key, value)
+        self.version += 1
+
+    def __delitem__(self, key: Any) -> None:
+        super().__delitem__(key)
+        self.version += 1
+
+    def __iadd__(self, other: Any) -> "ConnectionList":
+        self.extend(other)
+        return self
+
+    def __imul__(self, count: int) -> "ConnectionList":
+        self.version += 1
+        return super().__imul__(count)
+
+    def append(self, connection: "Connection") -> None:
+        super().append(connection)
+        self.version += 1
+
+    def extend(self, connections: Any) -> None:
+        super().extend(connections)
+        self.version += 1
+
+    def insert(self, index: int, connection: "Connection") -> None:
+        super().insert(index, connection)
+        self.version += 1
+
+    def pop(self, *args) -> "Connection":
+        self.version += 1
+        return super().pop(*args)
+
+    def remove(self, connection: "Connection") -> None:
+        super().remove(connection)
+        self.version += 1
+
+    def clear(self) -> None:
+        super().clear()
+        self.version += 1
+
+    def sort(self, *args, **kwargs) -> None:
+        super().sort(*args, **kwargs)
+        self.version += 1
+
+    def reverse(self) -> None:
+        super().reverse()
+        self.version += 1
+
+
 @dataclass
 class Station(Named):
     """Transport station."""
@@ -24,13 +79,24 @@ class Station(Named):
     structure_type: Optional["StationStructure"] = None
     geo_position: Optional[tuple[float, float]] = None
     caption: Optional[str] = None
-    connections: list["Connection"] = field(default_factory=list)
+    connections: list["Connection"] = field(default_factory=ConnectionList)
     status: dict[str, str] = field(default_factory=dict)
     platform_length: Optional[float] = None
     site_links: dict[str, str] = field(default_factory=dict)
     wikidata_id: Optional[int] = None
     line: Optional[Line] = None
 
+    def __post_init__(self) -> None:
+        # Connections by identifiers of stations they lead to, built for `_indexed_connections` at
+        # `_indexed_version` of it.
+        self._connection_index: dict[str, Connection] = {}
+        self._indexed_connections: Optional[ConnectionList] = None
+        self._indexed_version: int = -1
+
+        # Texts captions are extracted from and captions by languages. Caption is extracted again only if its text
+        # was changed, so that changes of names and identifier never require invalidation.
+        self._captions: dict[str, tuple[str, str]] = {}
+
     def deserialize(self, structure: dict[str, Any], lines: dict[str, Line]) -> "Station":
         """Deserialize station from structure."""
         assert structure["id"] == self.id_
@@ -51,8 +117,9 @@ class Station(Named):
         """Serialize station to structure."""
         structure = {"id": self.id_}
 
-        for key in [x.name for x in fields(Station)]:
-            value = self.__getattribute__(key)
+        values: dict[str, Any] = self.__dict__
+        for key in get_field_names(Station):
+            value = values[key]
             if key == "line":
                 structure[key] = value.id_
             elif not is_null(value):
@@ -73,14 +140,46 @@ class Station(Named):
         for postfix in "", "_tr", "_un":
             if self.has_name(language + postfix):
                 text = self.get_name(language + postfix)
-        return data.extract_station_name(text, language)
+
+        cached: Optional[tuple[str, str]] = self._captions.get(language)
+        if cached and cached[0] == text:
+            return cached[1]
+
+        caption: str = data.extract_station_name(text, language)
+        self._captions[language] = text, caption
+        return caption
 
     def get_connections(self, connection_type: "ConnectionType" = None) -> list["Connection"]:
         return [x for x in self.connections if connection_type is None or x.type_ == connection_type]
 
     def get_connection(self, other: "Station") -> Optional["Connection"]:
-        connections: list[Connection] = [x for x in self.connections if x.to_ == other]
-        return connections[0] if connections else None
+        return self.get_connection_index().get(other.id_)
+
+    def get_connection_index(self) -> dict[str, "Connection"]:
+        """
+        Get connections by identifiers of stations they lead to.
+
+        The index is kept up to date by `add_connection` and `remove_connection`, and rebuilt if `connections` list was
+        changed or assigned directly. If assigned list is not `ConnectionList`, the index is rebuilt on every call.
+        Changes of connection targets in place are not tracked.
+        """
+        if not self._is_connection_index_valid():
+            self._connection_index = {}
+            connection: Connection
+            for connection in self.connections:
+                if connection.to_ is not None:
+                    self._connection_index.setdefault(connection.to_.id_, connection)
+            if isinstance(self.connections, ConnectionList):
+                self._indexed_connections = self.connections
+                self._indexed_version = self.connections.version
+        return self._connection_index
+
+    def _is_connection_index_valid(self) -> bool:
+        return self._indexed_connections is self.connections and self._indexed_version == self.connections.version
+
+    def _update_connection_version(self) -> None:
+        if isinstance(self.connections, ConnectionList):
+            self._indexed_version = self.connections.version
 
     def check_height_and_structure(self) -> None:
         if self.structure_type:
@@ -114,15 +213,17 @@ class Station(Named):
 
     def add_connection(self, other_station: "Station", type_: "ConnectionType", status: dict = None) -> None:
         """Add connection from this station to another."""
-        connection: Connection
-        for connection in self.connections:
-            if connection.to_ == other_station:
-                if not connection.type_ == type_:
-                    logging.warning("change connection type")
-                    connection.type_ = type_
-                return
+        index: dict[str, Connection] = self.get_connection_index()
+        connection: Optional[Connection] = index.get(other_station.id_)
+        if connection:
+            if not connection.type_ == type_:
+                logging.warning("change connection type")
+                connection.type_ = type_
+            return
         connection = Connection(other_station, type_, status)
         self.connections.append(connection)
+        index[other_station.id_] = connection
+        self._update_connection_version()
 
     def remove_connection(self, other_station: "Station") -> int:
         """
@@ -130,22 +231,31 @@ class Station(Named):
 
         :returns number of connections removed
         """
+        if other_station.id_ not in self.get_connection_index():
+            return 0
+
         removed = 0
-        new_structure = []
+        new_structure: ConnectionList = ConnectionList()
         connection: Connection
         for connection in self.connections:
-            if connection.to_ != other_station:
+            if connection.to_ is None or connection.to_.id_ != other_station.id_:
                 new_structure.append(connection)
             else:
                 removed += 1
         self.connections = new_structure
+        del self._connection_index[other_station.id_]
+        self._indexed_connections = new_structure
+        self._indexed_version = new_structure.version
         return removed
 
     # Status.
 
     def is_hidden(self) -> bool:
         """If station is not currently in operation."""
-        return self.status["type"] in [ObjectStatus.CLOSED, ObjectStatus.UNDER_CONSTRUCTION, ObjectStatus.PLANNED]
+        hidden: list[ObjectStatus] = [ObjectStatus.CLOSED, ObjectStatus.UNDER_CONSTRUCTION, ObjectStatus.PLANNED]
+        status: Any = self.status.get("type")
+        # Deserialized status contains enumeration value.
+        return status in hidden or status in [x.value for x in hidden]
 
 
 class ConnectionType(Enum):
@@ -217,9 +327,15 @@ class StationStructure(Enum):
         :param height: station height.
         :param station_id: stations identifier.
         """
-        if self.is_ground() and height < 0 or self.is_deep() and height >= -6 or self.is_shallow() and height < -15:
+        if not self.is_height_consistent(height):
             logging.warning(f"station {station_id} is {self.name} but height is {height}")
 
+    def is_height_consistent(self, height: float) -> bool:
+        """Check whether station of this structure may have this height."""
+        return not (
+            self.is_ground() and height < 0 or self.is_deep() and height >= -6 or self.is_shallow() and height < -15
+        )
+
     def is_ground(self) -> bool:
         return self.name[:6] == "GROUND"
 
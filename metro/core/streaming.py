@@ -0,0 +1,310 @@
+"""
+Streaming reading and writing of transport system JSON files.
+
+Files are the same as `json_backend.dumps(system.serialize(), indent)` output, but they are written and read one
+station at a time, so that the whole structure of the system is never kept in memory.
+"""
+
+import codecs
+import json
+import re
+from collections import defaultdict
+from typing import Any, BinaryIO, Iterable, Iterator, Optional
+
+from metro.core import json_backend
+from metro.core.line import Line
+from metro.core.station import Connection, Station
+from metro.core.system import System
+
+__author__ = "Sergey Vartanov"
+__email__ = "me@enzet.ru"
+
+
+# Number of bytes read from input file at once.
+DEFAULT_CHUNK_SIZE: int = 64 * 1024
+
+WHITESPACE_PATTERN: re.Pattern = re.compile(r"[ \t\n\r]*")
+
+
+class JSONWriter:
+    """Writer of JSON objects with arrays that are produced element by element."""
+
+    def __init__(self, output_file: BinaryIO, indent: Optional[int] = None) -> None:
+        """
+        :param output_file: binary file to write UTF-8 JSON to
+        :param indent: number of spaces per indentation level; compact representation without spaces if None
+        """
+        self.output_file: BinaryIO = output_file
+        self.indent: Optional[int] = indent
+
+    def get_newline(self, level: int) -> bytes:
+        """Get line break with indentation of the level, nothing for compact representation."""
+        if self.indent is None:
+            return b""
+        return b"\n" + b" " * (self.indent * level)
+
+    def write_value(self, value: Any, level: int) -> None:
+        """Write value that starts at the indentation level."""
+        data: bytes = json_backend.dumps(value, self.indent)
+        if self.indent is not None and level:
+            # JSON strings cannot contain line breaks, so all of them are separators.
+            data = data.replace(b"\n", self.get_newline(level))
+        self.output_file.write(data)
+
+    def write_array(self, values: Iterable[Any], level: int) -> None:
+        """Write array element by element."""
+        newline: bytes = self.get_newline(level + 1)
+        is_empty: bool = True
+
+        for value in values:
+            self.output_file.write((b"[" if is_empty else b",") + newline)
+            self.write_value(value, level + 1)
+            is_empty = False
+
+        self.output_file.write(b"[]" if is_empty else self.get_newline(level) + b"]")
+
+    def write_object(self, items: Iterable[tuple[str, Any]], level: int = 0) -> None:
+        """
+        Write object.
+
+        :param items: keys and values of the object; values that are iterators are written as arrays element by
+            element
+        :param level: indentation level of the object
+        """
+        newline: bytes = self.get_newline(level + 1)
+        key_separator: bytes = b":" if self.indent is None else b": "
+        is_empty: bool = True
+
+        for key, value in items:
+            self.output_file.write((b"{" if is_empty else b",") + newline)
+            self.output_file.write(json_backend.dumps(key) + key_separator)
+            if isinstance(value, Iterator):
+                self.write_array(value, level + 1)
+            else:
+                self.write_value(value, level + 1)
+            is_empty = False
+
+        self.output_file.write(b"{}" if is_empty else self.get_newline(level) + b"}")
+
+
+def write_system(system: System, output_file: BinaryIO, indent: Optional[int] = None) -> None:
+    """
+    Write transport system as JSON, serializing stations and lines one by one. Keys are the same as in
+    `System.serialize`.
+
+    :param system: transport system
+    :param output_file: binary file to write UTF-8 JSON to
+    :param indent: number of spaces per indentation level; compact representation without spaces if None
+    """
+    items: list[tuple[str, Any]] = [
+        ("id", system.id_),
+        ("stations", (x.serialize() for x in system.stations.values())),
+        ("lines", (x.serialize() for x in system.lines.values())),
+    ]
+    if system.line_width:
+        items.append(("line_width", system.line_width))
+
+    JSONWriter(output_file, indent).write_object(items)
+
+
+class JSONReader:
+    """
+    Reader of JSON values from file, that allows to iterate over elements of arrays and items of objects without
+    decoding them as a whole.
+
+    Values are decoded with `json.JSONDecoder.raw_decode` from the buffer of decoded text, which is extended from the
+    file when the value is not complete yet.
+    """
+
+    def __init__(self, input_file: BinaryIO, chunk_size: int = DEFAULT_CHUNK_SIZE) -> None:
+        """
+        :param input_file: binary file with UTF-8 JSON
+        :param chunk_size: number of bytes read from the file at once
+        """
+        self.input_file: BinaryIO = input_file
+        self.chunk_size: int = chunk_size
+        self.text_decoder: codecs.IncrementalDecoder = codecs.getincrementaldecoder("utf-8")()
+        self.json_decoder: json.JSONDecoder = json.JSONDecoder()
+        self.buffer: str = ""
+        self.position: int = 0
+
+    def read(self) -> bool:
+        """
+        Append next chunk of the file to the buffer and drop already decoded part of it.
+
+        :return: false if the file is over
+        """
+        # Size of chunk grows with the size of current value, so long values are read in linear time.
+        data: bytes = self.input_file.read(max(self.chunk_size, len(self.buffer) - self.position))
+        text: str = self.text_decoder.decode(data, final=not data)
+        if not data and not text:
+            return False
+        self.buffer = self.buffer[self.position :] + text
+        self.position = 0
+        return True
+
+    def peek(self) -> Optional[str]:
+        """Skip whitespace and get next character without consuming it, None if the file is over."""
+        while True:
+            self.position = WHITESPACE_PATTERN.match(self.buffer, self.position).end()
+            if self.position < len(self.buffer):
+                return self.buffer[self.position]
+            if not self.read():
+                return None
+
+    def expect(self, characters: str) -> str:
+        """
+        Consume next character.
+
+        :param characters: allowed characters
+        :raises ValueError: if the character is not allowed or the file is over
+        """
+        character: Optional[str] = self.peek()
+        if character is None or character not in characters:
+            raise ValueError(f"expected one of {characters!r}, got {character!r} at {self.position}")
+        self.position += 1
+        return character
+
+    def read_value(self) -> Any:
+        """
+        Decode next value.
+
+        :raises ValueError: if the value is not valid JSON
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = self.json_decoder.raw_decode(self.buffer, self.position)
+            except json.JSONDecodeError as error:
+                if self.read():
+                    continue
+                raise ValueError(str(error)) from error
+            # Number at the end of the buffer may continue in the next chunk.
+            if end == len(self.buffer) and self.read():
+                continue
+            self.position = end
+            return value
+
+    def iterate_array(self) -> Iterator[Any]:
+        """Decode array element by element."""
+        self.expect("[")
+        if self.peek() == "]":
+            self.position += 1
+            return
+        while True:
+            yield self.read_value()
+            if self.expect(",]") == "]":
+                return
+
+    def iterate_object(self) -> Iterator[str]:
+        """
+        Decode keys of object. Value of each key should be consumed (e.g. with `read_value` or `iterate_array`) before
+        the next key is requested.
+        """
+        self.expect("{")
+        if self.peek() == "}":
+            self.position += 1
+            return
+        while True:
+            key: Any = self.read_value()
+            if not isinstance(key, str):
+                raise ValueError(f"expected object key, got {key!r}")
+            self.expect(":")
+            yield key
+            if self.expect(",}") == "}":
+                return
+
+
+class PlaceholderLines(dict):
+    """Lines by identifiers, where lines that are not described yet are created empty on first request."""
+
+    def __missing__(self, line_id: str) -> Line:
+        line: Line = Line({}, line_id)
+        self[line_id] = line
+        return line
+
+
+class SystemLoader:
+    """
+    Builder of transport system from station and line structures in any order.
+
+    Stations may refer to lines and stations that are described later in the file. Lines are created as placeholders
+    on first reference and filled when their structures arrive. Connections of a station are created when all
+    stations they lead to are known: until then, the station waits in the fixup table with the number of unknown
+    targets, which is decreased as targets arrive.
+    """
+
+    def __init__(self, system: System) -> None:
+        self.system: System = system
+        self.lines: PlaceholderLines = PlaceholderLines(system.lines)
+
+        # Connection structures of stations that wait for their targets, and numbers of unknown targets.
+        self.pending: dict[str, tuple[list[dict[str, Any]], int]] = {}
+        # Identifiers of waiting stations by identifiers of unknown targets.
+        self.waiting: defaultdict[str, list[str]] = defaultdict(list)
+
+    def add_line(self, structure: dict[str, Any]) -> None:
+        line: Line = self.lines[structure["id"]].deserialize(structure)
+        self.system.lines[line.id_] = line
+
+    def add_station(self, structure: dict[str, Any]) -> None:
+        station: Station = Station({}, structure["id"]).deserialize(structure, self.lines)
+        self.system.add_station(station)
+
+        if connections := structure.get("connections"):
+            unknown_ids: set[str] = {x["to"] for x in connections if x["to"] not in self.system.stations}
+            if unknown_ids:
+                self.pending[station.id_] = connections, len(unknown_ids)
+                for unknown_id in unknown_ids:
+                    self.waiting[unknown_id].append(station.id_)
+            else:
+                self.add_connections(station, connections)
+
+        for waiting_id in self.waiting.pop(station.id_, []):
+            connections, count = self.pending.pop(waiting_id)
+            if count == 1:
+                self.add_connections(self.system.stations[waiting_id], connections)
+            else:
+                self.pending[waiting_id] = connections, count - 1
+
+    def add_connections(self, station: Station, structures: list[dict[str, Any]]) -> None:
+        for structure in structures:
+            station.connections.append(Connection.deserialize(structure, self.system.stations))
+
+    def finish(self) -> System:
+        """
+        Check that all references are resolved.
+
+        :raises ValueError: if some lines or stations are referenced but not described
+        """
+        if unknown_lines := self.lines.keys() - self.system.lines.keys():
+            raise ValueError(f"unknown lines {', '.join(sorted(unknown_lines))}")
+        if self.waiting:
+            raise ValueError(f"unknown connection targets {', '.join(sorted(self.waiting))}")
+        return self.system
+
+
+def read_system(input_file: BinaryIO, system: Optional[System] = None, chunk_size: int = DEFAULT_CHUNK_SIZE) -> System:
+    """
+    Read transport system from JSON file, deserializing stations and lines one by one. The result is the same as of
+    `System.deserialize` for the decoded file.
+
+    :param input_file: binary file with UTF-8 JSON
+    :param system: system to fill, new one by default
+    :param chunk_size: number of bytes read from the file at once
+    :raises ValueError: if the file is not valid JSON or references unknown lines or stations
+    """
+    loader: SystemLoader = SystemLoader(system if system else System({}, ""))
+    reader: JSONReader = JSONReader(input_file, chunk_size)
+
+    for key in reader.iterate_object():
+        if key == "lines":
+            for structure in reader.iterate_array():
+                loader.add_line(structure)
+        elif key == "stations":
+            for structure in reader.iterate_array():
+                loader.add_station(structure)
+        else:
+            loader.system.deserialize_field(key, reader.read_value())
+
+    return loader.finish()
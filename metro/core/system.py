@@ -1,11 +1,15 @@
 import logging
 from dataclasses import dataclass, field
-from typing import Any, Optional
+from typing import TYPE_CHECKING, Any, Optional
 
 from metro.core.line import Line
 from metro.core.named import Named
 from metro.core.station import Connection, Station
 
+if TYPE_CHECKING:
+    from metro.core.routing import Route, RoutingCosts
+    from metro.core.validation import ValidationReport
+
 __author__ = "Sergey Vartanov"
 __email__ = "me@enzet.ru"
 
@@ -13,18 +17,83 @@ __email__ = "me@enzet.ru"
 DEFAULT_STYLE_ID: str = "normal"
 
 
+def get_short_ids(station_id: str) -> set[str]:
+    """Get all short identifiers `System.get_stations_by_short_id` should find station by."""
+    parts: list[str] = station_id.split("/")
+    if len(parts) < 2:
+        return set()
+    return {parts[1]} | {"/".join(parts[index:]) for index in range(1, len(parts))}
+
+
+class StationDict(dict):
+    """Stations by identifiers with mutation counter, so that station indexes know when they are outdated."""
+
+    # Number of mutations, class default keeps it available for copies and unpickled dictionaries.
+    version: int = 0
+
+    def __setitem__(self, key: str, value: Station) -> None:
+        super().__setitem__(key, value)
+        self.version += 1
+
+    def __delitem__(self, key: str) -> None:
+        super().__delitem__(key)
+        self.version += 1
+
+    def __ior__(self, other: Any) -> "StationDict":
+        self.update(other)
+        return self
+
+    def pop(self, *args) -> Any:
+        self.version += 1
+        return super().pop(*args)
+
+    def popitem(self) -> tuple[str, Station]:
+        self.version += 1
+        return super().popitem()
+
+    def setdefault(self, key: str, default: Optional[Station] = None) -> Station:
+        self.version += 1
+        return super().setdefault(key, default)
+
+    def update(self, *args, **kwargs) -> None:
+        self.version += 1
+        super().update(*args, **kwargs)
+
+    def clear(self) -> None:
+        self.version += 1
+        super().clear()
+
+
 @dataclass
 class System(Named):
     """Transport system."""
 
     id_: str
-    stations: dict[str, Station] = field(default_factory=dict)
+    stations: dict[str, Station] = field(default_factory=StationDict)
     lines: dict[str, Line] = field(default_factory=dict)
     lookup_station_id: dict[str, Station] = field(default_factory=dict)
     style_id: Optional[str] = None
     line_width: Optional[float] = None
     point_length: Optional[float] = None
 
+    def __setattr__(self, key: str, value: Any) -> None:
+        if key == "stations" and not isinstance(value, StationDict):
+            value = StationDict(value)
+        super().__setattr__(key, value)
+
+    def __getstate__(self) -> dict[str, Any]:
+        # Restored stations dictionary counts mutations anew, so restored indexes are rebuilt.
+        return self.__dict__ | {"_indexed_stations": None}
+
+    def __post_init__(self) -> None:
+        # Station indexes, see `reindex`. They are built for `_indexed_stations` at `_indexed_version` of it.
+        self._indexed_stations: Optional[StationDict] = None
+        self._indexed_version: int = -1
+        self._wikidata_id_index: dict[int, list[Station]] = {}
+        self._short_id_index: dict[str, list[Station]] = {}
+        self._line_index: dict[str, list[Station]] = {}
+        self._name_index: dict[str, dict[str, list[Station]]] = {}
+
     def deserialize(self, structure: dict[str, Any]):
         """Deserialize transport system from structure."""
 
@@ -39,7 +108,7 @@ class System(Named):
                 station: Station = Station({}, station_structure["id"]).deserialize(station_structure, self.lines)
                 if "line" in station_structure:
                     station.line = self.lines[station_structure["line"]]
-                self.stations[station.id_] = station
+                self.add_station(station)
 
             for station_structure in structure["stations"]:
                 if "connections" in station_structure:
@@ -48,19 +117,22 @@ class System(Named):
                         station.connections.append(Connection.deserialize(connection_structure, self.stations))
 
         for key in structure:
-            value = structure[key]
+            if key not in ["lines", "stations"]:
+                self.deserialize_field(key, structure[key])
 
-            if key == "id":
-                self.id_ = value
+    def deserialize_field(self, key: str, value: Any) -> None:
+        """Deserialize top-level system field other than lines and stations."""
+        if key == "id":
+            self.id_ = value
 
-            elif key == "line_width":
-                self.line_width = value
+        elif key == "line_width":
+            self.line_width = value
 
-            elif key == "names":
-                self.set_names(value)
+        elif key == "names":
+            self.set_names(value)
 
-            elif key not in ["lines", "stations"]:
-                logging.warning("ignored key " + key + " for system")
+        else:
+            logging.warning("ignored key " + key + " for system")
 
     def serialize(self) -> dict[str, Any]:
         """Serialize transport system to structure."""
@@ -75,45 +147,108 @@ class System(Named):
 
     # Station.
 
-    def get_stations_by_short_id(self, station_short_id) -> list[Station]:
-        result = []
-        station: Station
+    def add_station(self, station: Station) -> None:
+        """Add station to the system or replace station with the same identifier."""
+        is_indexed: bool = self._is_indexed()
+        old_station: Optional[Station] = self.stations.get(station.id_)
+        self.stations[station.id_] = station
+        if is_indexed:
+            if old_station:
+                self._unindex_station(old_station)
+            self._index_station(station)
+            self._indexed_version = self.stations.version
+
+    def remove_station(self, station_id: str) -> Optional[Station]:
+        """Remove station from the system, return removed station if there was one."""
+        is_indexed: bool = self._is_indexed()
+        station: Optional[Station] = self.stations.pop(station_id, None)
+        if is_indexed:
+            if station:
+                self._unindex_station(station)
+            self._indexed_version = self.stations.version
+        return station
+
+    def reindex(self) -> None:
+        """
+        Rebuild station indexes.
+
+        Indexes are kept up to date by `add_station` and `remove_station`, and rebuilt automatically if stations
+        dictionary was changed directly. Call it after station identifiers, lines, Wikidata identifiers, or names were
+        changed in place.
+        """
+        self._wikidata_id_index = {}
+        self._short_id_index = {}
+        self._line_index = {}
+        self._name_index = {}
         for station in self.stations.values():
-            if (station.short_id() == station_short_id) or (
-                station.id_ and station.id_.endswith("/" + station_short_id)
-            ):
-                result.append(station)
-        return result
+            self._index_station(station)
+        self._indexed_stations = self.stations
+        self._indexed_version = self.stations.version
+
+    def _is_indexed(self) -> bool:
+        return self._indexed_stations is self.stations and self._indexed_version == self.stations.version
+
+    def _update_indexes(self) -> None:
+        if not self._is_indexed():
+            self.reindex()
+
+    def _index_station(self, station: Station) -> None:
+        if station.wikidata_id is not None:
+            self._wikidata_id_index.setdefault(station.wikidata_id, []).append(station)
+        for short_id in get_short_ids(station.id_):
+            self._short_id_index.setdefault(short_id, []).append(station)
+        if station.line is not None:
+            self._line_index.setdefault(station.line.id_, []).append(station)
+        for language, name_index in self._name_index.items():
+            if station.has_name(language):
+                name_index.setdefault(station.get_caption(language), []).append(station)
+
+    def _unindex_station(self, station: Station) -> None:
+        def remove(index: dict[Any, list[Station]], key: Any) -> None:
+            if key in index:
+                index[key] = [x for x in index[key] if x is not station]
+                if not index[key]:
+                    del index[key]
+
+        remove(self._wikidata_id_index, station.wikidata_id)
+        for short_id in get_short_ids(station.id_):
+            remove(self._short_id_index, short_id)
+        if station.line is not None:
+            remove(self._line_index, station.line.id_)
+        for language, name_index in self._name_index.items():
+            if station.has_name(language):
+                remove(name_index, station.get_caption(language))
+
+    def get_stations_by_short_id(self, station_short_id) -> list[Station]:
+        self._update_indexes()
+        return list(self._short_id_index.get(station_short_id, []))
 
     def get_station_by_wikidata_id(self, station_wikidata_id) -> Optional[Station]:
-        station: Station
-        for station in self.stations.values():
-            if station.wikidata_id == station_wikidata_id:
-                return station
-        return None
+        self._update_indexes()
+        stations: list[Station] = self._wikidata_id_index.get(station_wikidata_id, [])
+        return stations[0] if stations else None
 
     def get_station_by_line_and_wid(self, line_id, station_wikidata_id) -> Optional[Station]:
+        self._update_indexes()
         station: Station
-        for station in self.stations:
-            if station.wikidata_id == station_wikidata_id and station.line_id == line_id:
+        for station in self._wikidata_id_index.get(station_wikidata_id, []):
+            if station.line and station.line.id_ == line_id:
                 return station
         return None
 
     def get_stations_by_name(self, name: str, language: str) -> list[Station]:
-        result = []
-        station: Station
-        for station in self.stations:
-            if station.has_name(language) and station.get_caption(language) == name:
-                result.append(station)
-        return result
+        self._update_indexes()
+        if language not in self._name_index:
+            name_index: dict[str, list[Station]] = {}
+            for station in self.stations.values():
+                if station.has_name(language):
+                    name_index.setdefault(station.get_caption(language), []).append(station)
+            self._name_index[language] = name_index
+        return list(self._name_index[language].get(name, []))
 
     def get_stations_by_line(self, line: Line) -> list[Station]:
-        result = []
-        station: Station
-        for station in self.stations:
-            if station.line == line:
-                result.append(station)
-        return result
+        self._update_indexes()
+        return [x for x in self._line_index.get(line.id_, []) if x.line == line]
 
     # Line.
 
@@ -121,8 +256,36 @@ class System(Named):
         """If there is at least one transition station."""
         return any(station.is_transition() for station in self.stations.values())
 
+    def get_captions(self, language: str) -> dict[str, str]:
+        """Get captions of all stations in the language by station identifiers."""
+        return {station_id: station.get_caption(language) for station_id, station in self.stations.items()}
+
     def get_station_unique_names(self, language: str) -> set[str]:
-        return {x.get_caption(language) for x in self.stations.values()}
+        return set(self.get_captions(language).values())
+
+    def route(
+        self, from_id: str, to_id: str, costs: Optional["RoutingCosts"] = None, exclude_hidden: bool = False
+    ) -> Optional["Route"]:
+        """
+        Find the cheapest route between stations. The system is compiled for every call, use `routing.Router` for
+        many queries.
+
+        :param from_id: identifier of the first station
+        :param to_id: identifier of the last station
+        :param costs: connection costs, default ones if not specified
+        :param exclude_hidden: do not use stations and connections that are not currently in operation
+        :return: route or None if there is no route
+        :raises KeyError: if there is no such station
+        """
+        from metro.core.routing import Router
+
+        return Router(self, costs, exclude_hidden).route(from_id, to_id)
+
+    def validate(self) -> "ValidationReport":
+        """Check system topology, see `validation.validate`."""
+        from metro.core.validation import validate
+
+        return validate(self)
 
     def get_depth_bounds(self) -> tuple[float, float]:
         if not len(self.stations):
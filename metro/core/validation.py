@@ -0,0 +1,158 @@
+"""
+Topology validation of transport system.
+
+All checks are done over the compiled system graph with array operations and a single union-find pass, so that
+validation time is linear in the number of stations and connections.
+"""
+
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+import numpy as np
+
+from metro.core.graph import CONNECTION_TYPE_CODES, DANGLING, Graph, build_graph
+from metro.core.station import ConnectionType, Station, StationStructure
+from metro.core.system import System
+
+__author__ = "Sergey Vartanov"
+__email__ = "me@enzet.ru"
+
+
+# Line code of station without line.
+NO_LINE: int = -1
+
+
+@dataclass
+class ValidationReport:
+    """Problems found in transport system. Connections are pairs of source and target station identifiers."""
+
+    # `NEXT` connections without `NEXT` connection back.
+    asymmetric_connections: list[tuple[str, str]] = field(default_factory=list)
+
+    # Connections to stations outside the system, target is None if connection has no target.
+    dangling_connections: list[tuple[str, Optional[str]]] = field(default_factory=list)
+
+    stations_without_line: list[str] = field(default_factory=list)
+
+    # Station identifiers of components of lines connected by `NEXT` connections, for lines with several components.
+    line_components: dict[str, list[list[str]]] = field(default_factory=dict)
+
+    # `TRANSITION` connections between stations of the same line.
+    same_line_transitions: list[tuple[str, str]] = field(default_factory=list)
+
+    # Stations with altitude inconsistent with structure type.
+    structure_mismatches: list[tuple[str, StationStructure, float]] = field(default_factory=list)
+
+    def is_valid(self) -> bool:
+        """If no problems were found."""
+        return not any(getattr(self, x) for x in self.__dataclass_fields__)
+
+
+def get_structure(value: Any) -> Optional[StationStructure]:
+    """Get station structure from enum member or its value, e.g. deserialized one."""
+    if isinstance(value, StationStructure):
+        return value
+    try:
+        return StationStructure(value)
+    except ValueError:
+        return None
+
+
+def get_components(size: int, sources: np.ndarray, targets: np.ndarray) -> list[int]:
+    """Get component roots of graph nodes with union-find."""
+    parents: list[int] = list(range(size))
+
+    def find(node: int) -> int:
+        root: int = node
+        while parents[root] != root:
+            root = parents[root]
+        while parents[node] != root:
+            parents[node], node = root, parents[node]
+        return root
+
+    for source, target in zip(sources.tolist(), targets.tolist()):
+        source_root, target_root = find(source), find(target)
+        if source_root != target_root:
+            parents[max(source_root, target_root)] = min(source_root, target_root)
+
+    return [find(x) for x in range(size)]
+
+
+def validate(system: System, graph: Optional[Graph] = None) -> ValidationReport:
+    """
+    Check transport system topology.
+
+    :param system: transport system
+    :param graph: compiled system graph, it is built if not specified; it should be built after the last change of
+        stations and connections
+    :raises ValueError: if graph was compiled for other stations, e.g. before stations were added or removed
+    """
+    if graph is None:
+        graph = build_graph(system)
+    elif graph.station_ids != list(system.stations):
+        raise ValueError("graph stations differ from system stations, graph should be built again")
+    stations: list[Station] = list(system.stations.values())
+    station_ids: list[str] = graph.station_ids
+    report: ValidationReport = ValidationReport()
+
+    line_ids: list[str] = []
+    line_codes: dict[str, int] = {}
+    station_lines: list[int] = []
+    for station in stations:
+        if station.line is None:
+            station_lines.append(NO_LINE)
+        else:
+            station_lines.append(line_codes.setdefault(station.line.id_, len(line_codes)))
+            if len(line_ids) < len(line_codes):
+                line_ids.append(station.line.id_)
+    lines: np.ndarray = np.array(station_lines, dtype=np.int64)
+
+    report.stations_without_line = [station_ids[x] for x in np.flatnonzero(lines == NO_LINE).tolist()]
+
+    sources: np.ndarray = graph.get_sources()
+    targets: np.ndarray = graph.targets
+    report.dangling_connections = [
+        (station_ids[sources[x]], graph.dangling_targets.get(x)) for x in np.flatnonzero(targets == DANGLING).tolist()
+    ]
+
+    # Edges are encoded as single numbers to look for reverse edges.
+    known: np.ndarray = targets != DANGLING
+    is_next: np.ndarray = known & (graph.types == CONNECTION_TYPE_CODES[ConnectionType.NEXT])
+    next_sources, next_targets = sources[is_next], targets[is_next]
+    size: int = len(graph)
+    has_reverse: np.ndarray = np.isin(next_targets * size + next_sources, next_sources * size + next_targets)
+    report.asymmetric_connections = [
+        (station_ids[x], station_ids[y])
+        for x, y in zip(next_sources[~has_reverse].tolist(), next_targets[~has_reverse].tolist())
+    ]
+
+    is_transition: np.ndarray = known & (graph.types == CONNECTION_TYPE_CODES[ConnectionType.TRANSITION])
+    transition_sources, transition_targets = sources[is_transition], targets[is_transition]
+    transition_lines: np.ndarray = lines[transition_sources]
+    same: np.ndarray = (transition_lines != NO_LINE) & (transition_lines == lines[transition_targets])
+    report.same_line_transitions = [
+        (station_ids[x], station_ids[y])
+        for x, y in zip(transition_sources[same].tolist(), transition_targets[same].tolist())
+    ]
+
+    # Components of lines: union of stations by `NEXT` connections inside lines.
+    inside: np.ndarray = (lines[next_sources] != NO_LINE) & (lines[next_sources] == lines[next_targets])
+    roots: list[int] = get_components(size, next_sources[inside], next_targets[inside])
+    components: dict[int, dict[int, list[str]]] = {}
+    for index, (line, root) in enumerate(zip(station_lines, roots)):
+        if line != NO_LINE:
+            components.setdefault(line, {}).setdefault(root, []).append(station_ids[index])
+    report.line_components = {
+        line_ids[line]: list(line_components.values())
+        for line, line_components in components.items()
+        if len(line_components) > 1
+    }
+
+    for index, station in enumerate(stations):
+        if station.structure_type is None or station.altitude is None:
+            continue
+        structure: Optional[StationStructure] = get_structure(station.structure_type)
+        if structure is not None and not structure.is_height_consistent(station.altitude):
+            report.structure_mismatches.append((station_ids[index], structure, station.altitude))
+
+    return report
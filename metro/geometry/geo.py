@@ -1,4 +1,4 @@
-from typing import Dict, Optional
+from typing import Dict, Optional, Union
 
 import numpy as np
 
@@ -6,6 +6,36 @@ __author__ = "Sergey Vartanov"
 __email__ = "me@enzet.ru"
 
 
+# Mean radius of the Earth in meters.
+EARTH_RADIUS: float = 6_371_000.0
+
+
+def get_distances(
+    latitudes_1: Union[np.ndarray, float],
+    longitudes_1: Union[np.ndarray, float],
+    latitudes_2: Union[np.ndarray, float],
+    longitudes_2: Union[np.ndarray, float],
+) -> np.ndarray:
+    """Get great-circle distances in meters between arrays of points given by coordinates in degrees."""
+    phi_1: np.ndarray = np.radians(latitudes_1)
+    phi_2: np.ndarray = np.radians(latitudes_2)
+    a: np.ndarray = (
+        np.sin((phi_2 - phi_1) / 2) ** 2
+        + np.cos(phi_1) * np.cos(phi_2) * np.sin(np.radians(np.subtract(longitudes_2, longitudes_1)) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS * np.arcsin(np.minimum(1.0, np.sqrt(a)))
+
+
+def get_cartesian(latitudes: np.ndarray, longitudes: np.ndarray) -> np.ndarray:
+    """
+    Get 3D Cartesian coordinates in meters of points on the Earth surface given by coordinates in degrees. Straight
+    distance between points is never greater than great-circle distance.
+    """
+    phi: np.ndarray = np.radians(latitudes)
+    lambda_: np.ndarray = np.radians(longitudes)
+    return EARTH_RADIUS * np.stack([np.cos(phi) * np.cos(lambda_), np.cos(phi) * np.sin(lambda_), np.sin(phi)], axis=-1)
+
+
 class Position:
     """Geographical position: longitude, latitude, and altitude."""
 
@@ -0,0 +1,202 @@
+"""Storages for raw Wikidata item structures."""
+
+import sqlite3
+import threading
+import time
+import zlib
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Iterable, Optional
+
+from metro.core import network
+from metro.harvest.constants import WIKIDATA_ITEM_PREFIX
+
+__author__ = "Sergey Vartanov"
+__email__ = "me@enzet.ru"
+
+
+# Maximum number of parameters in one SQLite query (default limit for SQLite older than 3.32).
+SQLITE_MAX_PARAMETERS: int = 999
+
+DEFAULT_MEMORY_CACHE_ENTRIES: int = 10_000
+DEFAULT_MEMORY_CACHE_BYTES: int = 256 * 1024 * 1024
+
+
+class EntityCache(ABC):
+    """Storage for Wikidata item structures in the form of JSON `wbgetentities` responses."""
+
+    def get(self, wikidata_id: int) -> Optional[bytes]:
+        """Get cached structure of Wikidata item or None if it is not cached."""
+        return self.get_many([wikidata_id]).get(wikidata_id)
+
+    @abstractmethod
+    def get_many(self, wikidata_ids: Iterable[int]) -> dict[int, bytes]:
+        """Get cached structures of Wikidata items, items that are not cached are omitted."""
+
+    def put(self, wikidata_id: int, content: bytes) -> None:
+        """Store structure of Wikidata item."""
+        self.put_many({wikidata_id: content})
+
+    @abstractmethod
+    def put_many(self, contents: dict[int, bytes]) -> None:
+        """Store structures of Wikidata items."""
+
+    @abstractmethod
+    def get_fetch_times(self, wikidata_ids: Iterable[int]) -> dict[int, float]:
+        """Get times (as Unix timestamps) when cached Wikidata items were fetched or last revalidated."""
+
+    @abstractmethod
+    def touch_many(self, wikidata_ids: Iterable[int]) -> None:
+        """Mark cached Wikidata items as fetched now, e.g. after they are revalidated."""
+
+
+class DirectoryEntityCache(EntityCache):
+    """
+    One file per Wikidata item in flat directory: `<directory>/Q<id>`. Files may be compressed, uncompressed files are
+    read as well.
+    """
+
+    def __init__(self, directory: Path, compression: Optional[str] = network.CURRENT_COMPRESSION) -> None:
+        """
+        :param directory: cache directory
+        :param compression: compression of written files, None to write them uncompressed; current cache
+            compression by default, see `network.set_cache_compression`
+        """
+        self.directory: Path = directory
+        self.compression: Optional[str] = compression
+
+    def get_file(self, wikidata_id: int) -> Path:
+        return self.directory / (WIKIDATA_ITEM_PREFIX + str(wikidata_id))
+
+    def get_many(self, wikidata_ids: Iterable[int]) -> dict[int, bytes]:
+        contents: dict[int, bytes] = {}
+        for wikidata_id in wikidata_ids:
+            cache_file: Path = self.get_file(wikidata_id)
+            if cache_file.exists():
+                contents[wikidata_id] = network.read_cache_file(cache_file)
+        return contents
+
+    def put_many(self, contents: dict[int, bytes]) -> None:
+        for wikidata_id, content in contents.items():
+            network.write_cache_file(self.get_file(wikidata_id), content, self.compression)
+
+    def get_fetch_times(self, wikidata_ids: Iterable[int]) -> dict[int, float]:
+        fetch_times: dict[int, float] = {}
+        for wikidata_id in wikidata_ids:
+            cache_file: Path = self.get_file(wikidata_id)
+            if cache_file.exists():
+                fetch_times[wikidata_id] = cache_file.stat().st_mtime
+        return fetch_times
+
+    def touch_many(self, wikidata_ids: Iterable[int]) -> None:
+        for wikidata_id in wikidata_ids:
+            cache_file: Path = self.get_file(wikidata_id)
+            if cache_file.exists():
+                cache_file.touch()
+
+
+class SQLiteEntityCache(EntityCache):
+    """
+    SQLite database with one table keyed by Wikidata item identifier. Structures are stored compressed with zlib
+    together with the time they were fetched.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path: Path = path
+        self.lock: threading.Lock = threading.Lock()
+        self.connection: sqlite3.Connection = sqlite3.connect(path, check_same_thread=False)
+        with self.lock, self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS entities (id INTEGER PRIMARY KEY, content BLOB NOT NULL, fetch_time REAL)"
+            )
+
+    def select(self, column: str, wikidata_ids: Iterable[int]) -> dict[int, Any]:
+        """Get column values for Wikidata items, using one query per `SQLITE_MAX_PARAMETERS` items."""
+        wikidata_ids: list[int] = list(wikidata_ids)
+        values: dict[int, Any] = {}
+
+        with self.lock:
+            for index in range(0, len(wikidata_ids), SQLITE_MAX_PARAMETERS):
+                batch: list[int] = wikidata_ids[index : index + SQLITE_MAX_PARAMETERS]
+                cursor: sqlite3.Cursor = self.connection.execute(
+                    f"SELECT id, {column} FROM entities WHERE id IN ({','.join('?' * len(batch))})", batch
+                )
+                values |= dict(cursor)
+
+        return values
+
+    def get_many(self, wikidata_ids: Iterable[int]) -> dict[int, bytes]:
+        return {x: zlib.decompress(y) for x, y in self.select("content", wikidata_ids).items()}
+
+    def put_many(self, contents: dict[int, bytes]) -> None:
+        fetch_time: float = time.time()
+        with self.lock, self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO entities (id, content, fetch_time) VALUES (?, ?, ?)",
+                [(x, zlib.compress(y), fetch_time) for x, y in contents.items()],
+            )
+
+    def get_fetch_times(self, wikidata_ids: Iterable[int]) -> dict[int, float]:
+        return {x: y if y is not None else 0.0 for x, y in self.select("fetch_time", wikidata_ids).items()}
+
+    def touch_many(self, wikidata_ids: Iterable[int]) -> None:
+        fetch_time: float = time.time()
+        with self.lock, self.connection:
+            self.connection.executemany(
+                "UPDATE entities SET fetch_time = ? WHERE id = ?", [(fetch_time, x) for x in wikidata_ids]
+            )
+
+    def close(self) -> None:
+        with self.lock:
+            self.connection.close()
+
+
+class MemoryCache:
+    """
+    Least recently used in-memory storage of decoded Wikidata item structures, bounded by the number of items and
+    their approximate size (size of JSON representation).
+
+    Stored structures are returned as is, so they should not be modified.
+    """
+
+    def __init__(
+        self, max_entries: int = DEFAULT_MEMORY_CACHE_ENTRIES, max_bytes: int = DEFAULT_MEMORY_CACHE_BYTES
+    ) -> None:
+        self.max_entries: int = max_entries
+        self.max_bytes: int = max_bytes
+        self.entries: OrderedDict[int, tuple[dict, int]] = OrderedDict()
+        self.size: int = 0
+        self.hits: int = 0
+        self.misses: int = 0
+        self.lock: threading.Lock = threading.Lock()
+
+    def get(self, wikidata_id: int) -> Optional[dict]:
+        with self.lock:
+            if wikidata_id not in self.entries:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.entries.move_to_end(wikidata_id)
+            return self.entries[wikidata_id][0]
+
+    def put(self, wikidata_id: int, structure: dict, size: int) -> None:
+        """
+        Store structure, evict least recently used ones if limits are exceeded.
+
+        :param wikidata_id: Wikidata item unique identifier
+        :param structure: decoded Wikidata item structure
+        :param size: approximate size of the structure in bytes
+        """
+        with self.lock:
+            if wikidata_id in self.entries:
+                self.size -= self.entries.pop(wikidata_id)[1]
+            self.entries[wikidata_id] = structure, size
+            self.size += size
+            while self.entries and (len(self.entries) > self.max_entries or self.size > self.max_bytes):
+                self.size -= self.entries.popitem(last=False)[1][1]
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
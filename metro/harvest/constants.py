@@ -0,0 +1,8 @@
+"""Wikidata constants shared by harvest modules that cannot import `wikidata` module."""
+
+__author__ = "Sergey Vartanov"
+__email__ = "me@enzet.ru"
+
+
+# Prefix of Wikidata item identifiers, e.g. "Q42".
+WIKIDATA_ITEM_PREFIX = "Q"
@@ -0,0 +1,317 @@
+"""
+Wikidata JSON dump reading and filtering.
+
+Wikidata dumps (`latest-all.json`, possibly compressed with bzip2 or gzip) are JSON arrays with one entity per line:
+
+    [
+    {"type":"item","id":"Q31",...},
+    {"type":"item","id":"Q8",...}
+    ]
+"""
+
+import bz2
+import gzip
+import logging
+import multiprocessing
+import re
+from array import array
+from pathlib import Path
+from typing import BinaryIO, Iterable, Iterator, Optional
+
+import numpy as np
+
+from metro.core import json_backend
+from metro.harvest.constants import WIKIDATA_ITEM_PREFIX
+from metro.harvest.wikidata import (
+    WIKIDATA_ITEM_METRO_STATION,
+    WIKIDATA_ITEM_RAILWAY_STATION,
+    WIKIDATA_ITEM_RAPID_TRANSIT,
+    WIKIDATA_ITEM_RAPID_TRANSIT_LINE,
+    WIKIDATA_ITEM_STATION_LOCATED_ON_SURFACE,
+    WIKIDATA_ITEM_STATION_LOCATED_UNDERGROUND,
+    WIKIDATA_ITEM_UNDERGROUND_RAILWAY_STATION,
+    WIKIDATA_PROPERTY_INSTANCE_OF,
+    WIKIDATA_PROPERTY_LINE,
+    WIKIDATA_PROPERTY_NEXT_STATION,
+    WIKIDATA_PROPERTY_TRANSITION_STATION,
+)
+
+__author__ = "Sergey Vartanov"
+__email__ = "me@enzet.ru"
+
+
+# Entity type and identifier in the beginning of dump line. Top-level keys come first in Wikidata dumps.
+ENTITY_ID_PATTERN: re.Pattern = re.compile(rb'^\{"type":"(\w+)","id":"([A-Z])(\d+)"')
+
+# Values of "instance of" property for entities that transport system extract should contain.
+TRANSIT_ITEM_TYPES: set[str] = {
+    WIKIDATA_ITEM_RAPID_TRANSIT,
+    WIKIDATA_ITEM_RAILWAY_STATION,
+    WIKIDATA_ITEM_UNDERGROUND_RAILWAY_STATION,
+    WIKIDATA_ITEM_METRO_STATION,
+    WIKIDATA_ITEM_RAPID_TRANSIT_LINE,
+    WIKIDATA_ITEM_STATION_LOCATED_UNDERGROUND,
+    WIKIDATA_ITEM_STATION_LOCATED_ON_SURFACE,
+}
+
+# Properties that refer from transport entities to other entities the extract should contain.
+TRANSIT_REFERENCE_PROPERTIES: list[str] = [
+    WIKIDATA_PROPERTY_LINE,
+    WIKIDATA_PROPERTY_NEXT_STATION,
+    WIKIDATA_PROPERTY_TRANSITION_STATION,
+]
+
+
+# Suffixes of compressed dumps, that are decompressed on the fly by `open_dump`.
+COMPRESSED_SUFFIXES: list[str] = [".bz2", ".gz"]
+
+
+def open_dump(path: Path) -> BinaryIO:
+    """Open dump file for binary reading, decompress it on the fly if needed."""
+    if path.suffix == ".bz2":
+        return bz2.open(path, "rb")
+    if path.suffix == ".gz":
+        return gzip.open(path, "rb")
+    return path.open("rb")
+
+
+def parse_entity_line(line: bytes) -> Optional[dict]:
+    """Parse entity from dump line or return None if line contains no entity (e.g. array brackets)."""
+    line = line.strip().rstrip(b",")
+    if not line.startswith(b"{"):
+        return None
+    return json_backend.loads(line)
+
+
+def get_entity_id(line: bytes) -> Optional[int]:
+    """
+    Get numeric Wikidata item identifier of dump line without parsing the whole line if possible. Return None for
+    non-item entities (e.g. properties) and lines without entities.
+    """
+    if matcher := ENTITY_ID_PATTERN.match(line):
+        if matcher.group(1) == b"item" and matcher.group(2) == WIKIDATA_ITEM_PREFIX.encode():
+            return int(matcher.group(3))
+        return None
+
+    entity: Optional[dict] = parse_entity_line(line)
+    if entity and entity.get("id", "").startswith(WIKIDATA_ITEM_PREFIX):
+        return int(entity["id"][1:])
+
+    return None
+
+
+def iterate_lines(path: Path) -> Iterator[tuple[int, bytes]]:
+    """Stream dump lines together with their offsets in the uncompressed dump."""
+    offset: int = 0
+    with open_dump(path) as input_file:
+        for line in input_file:
+            yield offset, line
+            offset += len(line)
+
+
+class WikidataDumpParser:
+    """
+    Wikidata items source with the same interface as `WikidataParser` that reads items from local uncompressed
+    Wikidata JSON dump or its extract instead of Wikidata API.
+
+    On first use, the dump is streamed once to build item identifier to byte offset index, that is stored next to the
+    dump. Later items are read by seeking directly to their lines. The index is stored as `.npy` array of identifiers
+    and offsets sorted by identifiers, and is memory-mapped, so that it is never loaded into memory as a whole.
+    """
+
+    def __init__(self, dump_path: Path, index_path: Optional[Path] = None) -> None:
+        """
+        :param dump_path: path to uncompressed Wikidata JSON dump or extract
+        :param index_path: path to index file, `<dump path>.index` by default
+        :raises ValueError: if dump is compressed: compressed files cannot be read from arbitrary offsets, use
+            `extract_transit_entities` to get uncompressed extract
+        """
+        if dump_path.suffix in COMPRESSED_SUFFIXES:
+            raise ValueError(
+                f"cannot look up items in compressed dump {dump_path}, decompress it or use transport extract"
+            )
+        self.dump_path: Path = dump_path
+        self.index_path: Path = index_path if index_path else dump_path.with_name(dump_path.name + ".index")
+        self.index: Optional[np.ndarray] = None
+
+    def get_index(self) -> np.ndarray:
+        """
+        Get item index, load or build it if needed.
+
+        :return: array with two rows: sorted item identifiers and offsets of their lines
+        """
+        if self.index is None:
+            if self.index_path.exists() and self.index_path.stat().st_mtime >= self.dump_path.stat().st_mtime:
+                try:
+                    self.index = np.load(self.index_path, mmap_mode="r")
+                except ValueError:
+                    logging.warning(f"cannot read index {self.index_path}, rebuilding it")
+            if self.index is None:
+                self.build_index()
+                self.index = np.load(self.index_path, mmap_mode="r")
+        return self.index
+
+    def build_index(self) -> None:
+        """Stream the dump and store offsets of all item lines."""
+        logging.info(f"indexing {self.dump_path}")
+
+        # Compact arrays instead of lists of Python integers, there may be hundreds of millions of items.
+        ids: array = array("q")
+        offsets: array = array("q")
+        for offset, line in iterate_lines(self.dump_path):
+            wikidata_id: Optional[int] = get_entity_id(line)
+            if wikidata_id is not None:
+                ids.append(wikidata_id)
+                offsets.append(offset)
+
+        index: np.ndarray = np.stack([np.frombuffer(ids, dtype=np.int64), np.frombuffer(offsets, dtype=np.int64)])
+        if index.shape[1]:
+            index = index[:, np.argsort(index[0], kind="stable")]
+            # Keep the last line of item if it occurs several times.
+            is_last: np.ndarray = np.append(index[0, 1:] != index[0, :-1], True)
+            index = index[:, is_last]
+
+        with self.index_path.open("wb") as output_file:
+            np.save(output_file, np.ascontiguousarray(index))
+
+    def parse_wikidata(self, wikidata_id: int) -> dict:
+        """Parse Wikidata item by its ID."""
+        return self.parse_wikidata_many([wikidata_id])[wikidata_id]
+
+    def parse_wikidata_many(self, wikidata_ids: Iterable[int]) -> dict[int, dict]:
+        """
+        Parse several Wikidata items at once. Items are read in the order of their offsets, so that the dump is read
+        forward only.
+
+        :param wikidata_ids: Wikidata item unique identifiers
+        :return: Wikidata item structures by item identifiers; items that are not in the dump are omitted
+        """
+        index: np.ndarray = self.get_index()
+        requested_ids: list[int] = list(dict.fromkeys(wikidata_ids))
+        structures: dict[int, dict] = {}
+        if not requested_ids:
+            return structures
+
+        ids, item_offsets = index
+        positions: list[int] = np.searchsorted(ids, requested_ids).tolist()
+
+        offsets: dict[int, int] = {}
+        for wikidata_id, position in zip(requested_ids, positions):
+            if position < len(ids) and ids[position] == wikidata_id:
+                offsets[wikidata_id] = int(item_offsets[position])
+            else:
+                logging.error(f"no entity {WIKIDATA_ITEM_PREFIX}{wikidata_id} in dump")
+
+        with self.dump_path.open("rb") as input_file:
+            for wikidata_id in sorted(offsets, key=offsets.__getitem__):
+                input_file.seek(offsets[wikidata_id])
+                entity: dict = parse_entity_line(input_file.readline())
+                structures[wikidata_id] = {"entities": {WIKIDATA_ITEM_PREFIX + str(wikidata_id): entity}}
+
+        return {x: structures[x] for x in offsets}
+
+
+def get_item_ids(entity: dict, property_: str) -> list[int]:
+    """Get numeric identifiers of items that are values of entity property."""
+    ids: list[int] = []
+    for claim in entity.get("claims", {}).get(property_, []):
+        value = claim["mainsnak"].get("datavalue", {}).get("value")
+        if isinstance(value, dict) and "numeric-id" in value:
+            ids.append(value["numeric-id"])
+    return ids
+
+
+def filter_transit_lines(lines: list[bytes]) -> list[tuple[bytes, list[int]]]:
+    """
+    Select dump lines with transport entities.
+
+    :param lines: dump lines
+    :return: selected lines without trailing separators together with identifiers of items they refer to
+    """
+    result: list[tuple[bytes, list[int]]] = []
+
+    for line in lines:
+        entity: Optional[dict] = parse_entity_line(line)
+        if entity is None or entity.get("type") != "item":
+            continue
+        types: list[int] = get_item_ids(entity, WIKIDATA_PROPERTY_INSTANCE_OF)
+        if not any(WIKIDATA_ITEM_PREFIX + str(x) in TRANSIT_ITEM_TYPES for x in types):
+            continue
+        references: list[int] = []
+        for property_ in TRANSIT_REFERENCE_PROPERTIES:
+            references += get_item_ids(entity, property_)
+        result.append((line.strip().rstrip(b","), references))
+
+    return result
+
+
+def iterate_chunks(path: Path, chunk_size: int) -> Iterator[list[bytes]]:
+    chunk: list[bytes] = []
+    for _, line in iterate_lines(path):
+        chunk.append(line)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def extract_transit_entities(
+    dump_path: Path, output_path: Path, processes: Optional[int] = None, chunk_size: int = 1000
+) -> int:
+    """
+    Write transport-only extract of Wikidata dump, that can be used as `WikidataDumpParser` source.
+
+    The extract contains items that are instances of `TRANSIT_ITEM_TYPES` and items they directly refer to with
+    `TRANSIT_REFERENCE_PROPERTIES` (e.g. lines of unusual type). Dump lines are parsed in parallel by a process pool
+    in one pass. Referred items that were not selected are then picked in the second pass, that checks only
+    identifiers in the beginning of lines, does not parse JSON, and stops as soon as all of them are found.
+
+    The second pass reads the dump again (and decompresses it again for compressed dumps) whenever some referred item
+    was not selected. Items may be referred to from later lines of the dump, so picking them in the first pass would
+    require keeping offsets of all items of the dump (more than 100 million for the full dump), which is traded for
+    the time of the second pass.
+
+    :param dump_path: path to Wikidata JSON dump, optionally compressed with bzip2 or gzip
+    :param output_path: path to uncompressed output extract
+    :param processes: number of worker processes, number of CPUs by default
+    :param chunk_size: number of lines sent to worker process at once
+    :return: number of written items
+    """
+    selected_ids: set[int] = set()
+    referenced_ids: set[int] = set()
+    count: int = 0
+
+    with output_path.open("wb") as output_file:
+        output_file.write(b"[\n")
+
+        def write(line: bytes) -> None:
+            nonlocal count
+            if count:
+                output_file.write(b",\n")
+            output_file.write(line)
+            count += 1
+
+        with multiprocessing.Pool(processes) as pool:
+            for result in pool.imap(filter_transit_lines, iterate_chunks(dump_path, chunk_size)):
+                for line, references in result:
+                    selected_ids.add(get_entity_id(line))
+                    referenced_ids.update(references)
+                    write(line)
+
+        logging.info(f"selected {count} transport items from {dump_path}")
+
+        referenced_ids -= selected_ids
+        if referenced_ids:
+            for _, line in iterate_lines(dump_path):
+                if (wikidata_id := get_entity_id(line)) in referenced_ids:
+                    referenced_ids.remove(wikidata_id)
+                    write(line.strip().rstrip(b","))
+                    if not referenced_ids:
+                        break
+
+        output_file.write(b"\n]\n")
+
+    logging.info(f"written {count} items to {output_path}")
+
+    return count
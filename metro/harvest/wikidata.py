@@ -1,22 +1,24 @@
-import json
+import asyncio
 import logging
 import re
-from dataclasses import dataclass
-from datetime import datetime
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from functools import cached_property
 from pathlib import Path
-from typing import Any, Optional
+from typing import Any, Iterable, Optional
 
-from metro.core import data, network
+from metro.core import data, json_backend, network
 from metro.core.line import Line
 from metro.core.station import ConnectionType, ObjectStatus, Station
 from metro.core.system import Map, System
+from metro.harvest.cache import DirectoryEntityCache, EntityCache, MemoryCache
+from metro.harvest.constants import WIKIDATA_ITEM_PREFIX
 
 __author__ = "Sergey Vartanov"
 __email__ = "me@enzet.ru"
 
 
-WIKIDATA_ITEM_PREFIX = "Q"
-
 WIKIDATA_PROPERTY_ROUTE_MAP = "P15"
 WIKIDATA_PROPERTY_TRANSPORT_NETWORK = "P16"
 WIKIDATA_PROPERTY_COUNTRY = "P17"
@@ -65,9 +67,21 @@ WIKIDATA_ITEM_STATION_LOCATED_ON_SURFACE = "Q22808404"
 
 WIKIDATA_TIME_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
 
+WIKIDATA_API_ADDRESS = "www.wikidata.org/w/api.php"
+
+# Maximum number of identifiers Wikidata API accepts in one `wbgetentities` request.
+WIKIDATA_MAX_IDS_PER_REQUEST = 50
+
 
 class WikidataItem:
-    """Item of Wikidata project."""
+    """
+    Item of Wikidata project.
+
+    Names, descriptions, aliases, site links, and claims are extracted from the raw entity structure on first access.
+    """
+
+    # Fields that should be extracted before the raw entity structure is released.
+    required_fields: list[str] = ["names", "site_links"]
 
     def __init__(self, structure: dict, wikidata_id: int) -> None:
         """
@@ -84,29 +98,43 @@ class WikidataItem:
             self.entity = None
         self.entity = structure["entities"][WIKIDATA_ITEM_PREFIX + str(wikidata_id)]
 
-        self.claims = self.entity["claims"] if "claims" in self.entity else {}
-
-        self.names: dict[str, str] = {}
-        if "labels" in self.entity:
-            for language in self.entity["labels"]:
-                self.names[language] = self.entity["labels"][language]["value"]
-
-        self.descriptions: dict[str, str] = {}
-        if "descriptions" in self.entity:
-            for language in self.entity["descriptions"]:
-                self.descriptions[language] = self.entity["descriptions"][language]["value"]
+    def release(self) -> None:
+        """
+        Extract required fields and drop the raw entity structure to save memory. Fields that are not required cannot
+        be accessed after that.
+        """
+        for name in self.required_fields:
+            getattr(self, name)
+        self.entity = None
+        self.__dict__.pop("claims", None)
 
-        self.aliases: dict[str, list[str]] = {}
-        if "aliases" in self.entity:
-            for language in self.entity["aliases"]:
-                self.aliases[language] = []
-                for alias in self.entity["aliases"][language]:
-                    self.aliases[language].append(alias["value"])
+    @cached_property
+    def claims(self) -> dict[str, list[dict]]:
+        return self.entity["claims"] if "claims" in self.entity else {}
 
-        self.site_links: dict[str, str] = {}
-        if "sitelinks" in self.entity:
-            for site in self.entity["sitelinks"]:
-                self.site_links[site] = self.entity["sitelinks"][site]["title"]
+    @cached_property
+    def names(self) -> dict[str, str]:
+        if "labels" not in self.entity:
+            return {}
+        return {language: label["value"] for language, label in self.entity["labels"].items()}
+
+    @cached_property
+    def descriptions(self) -> dict[str, str]:
+        if "descriptions" not in self.entity:
+            return {}
+        return {language: description["value"] for language, description in self.entity["descriptions"].items()}
+
+    @cached_property
+    def aliases(self) -> dict[str, list[str]]:
+        if "aliases" not in self.entity:
+            return {}
+        return {language: [x["value"] for x in aliases] for language, aliases in self.entity["aliases"].items()}
+
+    @cached_property
+    def site_links(self) -> dict[str, str]:
+        if "sitelinks" not in self.entity:
+            return {}
+        return {site: site_link["title"] for site, site_link in self.entity["sitelinks"].items()}
 
     def get_name(self, language: str = "en") -> Optional[str]:
         """
@@ -114,28 +142,18 @@ class WikidataItem:
 
         :param language: requested language of the name.
         """
-        if "labels" not in self.entity or language not in self.entity["labels"]:
-            return None
-        return self.entity["labels"][language]["value"]
+        return self.names.get(language)
 
     def has_name(self, language: str = "en") -> bool:
-        if "labels" not in self.entity:
-            return False
-        if language not in self.entity["labels"]:
-            return False
-        return (
-            language in self.entity["labels"]
-            and "value" in self.entity["labels"][language]
-            and self.entity["labels"][language]["value"]
-        )
+        return bool(self.names.get(language))
 
     def get_any_name(self) -> str:
         """Get any item name if it exists."""
-        if "labels" not in self.entity:
+        if not self.names:
             return "unknown"
-        if "en" in self.entity["labels"]:
-            return self.entity["labels"]["en"]["value"]
-        return next(iter(self.entity["labels"].values()))["value"]
+        if "en" in self.names:
+            return self.names["en"]
+        return next(iter(self.names.values()))
 
 
 class WikidataTime:
@@ -179,40 +197,74 @@ class WikidataStationItem(WikidataItem):
         },
     }
 
+    required_fields: list[str] = WikidataItem.required_fields + [
+        "structure_type",
+        "system_wikidata_ids",
+        "status",
+        "open_time",
+        "geo_position",
+        "altitude",
+        "line_wikidata_ids",
+        "next_connections",
+        "transition_connections",
+        "height",
+    ]
+
     def __init__(self, structure: dict, wikidata_id: int) -> None:
         super().__init__(structure, wikidata_id)
 
-        name: str = WIKIDATA_ITEM_PREFIX + str(wikidata_id)
+        self.stations: list[Station] = []
 
-        self.structure_type: Optional[str] = None
+        # if not self.line_wikidata_ids:
+        # FIXME: Line is empty for Moscow monorail stations. Have to think about more accurate fix.
+        # self.line_wikidata_ids = [0]
+
+    @cached_property
+    def structure_type(self) -> Optional[str]:
+        structure_type: Optional[str] = None
 
         if WIKIDATA_PROPERTY_INSTANCE_OF in self.claims:
             for claim in self.claims[WIKIDATA_PROPERTY_INSTANCE_OF]:
                 if get_value(claim)["id"] == WIKIDATA_ITEM_METRO_STATION:
                     _ = "metro"
                 if get_value(claim)["id"] == WIKIDATA_ITEM_STATION_LOCATED_ON_SURFACE:
-                    self.structure_type = "ground"
+                    structure_type = "ground"
                 if get_value(claim)["id"] == WIKIDATA_ITEM_STATION_LOCATED_UNDERGROUND:
-                    self.structure_type = "underground"
+                    structure_type = "underground"
+
+        return structure_type
 
-        self.system_wikidata_ids: set[int] = set()
+    @cached_property
+    def system_wikidata_ids(self) -> set[int]:
+        system_wikidata_ids: set[int] = set()
 
         if WIKIDATA_PROPERTY_PART_OF in self.claims:
-            self.system_wikidata_ids.add(get_value(self.claims[WIKIDATA_PROPERTY_PART_OF][0])["numeric-id"])
+            system_wikidata_ids.add(get_value(self.claims[WIKIDATA_PROPERTY_PART_OF][0])["numeric-id"])
 
         if WIKIDATA_PROPERTY_TRANSPORT_NETWORK in self.claims:
-            self.system_wikidata_ids.add(get_value(self.claims[WIKIDATA_PROPERTY_TRANSPORT_NETWORK][0])["numeric-id"])
+            system_wikidata_ids.add(get_value(self.claims[WIKIDATA_PROPERTY_TRANSPORT_NETWORK][0])["numeric-id"])
 
-        self.status = {}
+        return system_wikidata_ids
+
+    @cached_property
+    def status(self) -> dict[str, ObjectStatus]:
+        status: dict[str, ObjectStatus] = {}
 
         for language in self.type_map:
             if language in self.descriptions:
                 for pattern in self.type_map[language]:
                     if pattern in self.descriptions[language].lower():
-                        self.status = {"type": self.type_map[language][pattern]}
+                        status = {"type": self.type_map[language][pattern]}
                         break
 
-        self.open_time = None
+        if self.open_time and self.open_time > datetime.now():
+            status = {"type": ObjectStatus.UNDER_CONSTRUCTION}
+
+        return status
+
+    @cached_property
+    def open_time(self) -> Optional[datetime]:
+        name: str = WIKIDATA_ITEM_PREFIX + str(self.wikidata_id)
 
         if WIKIDATA_PROPERTY_DATE_OF_OFFICIAL_OPENING in self.claims:
             if "datavalue" not in self.claims[WIKIDATA_PROPERTY_DATE_OF_OFFICIAL_OPENING][0]["mainsnak"]:
@@ -220,23 +272,31 @@ class WikidataStationItem(WikidataItem):
             else:
                 point = get_value(self.claims[WIKIDATA_PROPERTY_DATE_OF_OFFICIAL_OPENING][0])
                 try:
-                    wikidata_time = WikidataTime(point)
-                    self.open_time = wikidata_time.time
-                    if wikidata_time.time > datetime.now():
-                        self.status = {"type": ObjectStatus.UNDER_CONSTRUCTION}
+                    return WikidataTime(point).time
                 except ValueError:
                     logging.warning("Invalid date: " + str(point))
 
-        self.geo_position: Optional[tuple[float, float]] = None
-        self.altitude: Optional[float] = None
+        return None
+
+    @cached_property
+    def geo_position(self) -> Optional[tuple[float, float]]:
+        if WIKIDATA_PROPERTY_COORDINATES in self.claims:
+            geo_structure: dict[str, float] = get_value(self.claims[WIKIDATA_PROPERTY_COORDINATES][0])
+            return geo_structure["latitude"], geo_structure["longitude"]
+        return None
 
+    @cached_property
+    def altitude(self) -> Optional[float]:
         if WIKIDATA_PROPERTY_COORDINATES in self.claims:
             geo_structure: dict[str, float] = get_value(self.claims[WIKIDATA_PROPERTY_COORDINATES][0])
-            self.geo_position = (geo_structure["latitude"], geo_structure["longitude"])
             if "altitude" in geo_structure:
-                self.altitude = geo_structure["altitude"]
+                return geo_structure["altitude"]
+        return None
 
-        self.line_wikidata_ids: list[int] = []
+    @cached_property
+    def line_wikidata_ids(self) -> list[int]:
+        name: str = WIKIDATA_ITEM_PREFIX + str(self.wikidata_id)
+        line_wikidata_ids: list[int] = []
 
         if WIKIDATA_PROPERTY_LINE in self.claims:
             for claim in self.claims[WIKIDATA_PROPERTY_LINE]:
@@ -248,9 +308,14 @@ class WikidataStationItem(WikidataItem):
                     if WIKIDATA_PROPERTY_END_DATE in qualifiers:
                         continue
                 line_wikidata_id: int = get_value(claim)["numeric-id"]
-                self.line_wikidata_ids.append(line_wikidata_id)
+                line_wikidata_ids.append(line_wikidata_id)
 
-        self.next_connections: list[list[int, int]] = []
+        return line_wikidata_ids
+
+    @cached_property
+    def next_connections(self) -> list[list[int, int]]:
+        name: str = WIKIDATA_ITEM_PREFIX + str(self.wikidata_id)
+        next_connections: list[list[int, int]] = []
 
         if WIKIDATA_PROPERTY_NEXT_STATION in self.claims:
             for claim in self.claims[WIKIDATA_PROPERTY_NEXT_STATION]:
@@ -273,9 +338,14 @@ class WikidataStationItem(WikidataItem):
                 if len(self.line_wikidata_ids) == 1:
                     line_wikidata_id = self.line_wikidata_ids[0]
 
-                self.next_connections.append([next_station_wikidata_id, line_wikidata_id])
+                next_connections.append([next_station_wikidata_id, line_wikidata_id])
+
+        return next_connections
 
-        self.transition_connections: list[int] = []
+    @cached_property
+    def transition_connections(self) -> list[int]:
+        name: str = WIKIDATA_ITEM_PREFIX + str(self.wikidata_id)
+        transition_connections: list[int] = []
 
         if WIKIDATA_PROPERTY_TRANSITION_STATION in self.claims:
             for claim in self.claims[WIKIDATA_PROPERTY_TRANSITION_STATION]:
@@ -283,9 +353,13 @@ class WikidataStationItem(WikidataItem):
                     logging.warning(f"[WIKIDATA] no value for next station for {name}")
                     continue
                 transition_station_wikidata_id: int = get_value(claim)["numeric-id"]
-                self.transition_connections.append(transition_station_wikidata_id)
+                transition_connections.append(transition_station_wikidata_id)
 
-        self.height = None
+        return transition_connections
+
+    @cached_property
+    def height(self) -> Optional[float]:
+        height: Optional[float] = None
 
         if WIKIDATA_PROPERTY_VERTICAL_DEPTH in self.claims:
             for claim in self.claims[WIKIDATA_PROPERTY_VERTICAL_DEPTH]:
@@ -293,15 +367,11 @@ class WikidataStationItem(WikidataItem):
                     logging.warning("[WIKIDATA] no value vertical depth for station")
                     continue
                 if get_value(claim)["unit"].endswith(WIKIDATA_ITEM_METER):
-                    self.height: float = -float(get_value(claim)["amount"])
+                    height = -float(get_value(claim)["amount"])
                 else:
                     logging.warning(f"unsupported unit {get_value(claim)['unit']}")
 
-        self.stations: list[Station] = []
-
-        # if not self.line_wikidata_ids:
-        # FIXME: Line is empty for Moscow monorail stations. Have to think about more accurate fix.
-        # self.line_wikidata_ids = [0]
+        return height
 
     def fill_station(self, station: Station):
         station.set_names(self.names)
@@ -375,17 +445,181 @@ class WikidataSystemItem(WikidataItem):
 
 @dataclass
 class WikidataParser:
-    cache_directory: Path
+    """
+    Wikidata items getter that uses Wikidata API and stores responses in the cache.
+
+    If cache backend is not specified, one file per item in the cache directory is used. If maximum cache age is
+    specified, older cached items are revalidated: items with changed revision are requested again, others are marked
+    as fresh. Decoded structures are also kept in memory, so repeated requests for the same item are not decoded
+    again.
+    """
+
+    cache_directory: Optional[Path] = None
+    cache: Optional[EntityCache] = None
+    max_age: Optional[timedelta] = None
+
+    # Already decoded structures, `None` to disable.
+    memory_cache: Optional[MemoryCache] = field(default_factory=MemoryCache)
+
+    def __post_init__(self) -> None:
+        if self.cache is None:
+            self.cache = DirectoryEntityCache(self.cache_directory)
 
     def parse_wikidata(self, wikidata_id: int) -> dict:
         """Parse Wikidata item by its ID."""
-        parameters = {"action": "wbgetentities", "format": "json", "ids": WIKIDATA_ITEM_PREFIX + str(wikidata_id)}
-        content: bytes = network.get(
-            "www.wikidata.org/w/api.php",
-            parameters,
-            self.cache_directory / (WIKIDATA_ITEM_PREFIX + str(wikidata_id)),
-        )
-        return json.loads(content.decode())
+        return self.parse_wikidata_many([wikidata_id])[wikidata_id]
+
+    def parse_wikidata_many(self, wikidata_ids: Iterable[int]) -> dict[int, dict]:
+        """
+        Parse several Wikidata items at once.
+
+        All cached items are looked up at once, all other items are requested with as few `wbgetentities` calls as
+        possible. Every returned entity is stored into the cache separately, so that `parse_wikidata` can use it later.
+
+        :param wikidata_ids: Wikidata item unique identifiers
+        :return: Wikidata item structures by item identifiers; items that cannot be obtained are omitted
+        """
+        wikidata_ids: list[int] = list(dict.fromkeys(wikidata_ids))
+
+        structures: dict[int, dict] = {}
+        if self.memory_cache:
+            for wikidata_id in wikidata_ids:
+                structure: Optional[dict] = self.memory_cache.get(wikidata_id)
+                if structure is not None:
+                    structures[wikidata_id] = structure
+
+        cached_structures: dict[int, dict] = self.get_cached([x for x in wikidata_ids if x not in structures])
+
+        if self.max_age is not None:
+            threshold: float = time.time() - self.max_age.total_seconds()
+            fetch_times: dict[int, float] = self.cache.get_fetch_times(cached_structures.keys())
+            expired: list[int] = [x for x in cached_structures if fetch_times.get(x, 0.0) < threshold]
+            for wikidata_id in self.revalidate({x: cached_structures[x] for x in expired}):
+                del cached_structures[wikidata_id]
+
+        structures |= cached_structures
+        structures |= self.request_many([x for x in wikidata_ids if x not in structures])
+
+        return {x: structures[x] for x in wikidata_ids if x in structures}
+
+    def refresh(self, wikidata_ids: Iterable[int]) -> list[int]:
+        """
+        Revalidate cached items regardless of their age and request changed ones again.
+
+        :param wikidata_ids: Wikidata item unique identifiers, items that are not cached are ignored
+        :return: identifiers of changed items
+        """
+        changed: list[int] = self.revalidate(self.get_cached(wikidata_ids))
+        self.request_many(changed)
+        return changed
+
+    def get_cached(self, wikidata_ids: Iterable[int]) -> dict[int, dict]:
+        structures: dict[int, dict] = {}
+        for wikidata_id, content in self.cache.get_many(wikidata_ids).items():
+            structures[wikidata_id] = json_backend.loads(content)
+            if self.memory_cache:
+                self.memory_cache.put(wikidata_id, structures[wikidata_id], len(content))
+        return structures
+
+    def revalidate(self, structures: dict[int, dict]) -> list[int]:
+        """
+        Compare revisions of cached items with current ones, using one `wbgetentities` request per
+        `WIKIDATA_MAX_IDS_PER_REQUEST` items. Unchanged items are marked as fresh in the cache.
+
+        :param structures: cached Wikidata item structures by item identifiers
+        :return: identifiers of items that have changed since they were cached
+        """
+        wikidata_ids: list[int] = list(structures)
+        changed: list[int] = []
+        unchanged: list[int] = []
+
+        for index in range(0, len(wikidata_ids), WIKIDATA_MAX_IDS_PER_REQUEST):
+            batch: list[int] = wikidata_ids[index : index + WIKIDATA_MAX_IDS_PER_REQUEST]
+            parameters: dict[str, str] = {
+                "action": "wbgetentities",
+                "format": "json",
+                "props": "info",
+                "ids": "|".join(WIKIDATA_ITEM_PREFIX + str(x) for x in batch),
+            }
+            content: Optional[bytes] = network.request(WIKIDATA_API_ADDRESS, parameters)
+            if not content:
+                logging.error(f"cannot get revisions of {len(batch)} Wikidata items, using cached ones")
+                continue
+
+            entities: dict[str, Any] = json_backend.loads(content).get("entities", {})
+
+            for wikidata_id in batch:
+                key: str = WIKIDATA_ITEM_PREFIX + str(wikidata_id)
+                revision: Optional[int] = entities.get(key, {}).get("lastrevid")
+                cached_entity: dict[str, Any] = structures[wikidata_id].get("entities", {}).get(key, {})
+                if revision is not None and revision == cached_entity.get("lastrevid"):
+                    unchanged.append(wikidata_id)
+                else:
+                    changed.append(wikidata_id)
+
+        self.cache.touch_many(unchanged)
+
+        return changed
+
+    def request_many(self, wikidata_ids: list[int]) -> dict[int, dict]:
+        """
+        Request Wikidata items with as few `wbgetentities` calls as possible and store them into the cache.
+
+        :param wikidata_ids: Wikidata item unique identifiers
+        :return: Wikidata item structures by item identifiers; items that cannot be obtained are omitted
+        """
+        structures: dict[int, dict] = {}
+
+        for index in range(0, len(wikidata_ids), WIKIDATA_MAX_IDS_PER_REQUEST):
+            batch: list[int] = wikidata_ids[index : index + WIKIDATA_MAX_IDS_PER_REQUEST]
+            parameters: dict[str, str] = {
+                "action": "wbgetentities",
+                "format": "json",
+                "ids": "|".join(WIKIDATA_ITEM_PREFIX + str(x) for x in batch),
+            }
+            content: Optional[bytes] = network.request(WIKIDATA_API_ADDRESS, parameters)
+            if not content:
+                logging.error(f"cannot get {len(batch)} Wikidata items")
+                continue
+
+            entities: dict[str, Any] = json_backend.loads(content).get("entities", {})
+            contents: dict[int, bytes] = {}
+
+            for wikidata_id in batch:
+                key: str = WIKIDATA_ITEM_PREFIX + str(wikidata_id)
+                if key not in entities:
+                    logging.error(f"no entity {key} in Wikidata response")
+                    continue
+                structure: dict = {"entities": {key: entities[key]}}
+                contents[wikidata_id] = json_backend.dumps(structure)
+                structures[wikidata_id] = structure
+                if self.memory_cache:
+                    self.memory_cache.put(wikidata_id, structure, len(contents[wikidata_id]))
+
+            self.cache.put_many(contents)
+
+        return structures
+
+
+class PrefetchedWikidataParser:
+    """Wikidata parser that serves already fetched items from memory and falls back to another parser."""
+
+    def __init__(self, structures: dict[int, dict], fallback: WikidataParser) -> None:
+        self.structures: dict[int, dict] = structures
+        self.fallback: WikidataParser = fallback
+
+    def parse_wikidata(self, wikidata_id: int) -> dict:
+        if wikidata_id in self.structures:
+            return self.structures[wikidata_id]
+        return self.fallback.parse_wikidata(wikidata_id)
+
+    def parse_wikidata_many(self, wikidata_ids: Iterable[int]) -> dict[int, dict]:
+        wikidata_ids: list[int] = list(wikidata_ids)
+        structures: dict[int, dict] = {x: self.structures[x] for x in wikidata_ids if x in self.structures}
+        missing: list[int] = [x for x in wikidata_ids if x not in structures]
+        if missing:
+            structures |= self.fallback.parse_wikidata_many(missing)
+        return structures
 
 
 class WikidataCityParser:
@@ -417,6 +651,146 @@ class WikidataCityParser:
         for system_wikidata_id in systems_dict:
             self.systems_dict[system_wikidata_id] = map_.systems[systems_dict[system_wikidata_id]]
 
+    async def parse_async(self, limit: Optional[int] = None, concurrency: int = 8) -> None:
+        """
+        Parse the same way as `parse` does, but fetch all Wikidata items concurrently first.
+
+        :param limit: maximum number of stations to parse
+        :param concurrency: maximum number of `parse_wikidata_many` calls in flight
+        """
+        wikidata_parser: WikidataParser = self.wikidata_parser
+        self.wikidata_parser = PrefetchedWikidataParser(await self.prefetch(limit, concurrency), wikidata_parser)
+        try:
+            self.parse(limit)
+        finally:
+            self.wikidata_parser = wikidata_parser
+
+    async def prefetch(self, limit: Optional[int] = None, concurrency: int = 8) -> dict[int, dict]:
+        """
+        Fetch all Wikidata items that `parse` will request.
+
+        Stations and lines are requested by a bounded number of workers, each taking up to
+        `WIKIDATA_MAX_IDS_PER_REQUEST` queued items at once. The frontier is expanded with the same rules as `parse`
+        uses as soon as a station and all its lines are fetched or failed to be fetched.
+
+        :param limit: maximum number of stations to parse, stations `parse` stops at are not expanded
+        :param concurrency: maximum number of `parse_wikidata_many` calls in flight
+        :return: Wikidata item structures by item identifiers
+        """
+        structures: dict[int, dict] = {}
+        queue: asyncio.Queue = asyncio.Queue()
+        requested: set[int] = set()
+        # Items that were requested but could not be fetched.
+        failed: set[int] = set()
+        station_ids: set[int] = set()
+        line_ids: set[int] = set()
+        line_items: dict[int, WikidataLineItem] = {}
+        # Lines that were fetched or could not be fetched.
+        resolved_line_ids: set[int] = set()
+        processed_station_ids: set[int] = set()
+
+        # Stations waiting for their lines to be fetched.
+        waiting_station_items: dict[int, WikidataStationItem] = {}
+
+        def request(wikidata_id: int) -> None:
+            if wikidata_id not in requested:
+                requested.add(wikidata_id)
+                queue.put_nowait(wikidata_id)
+            elif wikidata_id in structures:
+                process(wikidata_id)
+            elif wikidata_id in failed:
+                resolve_line(wikidata_id)
+
+        def add_station(wikidata_id: int) -> None:
+            if wikidata_id not in station_ids:
+                station_ids.add(wikidata_id)
+                request(wikidata_id)
+
+        def add_line(wikidata_id: int) -> None:
+            if wikidata_id not in line_ids:
+                line_ids.add(wikidata_id)
+                request(wikidata_id)
+
+        def expand(station_item: WikidataStationItem) -> None:
+            """Add neighbour stations if the station is the part of systems of interest."""
+            system_wikidata_ids: set[int] = station_item.system_wikidata_ids | {
+                line_items[x].system_wikidata_id for x in station_item.line_wikidata_ids if x in line_items
+            }
+            if not any(x in self.systems_dict for x in system_wikidata_ids) and not any(
+                x in self.systems_dict for x in station_item.line_wikidata_ids
+            ):
+                return
+            for other_id in station_item.transition_connections:
+                add_station(other_id)
+            for other_id, _ in station_item.next_connections:
+                add_station(other_id)
+
+        def expand_waiting() -> None:
+            """Expand stations all lines of which are resolved."""
+            for station_wikidata_id, station_item in list(waiting_station_items.items()):
+                if all(x in resolved_line_ids for x in station_item.line_wikidata_ids):
+                    del waiting_station_items[station_wikidata_id]
+                    expand(station_item)
+
+        def resolve_line(wikidata_id: int) -> None:
+            if wikidata_id in line_ids and wikidata_id not in resolved_line_ids:
+                resolved_line_ids.add(wikidata_id)
+                expand_waiting()
+
+        def process(wikidata_id: int) -> None:
+            structure: dict = structures[wikidata_id]
+
+            if wikidata_id in line_ids and wikidata_id not in line_items:
+                line_items[wikidata_id] = WikidataLineItem(structure, wikidata_id, self.map.local_languages)
+                resolve_line(wikidata_id)
+
+            if wikidata_id in station_ids and wikidata_id not in processed_station_ids:
+                # `parse` stops after fetching the lines of the station that exceeds the limit.
+                if limit and len(processed_station_ids) > limit:
+                    return
+                processed_station_ids.add(wikidata_id)
+                station_item: WikidataStationItem = WikidataStationItem(structure, wikidata_id)
+                for line_wikidata_id in station_item.line_wikidata_ids:
+                    add_line(line_wikidata_id)
+                if not limit or len(processed_station_ids) <= limit:
+                    waiting_station_items[wikidata_id] = station_item
+                    expand_waiting()
+
+        async def work() -> None:
+            while True:
+                batch: list[int] = [await queue.get()]
+                while len(batch) < WIKIDATA_MAX_IDS_PER_REQUEST and not queue.empty():
+                    batch.append(queue.get_nowait())
+                try:
+                    fetched: dict[int, dict] = await asyncio.to_thread(self.wikidata_parser.parse_wikidata_many, batch)
+                    structures.update(fetched)
+                    for wikidata_id in fetched:
+                        process(wikidata_id)
+                    for wikidata_id in batch:
+                        if wikidata_id not in fetched:
+                            failed.add(wikidata_id)
+                            resolve_line(wikidata_id)
+                finally:
+                    for _ in batch:
+                        queue.task_done()
+
+        if self.wikidata_id:
+            request(self.wikidata_id)
+        for wikidata_id in self.to_parse_station_wikidata_ids:
+            add_station(wikidata_id)
+
+        workers: list[asyncio.Task] = [asyncio.create_task(work()) for _ in range(concurrency)]
+        joined: asyncio.Task = asyncio.create_task(queue.join())
+        await asyncio.wait([joined, *workers], return_when=asyncio.FIRST_COMPLETED)
+
+        for task in [joined, *workers]:
+            task.cancel()
+        for result in await asyncio.gather(joined, *workers, return_exceptions=True):
+            if isinstance(result, Exception):
+                raise result
+
+        return structures
+
     def parse(self, limit: Optional[int] = None) -> None:
 
         # TODO: add filter, so we can parse only stations of one line, or at least of one city.
@@ -432,11 +806,30 @@ class WikidataCityParser:
         station_items: dict[int, WikidataStationItem] = {}
         line_items: dict[int, WikidataLineItem] = {}
 
+        # Wikidata structures of the stations that are already fetched but not yet processed.
+        station_structures: dict[int, dict] = {}
+        # Stations that were requested, including the ones that could not be fetched.
+        requested_station_wikidata_ids: set[int] = set()
+
         count: int = 0
         while len(self.to_parse_station_wikidata_ids) > 0:
             wikidata_id: int = self.to_parse_station_wikidata_ids.pop()
 
-            structure: dict = self.wikidata_parser.parse_wikidata(wikidata_id)
+            if wikidata_id not in requested_station_wikidata_ids:
+                # Fetch the whole frontier at once, except for stations that were already requested.
+                frontier: list[int] = [
+                    x
+                    for x in [wikidata_id] + list(self.to_parse_station_wikidata_ids)
+                    if x not in requested_station_wikidata_ids
+                ]
+                requested_station_wikidata_ids |= set(frontier)
+                station_structures |= self.wikidata_parser.parse_wikidata_many(frontier)
+            if wikidata_id not in station_structures:
+                logging.error(f"cannot get station {WIKIDATA_ITEM_PREFIX}{wikidata_id}")
+                self.parsed_station_wikidata_ids.add(wikidata_id)
+                continue
+
+            structure: dict = station_structures.pop(wikidata_id)
             station_item: WikidataStationItem = WikidataStationItem(structure, wikidata_id)
             pattern: str
             for pattern in self.network_update:
@@ -445,17 +838,28 @@ class WikidataCityParser:
                     structure: dict = self.wikidata_parser.parse_wikidata(wikidata_id)
                     station_item = WikidataStationItem(structure, wikidata_id)
 
+            # Keep only extracted fields of the items, not the whole Wikidata structures.
+            station_item.release()
+
             self.parsed_station_wikidata_ids.add(wikidata_id)
 
+            line_structures: dict[int, dict] = self.wikidata_parser.parse_wikidata_many(
+                [x for x in station_item.line_wikidata_ids if x not in self.parsed_line_wikidata_ids]
+            )
+
             line_wikidata_id: int
             for line_wikidata_id in station_item.line_wikidata_ids:
                 if line_wikidata_id not in self.parsed_line_wikidata_ids:
-                    structure: dict = self.wikidata_parser.parse_wikidata(line_wikidata_id)
+                    self.parsed_line_wikidata_ids.add(line_wikidata_id)
+                    structure: Optional[dict] = line_structures.get(line_wikidata_id)
+                    if structure is None:
+                        logging.warning(f"cannot get line {WIKIDATA_ITEM_PREFIX}{line_wikidata_id}")
+                        continue
                     line_item: WikidataLineItem = WikidataLineItem(
                         structure, line_wikidata_id, self.map.local_languages
                     )
+                    line_item.release()
                     line_items[line_wikidata_id] = line_item
-                    self.parsed_line_wikidata_ids.add(line_wikidata_id)
 
             count += 1
             if limit and count > limit:
@@ -463,7 +867,8 @@ class WikidataCityParser:
 
             line_wikidata_id: int
             for line_wikidata_id in station_item.line_wikidata_ids:
-                station_item.system_wikidata_ids.add(line_items[line_wikidata_id].system_wikidata_id)
+                if line_wikidata_id in line_items:
+                    station_item.system_wikidata_ids.add(line_items[line_wikidata_id].system_wikidata_id)
 
             # If this station is not the part of systems of interest, skip it.
 
@@ -615,4 +1020,4 @@ class WikidataCityParser:
                     if line in system.lines.values():
                         station_system = system
                 if station_system:
-                    station_system.stations[station.id_] = station
+                    station_system.add_station(station)
@@ -0,0 +1,51 @@
+"""
+Throughput of station and line name extraction over test corpus of station and line labels.
+
+Run with `python -m tests.benchmark_data`.
+"""
+
+import re
+import timeit
+from typing import Callable
+
+from metro.core.data import extract_line_name, extract_station_name, line_name_dict, station_name_dict
+from tests.test_data import lines, stations
+
+__author__ = "Sergey Vartanov"
+__email__ = "me@enzet.ru"
+
+
+def extract_uncompiled(name: str, language: str, pattern_dict: dict[str, list[str]]) -> str:
+    """Extraction with `re.match` on pattern strings, as it was done before patterns were compiled."""
+    for pattern in pattern_dict.get(language, []):
+        if matcher := re.match(pattern, name):
+            return matcher.group("name")
+    return name
+
+
+def measure(function: Callable[[str, str], str], corpus: list[tuple[str, str]], number: int) -> float:
+    """Get number of extractions per second."""
+    seconds: float = timeit.timeit(lambda: [function(name, language) for name, language in corpus], number=number)
+    return len(corpus) * number / seconds
+
+
+def main(number: int = 2000) -> None:
+    station_corpus: list[tuple[str, str]] = [(x[0], language) for language in stations for x in stations[language]]
+    line_corpus: list[tuple[str, str]] = [(x[0], language) for language in lines for x in lines[language]]
+
+    for title, corpus, compiled, uncompiled in [
+        (
+            "stations",
+            station_corpus,
+            extract_station_name,
+            lambda x, y: extract_uncompiled(x.replace("&", "and"), y, station_name_dict),
+        ),
+        ("lines", line_corpus, extract_line_name, lambda x, y: extract_uncompiled(x, y, line_name_dict)),
+    ]:
+        before: float = measure(uncompiled, corpus, number)
+        after: float = measure(compiled, corpus, number)
+        print(f"{title}: {before:,.0f} -> {after:,.0f} names per second ({after / before:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
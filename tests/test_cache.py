@@ -0,0 +1,58 @@
+from pathlib import Path
+
+from metro.harvest.cache import DirectoryEntityCache, EntityCache, MemoryCache, SQLiteEntityCache
+from metro.harvest.wikidata import WikidataParser
+
+
+def check_cache(cache: EntityCache) -> None:
+    assert cache.get(1) is None
+
+    cache.put(1, b'{"entities": {}}')
+    cache.put_many({x: str(x).encode() for x in range(2, 2000)})
+    cache.put(2, b"updated")
+
+    assert cache.get(1) == b'{"entities": {}}'
+    assert cache.get(2) == b"updated"
+
+    contents: dict[int, bytes] = cache.get_many(range(1990, 2010))
+    assert sorted(contents) == list(range(1990, 2000))
+    assert contents[1999] == b"1999"
+
+
+def test_directory_cache(tmp_path: Path) -> None:
+    check_cache(DirectoryEntityCache(tmp_path))
+
+
+def test_sqlite_cache(tmp_path: Path) -> None:
+    cache: SQLiteEntityCache = SQLiteEntityCache(tmp_path / "cache.db")
+    check_cache(cache)
+    cache.close()
+
+    cache = SQLiteEntityCache(tmp_path / "cache.db")
+    assert len(cache.get_many(range(3000))) == 1999
+
+
+def test_memory_cache() -> None:
+    """Least recently used structures should be evicted when entry or size limit is exceeded."""
+    cache: MemoryCache = MemoryCache(max_entries=3, max_bytes=100)
+
+    for wikidata_id in 1, 2, 3:
+        cache.put(wikidata_id, {"id": wikidata_id}, 10)
+    assert cache.get(1) == {"id": 1}
+
+    cache.put(4, {"id": 4}, 10)
+    assert cache.get(2) is None
+
+    cache.put(5, {"id": 5}, 75)
+    assert [x for x in (1, 3, 4, 5) if cache.get(x)] == [1, 4, 5]
+    assert cache.size == 95
+    assert (cache.hits, cache.misses) == (4, 2)
+
+
+def test_wikidata_parser_memory_cache(tmp_path: Path) -> None:
+    """Repeated requests for the same item should not read the cache again."""
+    (tmp_path / "Q1").write_bytes(b'{"entities": {"Q1": {}}}')
+    parser: WikidataParser = WikidataParser(tmp_path)
+
+    assert parser.parse_wikidata(1) is parser.parse_wikidata(1)
+    assert (parser.memory_cache.hits, parser.memory_cache.misses) == (1, 1)
@@ -0,0 +1,69 @@
+import math
+import random
+
+import numpy as np
+
+from metro.core.contraction import NO_SEGMENT, ContractedRouter
+from metro.core.line import Line
+from metro.core.routing import Route, Router, RoutingCosts
+from metro.core.station import ConnectionType, ObjectStatus, Station
+from metro.core.system import System
+from tests.test_routing import create_grid_system
+from tests.test_streaming import create_connected_system
+
+
+def add_circle_line(system: System, size: int) -> None:
+    """Add circle line without transitions."""
+    line: Line = Line({}, "Circle")
+    system.lines[line.id_] = line
+    for index in range(size):
+        station: Station = Station({}, f"Circle/S{index}", line=line)
+        angle: float = 2 * math.pi * index / size
+        station.geo_position = (55.05 + math.sin(angle) / 50, 37.1 + math.cos(angle) / 30)
+        system.add_station(station)
+    for index in range(size):
+        station: Station = system.stations[f"Circle/S{index}"]
+        next_station: Station = system.stations[f"Circle/S{(index + 1) % size}"]
+        station.add_connection(next_station, ConnectionType.NEXT)
+        next_station.add_connection(station, ConnectionType.NEXT)
+
+
+def test_contracted_route() -> None:
+    """Routes over contracted graph should be as cheap as routes over full graph."""
+    system: System = create_grid_system(10)
+    add_circle_line(system, 7)
+    costs: RoutingCosts = RoutingCosts(next_cost=1.0, next_cost_per_kilometer=1.5, transition_cost=3.0)
+    router: Router = Router(system, costs)
+    contracted: ContractedRouter = ContractedRouter(system, costs)
+
+    assert contracted.cost_per_meter > 0.0
+
+    core_count: int = sum(1 for x in contracted.station_segments if x == NO_SEGMENT)
+    assert core_count < len(system.stations) / 2
+
+    station_ids: list[str] = list(system.stations)
+    generator: random.Random = random.Random(2)
+    pairs: list[tuple[str, str]] = [tuple(generator.sample(station_ids, 2)) for _ in range(100)]
+    pairs += [("L0/S1", "L0/S3"), ("L0/S3", "L0/S1"), ("Circle/S1", "Circle/S5"), ("Circle/S6", "Circle/S0")]
+
+    for from_id, to_id in pairs:
+        expected: Route = router.route(from_id, to_id)
+        route: Route = contracted.route(from_id, to_id)
+        if expected is None:
+            assert route is None
+            continue
+        assert np.isclose(route.cost, expected.cost)
+        assert (route.station_ids[0], route.station_ids[-1]) == (from_id, to_id)
+        assert len(route.connection_types) == len(route.station_ids) - 1
+        for station_id, next_id in zip(route.station_ids, route.station_ids[1:]):
+            assert next_id in [x.to_.id_ for x in system.stations[station_id].connections]
+
+
+def test_contracted_hidden() -> None:
+    system: System = create_connected_system()
+    system.stations["Red/Park"].status = {"type": ObjectStatus.CLOSED}
+    router: ContractedRouter = ContractedRouter(system, exclude_hidden=True)
+
+    assert router.route("Blue/Airport", "Red/Central") is None
+    assert router.route("Red/Park", "Red/Park") is None
+    assert ContractedRouter(system).route("Blue/Airport", "Red/Central").cost == 6.0
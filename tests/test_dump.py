@@ -0,0 +1,86 @@
+import gzip
+import json
+from pathlib import Path
+
+import pytest
+
+from metro.harvest.dump import WikidataDumpParser, extract_transit_entities
+
+ENTITIES: list[dict] = [
+    {"type": "item", "id": "Q1", "labels": {"en": {"language": "en", "value": "Metro"}}, "claims": {}},
+    {"type": "property", "id": "P31", "claims": {}},
+    {"type": "item", "id": "Q11", "labels": {"en": {"language": "en", "value": "Ω"}}, "claims": {}},
+    {"type": "item", "id": "Q2", "claims": {}},
+]
+
+
+def write_dump(path: Path) -> None:
+    content: bytes = ("[\n" + ",\n".join(json.dumps(x, separators=(",", ":")) for x in ENTITIES) + "\n]\n").encode()
+    path.write_bytes(gzip.compress(content) if path.suffix == ".gz" else content)
+
+
+def check_dump(path: Path) -> None:
+    write_dump(path)
+
+    parser: WikidataDumpParser = WikidataDumpParser(path)
+    structures: dict[int, dict] = parser.parse_wikidata_many([2, 11, 5, 1])
+
+    assert list(structures) == [2, 11, 1]
+    assert structures[11] == {"entities": {"Q11": ENTITIES[2]}}
+    assert parser.index_path.exists()
+
+    assert WikidataDumpParser(path).parse_wikidata(1) == {"entities": {"Q1": ENTITIES[0]}}
+
+
+def test_dump(tmp_path: Path) -> None:
+    check_dump(tmp_path / "dump.json")
+
+
+def test_compressed_dump(tmp_path: Path) -> None:
+    """Items should not be looked up in compressed dump, where every seek would decompress the dump."""
+    write_dump(tmp_path / "dump.json.gz")
+    with pytest.raises(ValueError):
+        WikidataDumpParser(tmp_path / "dump.json.gz")
+
+
+def test_old_index(tmp_path: Path) -> None:
+    """Index in unknown format should be rebuilt."""
+    write_dump(tmp_path / "dump.json")
+    (tmp_path / "dump.json.index").write_text("1\t2\n")
+    assert WikidataDumpParser(tmp_path / "dump.json").parse_wikidata(2) == {"entities": {"Q2": ENTITIES[3]}}
+
+
+def claim(wikidata_id: int) -> dict:
+    return {"mainsnak": {"datavalue": {"value": {"id": f"Q{wikidata_id}", "numeric-id": wikidata_id}}}}
+
+
+def test_extract_transit_entities(tmp_path: Path) -> None:
+    """Extract should contain stations and items they refer to, and nothing else."""
+    entities: list[dict] = ENTITIES + [
+        {"type": "item", "id": "Q100", "claims": {"P31": [claim(928830)], "P81": [claim(200)], "P197": [claim(101)]}},
+        {"type": "item", "id": "Q101", "claims": {"P31": [claim(928830)], "P81": [claim(200)], "P197": [claim(100)]}},
+        {"type": "item", "id": "Q200", "claims": {"P31": [claim(5)]}},
+    ]
+    dump_path: Path = tmp_path / "dump.json.gz"
+    content: bytes = ("[\n" + ",\n".join(json.dumps(x, separators=(",", ":")) for x in entities) + "\n]\n").encode()
+    dump_path.write_bytes(gzip.compress(content))
+
+    extract_path: Path = tmp_path / "extract.json"
+    assert extract_transit_entities(dump_path, extract_path, processes=2, chunk_size=2) == 3
+
+    parser: WikidataDumpParser = WikidataDumpParser(extract_path)
+    assert parser.get_index()[0].tolist() == [100, 101, 200]
+    assert parser.parse_wikidata(200) == {"entities": {"Q200": entities[-1]}}
+    assert json.loads(extract_path.read_text()) == entities[-3:]
+
+
+def test_empty_extract(tmp_path: Path) -> None:
+    """Extract of dump without transport items should be valid empty source."""
+    write_dump(tmp_path / "dump.json")
+
+    extract_path: Path = tmp_path / "extract.json"
+    assert extract_transit_entities(tmp_path / "dump.json", extract_path, processes=1) == 0
+
+    parser: WikidataDumpParser = WikidataDumpParser(extract_path)
+    assert parser.get_index().shape == (2, 0)
+    assert parser.parse_wikidata_many([1]) == {}
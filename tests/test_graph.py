@@ -0,0 +1,29 @@
+import numpy as np
+
+from metro.core.graph import DANGLING, Graph, build_graph
+from metro.core.station import Connection, ConnectionType, Station
+from metro.core.system import System
+from tests.test_streaming import create_connected_system
+
+
+def test_build_graph() -> None:
+    system: System = create_connected_system()
+    system.stations["Blue/Airport"].connections.append(Connection(Station({}, "Green/Depot"), ConnectionType.NEXT))
+
+    graph: Graph = build_graph(
+        system, lambda station, connection: 2.0 if connection.type_ == ConnectionType.NEXT else 5.0
+    )
+
+    assert graph.station_ids == ["Red/Central", "Red/Park", "Blue/Central", "Blue/Airport"]
+    assert graph.offsets.tolist() == [0, 2, 4, 6, 8]
+    assert graph.targets.tolist() == [1, 3, 0, 2, 1, 3, 2, DANGLING]
+    assert graph.types.tolist() == [0, 1, 0, 0, 0, 0, 0, 0]
+    assert graph.weights.tolist() == [2.0, 5.0] + [2.0] * 6
+    assert graph.dangling_targets == {7: "Green/Depot"}
+
+    index: int = graph.get_index("Blue/Airport")
+    assert graph.get_neighbors(index).tolist() == [2]
+    assert graph.get_neighbors(0, ConnectionType.TRANSITION).tolist() == [3]
+    assert graph.get_sources().tolist() == [0, 0, 1, 1, 2, 2, 3, 3]
+    assert np.array_equal(graph.get_degrees(), [2, 2, 2, 2])
+    assert build_graph(system).weights is None
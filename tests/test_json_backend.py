@@ -0,0 +1,54 @@
+import json
+from typing import Any
+
+import pytest
+
+from metro.core import json_backend
+
+VALUES: list[Any] = [
+    {
+        "id": "metro",
+        "stations": [
+            {
+                "id": "Red/Ωmega",
+                "names": {"en": "Omega", "ru": "Омега", "zh": "奥米加"},
+                "geo_position": [55.75, 37.625],
+                "altitude": -12.5,
+                "connections": [{"to": "Red/Alpha", "type": "next"}],
+                "site_links": {},
+                "wikidata_id": 4201,
+                "status": {"type": 1},
+            }
+        ],
+        "lines": [],
+        "line_width": None,
+        "flags": [True, False],
+    },
+    [],
+    {},
+    'text with "quotes", \\ and /',
+]
+
+
+@pytest.mark.parametrize("backend", json_backend.get_available_backends())
+def test_round_trip(backend: str) -> None:
+    """Backends should decode and encode the same way the standard library does."""
+    json_backend.set_backend(backend)
+    try:
+        for value in VALUES:
+            assert json_backend.loads(json.dumps(value).encode()) == value
+            assert json_backend.loads(json.dumps(value, ensure_ascii=False)) == value
+            assert json.loads(json_backend.dumps(value)) == value
+            for indent in 2, 4:
+                assert json_backend.dumps(value, indent=indent).decode() == json.dumps(
+                    value, indent=indent, ensure_ascii=False
+                )
+        with pytest.raises(ValueError):
+            json_backend.loads(b"{")
+    finally:
+        json_backend.set_backend()
+
+
+def test_unknown_backend() -> None:
+    with pytest.raises(ValueError):
+        json_backend.set_backend("unknown")
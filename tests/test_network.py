@@ -0,0 +1,43 @@
+from pathlib import Path
+
+from metro.core import network
+from metro.core.network import TokenBucket
+
+
+def test_token_bucket(monkeypatch) -> None:
+    """Requests should wait only when the burst budget is exhausted."""
+    delays: list[float] = []
+    monkeypatch.setattr(network.time, "sleep", delays.append)
+
+    bucket: TokenBucket = TokenBucket(rate=1.0, capacity=3.0)
+
+    assert [bucket.acquire() for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert not delays
+
+    assert bucket.acquire() > 0.9
+    assert len(delays) == 1
+
+
+def test_cache_file(tmp_path: Path) -> None:
+    """Cache files should be read transparently whether they are compressed or not."""
+    data: bytes = b'{"entities": {"Q1": {}}}' * 100
+
+    network.write_cache_file(tmp_path / "compressed", data, "gzip")
+    (tmp_path / "raw").write_bytes(data)
+
+    assert (tmp_path / "compressed").read_bytes().startswith(network.GZIP_MAGIC)
+    assert (tmp_path / "compressed").stat().st_size < len(data)
+    assert network.read_cache_file(tmp_path / "compressed") == data
+    assert network.read_cache_file(tmp_path / "raw") == data
+
+
+def test_cache_file_without_compression(tmp_path: Path, monkeypatch) -> None:
+    """Explicit None should turn compression off for one write even if cache compression is set."""
+    monkeypatch.setattr(network, "cache_compression", "gzip")
+    data: bytes = b'{"entities": {"Q1": {}}}' * 100
+
+    network.write_cache_file(tmp_path / "raw", data, None)
+    network.write_cache_file(tmp_path / "default", data)
+
+    assert (tmp_path / "raw").read_bytes() == data
+    assert (tmp_path / "default").read_bytes().startswith(network.GZIP_MAGIC)
@@ -0,0 +1,93 @@
+import random
+from pathlib import Path
+
+import numpy as np
+
+from metro.core.line import Line
+from metro.core.routing import Route, Router, RoutingCosts, travel_time_matrix
+from metro.core.station import ConnectionType, ObjectStatus, Station
+from metro.core.system import System
+from tests.test_streaming import create_connected_system
+
+
+def test_route() -> None:
+    system: System = create_connected_system()
+
+    route: Route = system.route("Red/Central", "Blue/Airport")
+    assert route.station_ids == ["Red/Central", "Blue/Airport"]
+    assert route.connection_types == [ConnectionType.TRANSITION]
+    assert (route.cost, route.get_transfer_count()) == (5.0, 1)
+
+    route = system.route("Red/Central", "Blue/Airport", RoutingCosts(transition_cost=10.0))
+    assert route.station_ids == ["Red/Central", "Red/Park", "Blue/Central", "Blue/Airport"]
+    assert route.cost == 6.0
+
+    assert system.route("Red/Park", "Red/Park") == Route(["Red/Park"], [], 0.0)
+
+    system.stations["Red/Park"].status = {"type": ObjectStatus.CLOSED}
+    assert system.route("Blue/Airport", "Red/Central", exclude_hidden=True) is None
+    assert system.route("Blue/Airport", "Red/Central").cost == 6.0
+
+
+def create_grid_system(size: int) -> System:
+    """Create system of horizontal lines with random transitions between neighboring lines."""
+    generator: random.Random = random.Random(0)
+    system: System = System({}, "grid")
+    for row in range(size):
+        line: Line = Line({}, f"L{row}")
+        system.lines[line.id_] = line
+        for column in range(size):
+            station: Station = Station({}, f"L{row}/S{column}", line=line)
+            station.geo_position = (55.0 + row / 100 + generator.random() / 500, 37.0 + column / 60)
+            system.add_station(station)
+            if column:
+                station.add_connection(system.stations[f"L{row}/S{column - 1}"], ConnectionType.NEXT)
+                system.stations[f"L{row}/S{column - 1}"].add_connection(station, ConnectionType.NEXT)
+            if row and generator.random() < 0.3:
+                other: Station = system.stations[f"L{row - 1}/S{column}"]
+                station.add_connection(other, ConnectionType.TRANSITION)
+                other.add_connection(station, ConnectionType.TRANSITION)
+    return system
+
+
+def test_heuristic() -> None:
+    """A* search with distance heuristic should find routes as cheap as Dijkstra search does."""
+    system: System = create_grid_system(12)
+    router: Router = Router(system, RoutingCosts(next_cost=1.0, next_cost_per_kilometer=1.5, transition_cost=3.0))
+    assert router.cost_per_meter > 0.0
+
+    station_ids: list[str] = list(system.stations)
+    generator: random.Random = random.Random(1)
+    for _ in range(50):
+        from_id, to_id = generator.sample(station_ids, 2)
+        costs: np.ndarray = router.get_costs(router.graph.get_index(from_id))
+        route: Route = router.route(from_id, to_id)
+        assert np.isclose(route.cost, costs[router.graph.get_index(to_id)])
+        assert (route.station_ids[0], route.station_ids[-1]) == (from_id, to_id)
+
+        total: float = 0.0
+        for station_id, next_id in zip(route.station_ids, route.station_ids[1:]):
+            edges: list[int] = [
+                x
+                for x in router.graph.get_edges(router.graph.get_index(station_id))
+                if router.graph.targets[x] == router.graph.get_index(next_id)
+            ]
+            total += router.graph.weights[edges[0]]
+        assert np.isclose(total, route.cost)
+
+
+def test_travel_time_matrix(tmp_path: Path) -> None:
+    system: System = create_grid_system(6)
+    costs: RoutingCosts = RoutingCosts(next_cost_per_kilometer=1.0)
+    router: Router = Router(system, costs)
+    expected: np.ndarray = np.stack([router.get_costs(x) for x in range(len(router.graph))])
+
+    assert np.array_equal(travel_time_matrix(system, costs=costs, processes=1), expected)
+    assert np.array_equal(travel_time_matrix(system, costs=costs, processes=2, chunk_size=5), expected)
+
+    output_path: Path = tmp_path / "matrix.npy"
+    source_ids: list[str] = ["L1/S2", "L0/S0", "L1/S2"]
+    matrix: np.ndarray = travel_time_matrix(system, source_ids, costs, processes=2, output_path=output_path)
+    indices: list[int] = [router.graph.get_index(x) for x in source_ids]
+    assert np.array_equal(matrix, expected[indices])
+    assert np.array_equal(np.load(output_path), expected[indices])
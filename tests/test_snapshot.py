@@ -0,0 +1,121 @@
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from metro.core import json_backend
+from metro.core.serialization import get_field_names
+from metro.core.snapshot import load_snapshot, save_snapshot
+from metro.core.snapshot_view import SnapshotView, StationView, SystemView
+from metro.core.station import Station
+from metro.core.system import Map, System
+from tests.test_streaming import create_connected_system
+
+
+def deserialize(system: System) -> System:
+    restored: System = System({}, "")
+    restored.deserialize(json_backend.loads(json_backend.dumps(system.serialize())))
+    return restored
+
+
+def describe(system: System) -> list:
+    """Get values and their types of all station fields, with connections described by target identifiers."""
+    result: list = [system.id_, system.line_width, system.lines]
+    for station in system.stations.values():
+        for key in get_field_names(Station):
+            value: Any = getattr(station, key)
+            if key == "connections":
+                value = [(x.to_.id_, x.type_, x.status) for x in value]
+            result.append((key, value, type(value)))
+    return result
+
+
+def test_system_snapshot(tmp_path: Path) -> None:
+    """Loaded snapshot should be the same as deserialized JSON."""
+    system: System = create_connected_system()
+    system.line_width = 5
+    stations: list[Station] = list(system.stations.values())
+    stations[0].altitude = 120
+    stations[0].height = -12.5
+    stations[0].site_links = {"enwiki": "Central"}
+    stations[0].status = {"type": "closed"}
+    stations[1].geo_position = (55.75, 37.625)
+    stations[1].wikidata_id = 2**60
+    stations[2].caption = "Central"
+    stations[3].platform_length = "long"
+
+    path: Path = tmp_path / "metro.snapshot"
+    save_snapshot(system, path)
+    restored: System = load_snapshot(path)
+
+    assert describe(restored) == describe(deserialize(system))
+    assert json_backend.dumps(restored.serialize()) == json_backend.dumps(system.serialize())
+    assert restored.stations["Red/Central"].connections[0].to_ is restored.stations["Red/Park"]
+    assert restored.get_station_by_wikidata_id(2**60).id_ == "Red/Park"
+
+
+def test_map_snapshot(tmp_path: Path) -> None:
+    map_: Map = Map("world", {"en": "World"}, {"metro": create_connected_system(), "empty": System({}, "x")}, ["en"])
+
+    path: Path = tmp_path / "world.snapshot"
+    save_snapshot(map_, path)
+    restored: Map = load_snapshot(path)
+
+    assert (restored.id_, restored.names, restored.local_languages) == ("world", {"en": "World"}, ["en"])
+    assert list(restored.systems) == ["metro", "empty"]
+    assert describe(restored.systems["metro"]) == describe(deserialize(map_.systems["metro"]))
+    assert restored.systems["empty"].serialize() == {"id": "x", "stations": [], "lines": []}
+
+
+def test_snapshot_errors(tmp_path: Path) -> None:
+    path: Path = tmp_path / "metro.snapshot"
+    path.write_bytes(b"{}")
+    with pytest.raises(ValueError):
+        load_snapshot(path)
+
+    system: System = create_connected_system()
+    del system.lines["Red"]
+    with pytest.raises(ValueError):
+        save_snapshot(system, path)
+
+
+def test_snapshot_view(tmp_path: Path) -> None:
+    """Views should have the same fields and query results as loaded system."""
+    system: System = create_connected_system()
+    stations: list[Station] = list(system.stations.values())
+    stations[0].geo_position = (55.75, 37.625)
+    stations[1].platform_length = "long"
+
+    path: Path = tmp_path / "metro.snapshot"
+    save_snapshot(system, path)
+    loaded: System = load_snapshot(path)
+
+    with SnapshotView(path) as snapshot:
+        view: SystemView = snapshot.get_system_by_id("metro")
+
+        assert list(view.stations) == list(loaded.stations)
+        for station in loaded.stations.values():
+            station_view: StationView = view.stations[station.id_]
+            for key in get_field_names(Station):
+                if key == "connections":
+                    assert [(x.to_.id_, x.type_, x.status) for x in station_view.connections] == [
+                        (x.to_.id_, x.type_, x.status) for x in station.connections
+                    ]
+                else:
+                    assert getattr(station_view, key) == getattr(station, key)
+            assert station_view.is_transition() == station.is_transition()
+
+        def get_ids(stations_: list) -> list[str]:
+            return [x.id_ for x in stations_]
+
+        assert get_ids(view.get_stations_by_short_id("Central")) == ["Red/Central", "Blue/Central"]
+        assert get_ids(view.get_stations_by_line(view.lines["Blue"])) == ["Blue/Central", "Blue/Airport"]
+        assert get_ids(view.get_stations_by_name("Central", "en")) == ["Red/Central", "Blue/Central"]
+        assert view.get_station_by_wikidata_id(100).id_ == "Red/Central"
+        assert view.get_station_by_wikidata_id(200) is None
+        assert view.get_station_by_line_and_wid("Blue", 100).id_ == "Blue/Airport"
+        assert view.get_station_unique_names("ru") == loaded.get_station_unique_names("ru")
+        assert view.has_transitions()
+        assert "Red/Nowhere" not in view.stations
+        assert view.stations["Red/Park"] is view.stations["Red/Park"]
+        assert view.stations["Red/Park"].connections[0].to_ is view.stations["Red/Central"]
@@ -0,0 +1,81 @@
+from metro.core.line import Line
+from metro.core.station import Connection, ConnectionType, Station
+
+
+def create_stations(count: int) -> list[Station]:
+    line: Line = Line({}, "Red")
+    stations: list[Station] = [Station({}, f"Red/{index}") for index in range(count)]
+    for station in stations:
+        station.line = line
+    return stations
+
+
+def test_connections() -> None:
+    """Connection index should follow additions, type changes, and removals."""
+    station, first, second, third = create_stations(4)
+
+    station.add_connection(first, ConnectionType.NEXT)
+    station.add_connection(second, ConnectionType.NEXT)
+    station.add_connection(third, ConnectionType.TRANSITION)
+    station.add_connection(second, ConnectionType.TRANSITION)
+
+    assert [(x.to_.id_, x.type_) for x in station.connections] == [
+        ("Red/1", ConnectionType.NEXT),
+        ("Red/2", ConnectionType.TRANSITION),
+        ("Red/3", ConnectionType.TRANSITION),
+    ]
+    assert station.get_connection(second).type_ == ConnectionType.TRANSITION
+
+    assert station.remove_connection(second) == 1
+    assert station.remove_connection(second) == 0
+    assert station.get_connection(second) is None
+    assert [x["to"] for x in station.serialize()["connections"]] == ["Red/1", "Red/3"]
+
+
+def test_connections_changed_directly() -> None:
+    """Index should be rebuilt if connection list was changed without station methods."""
+    station, first, second = create_stations(3)
+
+    station.add_connection(first, ConnectionType.NEXT)
+    station.connections.append(Connection(second, ConnectionType.NEXT))
+
+    assert station.get_connection(second) is station.connections[1]
+    station.add_connection(second, ConnectionType.NEXT)
+    assert len(station.connections) == 2
+
+
+def test_connection_replaced_directly() -> None:
+    """Index should be rebuilt if connection was replaced or list was assigned, keeping the number of connections."""
+    station, first, second, third = create_stations(4)
+
+    station.add_connection(first, ConnectionType.NEXT)
+    station.connections[0] = Connection(second, ConnectionType.NEXT)
+    assert list(station.get_connection_index()) == ["Red/2"]
+    assert not station.get_connection(first)
+
+    station.connections = [Connection(third, ConnectionType.NEXT)]
+    assert list(station.get_connection_index()) == ["Red/3"]
+    station.connections.append(Connection(first, ConnectionType.NEXT))
+    assert station.get_connection(first) is station.connections[1]
+
+
+def test_caption_cache() -> None:
+    """Cached captions should be updated when names change, including direct changes of names."""
+    station: Station = Station({"en": "Baker Street tube station"}, "Bakerloo/Baker Street")
+
+    assert station.get_caption("en") == "Baker Street"
+    assert station.get_caption("ru") == "Baker Street"
+
+    station.set_name("ru", "Бейкер-стрит")
+    assert station.get_caption("ru") == "Бейкер-стрит"
+
+    station.set_names({"en_tr": "Baker Street station"})
+    assert station.get_caption("en") == "Baker Street"
+
+    station.names = {}
+    assert station.get_caption("en") == "Baker Street"
+    station.id_ = "Bakerloo/Regent's Park"
+    assert station.get_caption("en") == "Regent's Park"
+
+    station.names["en"] = "Marylebone station"
+    assert station.get_caption("en") == "Marylebone"
@@ -0,0 +1,71 @@
+from io import BytesIO
+from typing import Optional
+
+import pytest
+
+from metro.core import json_backend
+from metro.core.station import Connection, ConnectionType, Station
+from metro.core.streaming import read_system, write_system
+from metro.core.system import System
+from tests.test_system import create_system
+
+
+def write(system: System, indent: Optional[int]) -> bytes:
+    output_file: BytesIO = BytesIO()
+    write_system(system, output_file, indent)
+    return output_file.getvalue()
+
+
+@pytest.mark.parametrize("backend", json_backend.get_available_backends())
+def test_write_system(backend: str) -> None:
+    """Streamed output should be the same as encoded serialized system."""
+    json_backend.set_backend(backend)
+    try:
+        system: System = create_system()
+        system.line_width = 5.0
+        empty_system: System = System({}, "empty")
+        for indent in None, 2, 4:
+            for system_ in system, empty_system:
+                assert write(system_, indent) == json_backend.dumps(system_.serialize(), indent)
+    finally:
+        json_backend.set_backend()
+
+
+def create_connected_system() -> System:
+    system: System = create_system()
+    system.set_names({"en": "Metro", "ru": "Метрополитен"})
+    stations: list[Station] = list(system.stations.values())
+    for station, other in zip(stations, stations[1:]):
+        station.connections.append(Connection(other, ConnectionType.NEXT))
+        other.connections.append(Connection(station, ConnectionType.NEXT))
+    stations[0].connections.append(Connection(stations[-1], ConnectionType.TRANSITION, {"type": "closed"}))
+    stations[0].set_name("ru", "Центральная")
+    return system
+
+
+def test_read_system() -> None:
+    """Streamed input should give the same system as deserialization, even with small chunks splitting characters."""
+    system: System = create_connected_system()
+
+    for indent in None, 4:
+        data: bytes = write(system, indent)
+        expected: System = System({}, "")
+        expected.deserialize(json_backend.loads(data))
+
+        for chunk_size in 1, 7, 1024:
+            restored: System = read_system(BytesIO(data), chunk_size=chunk_size)
+            assert restored.serialize() == expected.serialize() == system.serialize()
+            assert list(restored.lines) == ["Red", "Blue"]
+            assert restored.stations["Red/Central"].line is restored.lines["Red"]
+            assert restored.stations["Red/Central"].connections[-1].to_ is restored.stations["Blue/Airport"]
+
+
+def test_read_system_errors() -> None:
+    with pytest.raises(ValueError):
+        read_system(BytesIO(b'{"id": "metro", "stations": [{"id": "Red/Park", "line": "Red"}]}'))
+    with pytest.raises(ValueError):
+        read_system(
+            BytesIO(b'{"id": "metro", "stations": [{"id": "A/B", "connections": [{"to": "A/C", "type": "next"}]}]}')
+        )
+    with pytest.raises(ValueError):
+        read_system(BytesIO(b'{"id": "metro", "stations": [{"id": "A/B"}'))
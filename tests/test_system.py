@@ -0,0 +1,94 @@
+from datetime import datetime
+
+from metro.core.line import Line
+from metro.core.station import Connection, ConnectionType, Station, StationStructure
+from metro.core.system import System
+
+
+def create_system() -> System:
+    system: System = System({}, "metro")
+    for line_id in "Red", "Blue":
+        system.lines[line_id] = Line({"en": f"{line_id} line"}, line_id)
+    for index, (line_id, name) in enumerate(
+        [("Red", "Central"), ("Red", "Park"), ("Blue", "Central"), ("Blue", "Airport")]
+    ):
+        station: Station = Station({"en": f"{name} station"}, f"{line_id}/{name}", wikidata_id=100 + index % 3)
+        station.line = system.lines[line_id]
+        system.add_station(station)
+    return system
+
+
+def get_ids(stations: list[Station]) -> list[str]:
+    return [x.id_ for x in stations]
+
+
+def test_station_lookups() -> None:
+    system: System = create_system()
+
+    assert get_ids(system.get_stations_by_short_id("Central")) == ["Red/Central", "Blue/Central"]
+    assert get_ids(system.get_stations_by_line(system.lines["Blue"])) == ["Blue/Central", "Blue/Airport"]
+    assert get_ids(system.get_stations_by_name("Central", "en")) == ["Red/Central", "Blue/Central"]
+    assert system.get_station_by_wikidata_id(100).id_ == "Red/Central"
+    assert system.get_station_by_line_and_wid("Blue", 100).id_ == "Blue/Airport"
+    assert system.get_station_by_wikidata_id(200) is None
+
+
+def test_index_updates() -> None:
+    """Indexes should follow station additions and removals, including direct changes of stations dictionary."""
+    system: System = create_system()
+    assert get_ids(system.get_stations_by_name("Central", "en")) == ["Red/Central", "Blue/Central"]
+
+    system.remove_station("Red/Central")
+    assert get_ids(system.get_stations_by_name("Central", "en")) == ["Blue/Central"]
+    assert system.get_station_by_wikidata_id(100).id_ == "Blue/Airport"
+
+    station: Station = Station({"en": "Central"}, "Green/Central", wikidata_id=300)
+    system.stations[station.id_] = station
+    assert get_ids(system.get_stations_by_short_id("Central")) == ["Blue/Central", "Green/Central"]
+    assert system.get_station_by_wikidata_id(300) is station
+
+    system.add_station(Station({"en": "Central"}, "Green/Central"))
+    assert system.get_station_by_wikidata_id(300) is None
+    assert len(system.get_stations_by_name("Central", "en")) == 2
+
+
+def test_index_replacement() -> None:
+    """Indexes should follow direct replacement of station that keeps the number of stations."""
+    system: System = create_system()
+    assert get_ids(system.get_stations_by_short_id("Central")) == ["Red/Central", "Blue/Central"]
+
+    system.stations.pop("Red/Central")
+    system.stations["Red/Other"] = Station({}, "Red/Other", line=system.lines["Red"])
+    assert get_ids(system.get_stations_by_short_id("Central")) == ["Blue/Central"]
+    assert get_ids(system.get_stations_by_short_id("Other")) == ["Red/Other"]
+
+    system.stations = {"Blue/Lake": Station({}, "Blue/Lake")}
+    assert get_ids(system.get_stations_by_short_id("Lake")) == ["Blue/Lake"]
+    assert system.get_stations_by_short_id("Other") == []
+
+
+def test_serialization() -> None:
+    system: System = create_system()
+    station: Station = system.stations["Red/Central"]
+    station.open_time = datetime(1935, 5, 15)
+    station.structure_type = StationStructure.UNDERGROUND
+    station.geo_position = (55.75, 37.61)
+    station.connections.append(Connection(system.stations["Red/Park"], ConnectionType.NEXT))
+
+    assert station.serialize() == {
+        "id": "Red/Central",
+        "names": {"en": "Central station"},
+        "id_": "Red/Central",
+        "open_time": "1935.05.15 00:00:00",
+        "structure_type": 1,
+        "geo_position": [55.75, 37.61],
+        "connections": [{"to": "Red/Park", "type": "next"}],
+        "wikidata_id": 100,
+        "line": "Red",
+    }
+    assert system.lines["Red"].serialize() == {"id": "Red", "names": {"en": "Red line"}, "id_": "Red"}
+
+    structure: dict = system.serialize()
+    restored: System = System({}, "metro")
+    restored.deserialize(structure)
+    assert restored.serialize() == structure
@@ -0,0 +1,54 @@
+import pytest
+
+from metro.core.graph import Graph, build_graph
+from metro.core.line import Line
+from metro.core.station import Connection, ConnectionType, Station, StationStructure
+from metro.core.system import System
+from metro.core.validation import ValidationReport, validate
+from tests.test_streaming import create_connected_system
+
+
+def test_valid_system() -> None:
+    assert create_connected_system().validate() == ValidationReport()
+
+
+def test_validation() -> None:
+    system: System = create_connected_system()
+    stations: dict[str, Station] = system.stations
+
+    stations["Blue/Airport"].connections = [
+        x for x in stations["Blue/Airport"].connections if x.to_.id_ != "Blue/Central"
+    ]
+    stations["Blue/Airport"].connections.append(Connection(Station({}, "Green/Zoo"), ConnectionType.NEXT))
+    stations["Red/Park"].connections.append(Connection(stations["Red/Central"], ConnectionType.TRANSITION))
+    stations["Red/Park"].structure_type = StationStructure.DEEP_PYLON
+    stations["Red/Park"].altitude = -3.0
+    stations["Blue/Central"].structure_type = StationStructure.GROUND.value
+    stations["Blue/Central"].altitude = -2.0
+
+    system.lines["Green"] = Line({}, "Green")
+    for station_id in "Green/Depot", "Green/Field":
+        system.add_station(Station({}, station_id, line=system.lines["Green"]))
+    system.add_station(Station({}, "Yellow/Lake"))
+
+    report: ValidationReport = system.validate()
+    assert not report.is_valid()
+    assert report.asymmetric_connections == [("Blue/Central", "Blue/Airport")]
+    assert report.dangling_connections == [("Blue/Airport", "Green/Zoo")]
+    assert report.stations_without_line == ["Yellow/Lake"]
+    assert report.line_components == {"Green": [["Green/Depot"], ["Green/Field"]]}
+    assert report.same_line_transitions == [("Red/Park", "Red/Central")]
+    assert report.structure_mismatches == [
+        ("Red/Park", StationStructure.DEEP_PYLON, -3.0),
+        ("Blue/Central", StationStructure.GROUND, -2.0),
+    ]
+
+
+def test_outdated_graph() -> None:
+    system: System = create_connected_system()
+    graph: Graph = build_graph(system)
+    assert validate(system, graph).is_valid()
+
+    system.add_station(Station({}, "Red/Lake", line=system.lines["Red"]))
+    with pytest.raises(ValueError):
+        validate(system, graph)
@@ -1,5 +1,13 @@
+import asyncio
+import json
+import os
+from datetime import timedelta
+from pathlib import Path
+from typing import Iterable, Optional
+
+from metro.core import network
 from metro.core.system import Map, System
-from metro.harvest.wikidata import WikidataCityParser
+from metro.harvest.wikidata import WikidataCityParser, WikidataParser, WikidataStationItem
 
 
 class MockWikidataParser:
@@ -8,6 +16,9 @@ class MockWikidataParser:
         if wikidata_id in [1, 2]:
             return {"entities": {f"Q{wikidata_id}": {"claims": {}}}}
 
+    def parse_wikidata_many(self, wikidata_ids: list[int]) -> dict[int, dict]:
+        return {x: self.parse_wikidata(x) for x in wikidata_ids if x in [1, 2]}
+
 
 def test_simple() -> None:
     wikidata_parser: MockWikidataParser = MockWikidataParser()
@@ -16,3 +27,187 @@ def test_simple() -> None:
     map_.systems = {"metro": System({}, "metro")}
     parser: WikidataCityParser = WikidataCityParser(wikidata_parser, map_, {1: "metro"}, [2], 1, [])
     parser.parse()
+
+
+def test_parse_wikidata_many(tmp_path: Path, monkeypatch) -> None:
+    """Uncached items should be requested in batches and split into per-item cache files."""
+    requests: list[str] = []
+
+    def request(address: str, parameters: dict[str, str]) -> bytes:
+        requests.append(parameters["ids"])
+        entities = {x: {"id": x, "claims": {}} for x in parameters["ids"].split("|")}
+        return json.dumps({"entities": entities, "success": 1}).encode()
+
+    monkeypatch.setattr(network, "request", request)
+
+    (tmp_path / "Q1").write_bytes(json.dumps({"entities": {"Q1": {"id": "Q1", "cached": True}}}).encode())
+
+    parser: WikidataParser = WikidataParser(tmp_path)
+    structures: dict[int, dict] = parser.parse_wikidata_many(range(1, 61))
+
+    assert len(structures) == 60
+    assert structures[1]["entities"]["Q1"]["cached"]
+    assert [len(x.split("|")) for x in requests] == [50, 9]
+    assert parser.parse_wikidata(42) == {"entities": {"Q42": {"id": "Q42", "claims": {}}}}
+    assert len(requests) == 2
+
+
+def item_claim(wikidata_id: int) -> dict:
+    return {"mainsnak": {"datavalue": {"value": {"id": f"Q{wikidata_id}", "numeric-id": wikidata_id}}}}
+
+
+class MockNetworkParser:
+    """Two lines of system 1: stations 11, 12, 13 on line 101, and 21, 22 on line 102 with transition 12 – 21."""
+
+    def __init__(self) -> None:
+        self.entities: dict[int, dict] = {1: {"labels": {"en": {"value": "Metro"}}, "claims": {}}}
+        for line_id, name in (101, "Red line"), (102, "Blue line"):
+            self.entities[line_id] = {"labels": {"en": {"value": name}}, "claims": {"P361": [item_claim(1)]}}
+        for station_id, line_id, next_ids, transition_ids in [
+            (11, 101, [12], []),
+            (12, 101, [11, 13], [21]),
+            (13, 101, [12], []),
+            (21, 102, [22], [12]),
+            (22, 102, [21], []),
+        ]:
+            self.entities[station_id] = {
+                "labels": {"en": {"value": f"Station {station_id}"}},
+                "claims": {
+                    "P81": [item_claim(line_id)],
+                    "P197": [item_claim(x) for x in next_ids],
+                    "P833": [item_claim(x) for x in transition_ids],
+                },
+            }
+
+    def parse_wikidata(self, wikidata_id: int) -> dict:
+        return {"entities": {f"Q{wikidata_id}": self.entities[wikidata_id]}}
+
+    def parse_wikidata_many(self, wikidata_ids: list[int]) -> dict[int, dict]:
+        return {x: self.parse_wikidata(x) for x in wikidata_ids if x in self.entities}
+
+
+def parse_mock_network(is_async: bool) -> dict:
+    map_: Map = Map("test_map", {}, {"metro": System({}, "metro")}, ["en"])
+    parser: WikidataCityParser = WikidataCityParser(MockNetworkParser(), map_, {1: "metro"}, [11], 1, [])
+    if is_async:
+        asyncio.run(parser.parse_async(concurrency=3))
+    else:
+        parser.parse()
+    return map_.systems["metro"].serialize()
+
+
+def test_parse_async() -> None:
+    """Concurrent crawl should produce the same system as the sequential one."""
+    structure: dict = parse_mock_network(is_async=False)
+
+    assert len(structure["stations"]) == 5
+    assert parse_mock_network(is_async=True) == structure
+
+
+def test_parse_failed_items() -> None:
+    """Items that cannot be fetched should be skipped, and no item should be requested twice."""
+    wikidata_parser: MockNetworkParser = MockNetworkParser()
+    del wikidata_parser.entities[102]
+    requested: list[int] = []
+    parse_wikidata_many = wikidata_parser.parse_wikidata_many
+
+    def record(wikidata_ids: list[int]) -> dict[int, dict]:
+        requested.extend(wikidata_ids)
+        return parse_wikidata_many(wikidata_ids)
+
+    wikidata_parser.parse_wikidata_many = record
+    map_: Map = Map("test_map", {}, {"metro": System({}, "metro")}, ["en"])
+    WikidataCityParser(wikidata_parser, map_, {1: "metro"}, [11], 1, []).parse()
+
+    assert list(map_.systems["metro"].stations) == ["Red/Station 11", "Red/Station 12", "Red/Station 13"]
+    assert sorted(requested) == [11, 12, 13, 21, 101, 102]
+
+
+def get_requested(is_async: bool, limit: Optional[int] = None, missing: Iterable[int] = ()) -> list[int]:
+    """Parse mock network or prefetch its items, get sorted identifiers of requested items."""
+    wikidata_parser: MockNetworkParser = MockNetworkParser()
+    for wikidata_id in missing:
+        del wikidata_parser.entities[wikidata_id]
+    # Station is the part of the system by itself, not only by its line.
+    wikidata_parser.entities[21]["claims"]["P361"] = [item_claim(1)]
+    requested: set[int] = set()
+    parse_wikidata = wikidata_parser.parse_wikidata
+    parse_wikidata_many = wikidata_parser.parse_wikidata_many
+
+    def record(wikidata_id: int) -> dict:
+        requested.add(wikidata_id)
+        return parse_wikidata(wikidata_id)
+
+    def record_many(wikidata_ids: list[int]) -> dict[int, dict]:
+        requested.update(wikidata_ids)
+        return parse_wikidata_many(wikidata_ids)
+
+    wikidata_parser.parse_wikidata = record
+    wikidata_parser.parse_wikidata_many = record_many
+    map_: Map = Map("test_map", {}, {"metro": System({}, "metro")}, ["en"])
+    parser: WikidataCityParser = WikidataCityParser(wikidata_parser, map_, {1: "metro"}, [11], 1, [])
+    if is_async:
+        asyncio.run(parser.prefetch(limit, concurrency=3))
+    else:
+        parser.parse(limit)
+    return sorted(requested)
+
+
+def test_parse_async_limit() -> None:
+    """Prefetch should request the same items as the sequential crawl, not more because of the limit."""
+    assert get_requested(is_async=False, limit=1) == [1, 11, 12, 101]
+    assert get_requested(is_async=True, limit=1) == [1, 11, 12, 101]
+
+
+def test_parse_async_failed_line() -> None:
+    """Prefetch should expand stations of lines that cannot be fetched, as the sequential crawl does."""
+    assert get_requested(is_async=False, missing=[102]) == [1, 11, 12, 13, 21, 22, 101, 102]
+    assert get_requested(is_async=True, missing=[102]) == [1, 11, 12, 13, 21, 22, 101, 102]
+
+
+def test_revalidation(tmp_path: Path, monkeypatch) -> None:
+    """Expired items should be revalidated with one request and only changed items should be requested again."""
+    requests: list[dict[str, str]] = []
+
+    def request(address: str, parameters: dict[str, str]) -> bytes:
+        requests.append(parameters)
+        ids: list[str] = parameters["ids"].split("|")
+        if parameters.get("props") == "info":
+            entities = {x: {"id": x, "lastrevid": 1 if x == "Q1" else 2} for x in ids}
+        else:
+            entities = {x: {"id": x, "lastrevid": 2, "claims": {}} for x in ids}
+        return json.dumps({"entities": entities}).encode()
+
+    monkeypatch.setattr(network, "request", request)
+
+    for wikidata_id in 1, 2, 3:
+        cache_file: Path = tmp_path / f"Q{wikidata_id}"
+        cache_file.write_bytes(json.dumps({"entities": {f"Q{wikidata_id}": {"lastrevid": 1}}}).encode())
+        if wikidata_id != 3:
+            os.utime(cache_file, (0, 0))
+
+    parser: WikidataParser = WikidataParser(tmp_path, max_age=timedelta(days=1))
+    structures: dict[int, dict] = parser.parse_wikidata_many([1, 2, 3])
+
+    assert [x["ids"] for x in requests] == ["Q1|Q2", "Q2"]
+    assert [structures[x]["entities"][f"Q{x}"]["lastrevid"] for x in (1, 2, 3)] == [1, 2, 1]
+    assert (tmp_path / "Q1").stat().st_mtime > 0
+
+    requests.clear()
+    parser.parse_wikidata_many([1, 2, 3])
+    assert not requests
+
+
+def test_station_item_release() -> None:
+    """Released station item should keep extracted fields without the raw structure."""
+    structure: dict = MockNetworkParser().parse_wikidata(12)
+    item: WikidataStationItem = WikidataStationItem(structure, 12)
+
+    assert "next_connections" not in item.__dict__
+    item.release()
+
+    assert item.entity is None
+    assert item.get_name() == "Station 12"
+    assert item.line_wikidata_ids == [101]
+    assert item.next_connections == [[11, 101], [13, 101]]
+    assert item.transition_connections == [21]